@@ -0,0 +1,33 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Query
+
+# Фасеты, которые FilmRepository умеет считать агрегациями
+FILM_FACETS = ('genres', 'rating_histogram')
+
+
+class FacetParams:
+    def __init__(
+        self,
+        facets: Annotated[str | None, Query(
+            description='Facets to count in the same request, comma separated: '
+                        + ', '.join(FILM_FACETS)
+        )] = None,
+        facets_only: Annotated[bool, Query(description='Return only facets without films')] = False
+    ):
+        names = {name.strip() for name in (facets or '').split(',') if name.strip()}
+        unknown = names - set(FILM_FACETS)
+        if unknown:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                                detail=f'unknown facets: {", ".join(sorted(unknown))}')
+        if facets_only and not names:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                                detail='facets_only requires facets')
+        # Порядок фасетов не влияет на ответ,
+        # поэтому одинаковые наборы дают один ключ кеша
+        self.names = sorted(names)
+        self.only = facets_only
+
+
+FacetsDep = Annotated[FacetParams, Depends()]
@@ -3,30 +3,39 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from pydantic import TypeAdapter
+from src.api.v1.facets import FacetsDep
+from src.api.v1.filters import FilmFilterDep
 from src.api.v1.pagination import PaginationDep
 from src.core.config import cache_service
-from src.models.film import FilmList, FilmDitail
+from src.models.film import FilmList, FilmDitail, FilmFacetedList
 from src.services.film import FilmService, get_film_service
 
 router = APIRouter()
 
 
-@router.get('/search', response_model=list[FilmList])
+@router.get('/search', response_model=list[FilmList] | FilmFacetedList)
 @cache_service.cached(
     endpoint="api_film_search",
-    params_extractor=lambda query, pagination, **kwargs: {
+    params_extractor=lambda query, pagination, facets, **kwargs: {
         "query": query,
+        "facets": facets.names,
+        "facets_only": facets.only,
         "page_size": pagination.page_size,
         "page_number": pagination.page_number
     }
 )
 async def film_search(query: Annotated[str, Query(description='Word to search movie by title')],
                       pagination: PaginationDep,
-                      film_service: FilmService = Depends(get_film_service)) -> list[FilmList]:
-    films = await film_service.get_search_list(query, pagination.page_number, pagination.page_size)
-    if not films:
+                      facets: FacetsDep,
+                      film_service: FilmService = Depends(get_film_service)
+                      ) -> list[FilmList] | FilmFacetedList:
+    films = await film_service.get_search_list(query, pagination.page_number, pagination.page_size,
+                                               facets.names, facets.only)
+    if not films or (isinstance(films, FilmFacetedList) and not facets.only and not films.items):
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                             detail='film not found')
+    if isinstance(films, FilmFacetedList):
+        return films
     adapter = TypeAdapter(list[FilmList])
     validated_list = adapter.validate_python(films)
     return validated_list
@@ -46,20 +55,24 @@ async def film_details(film_id: Annotated[str, Path(description='Movie ID to dis
     return film
 
 
-@router.get('/', response_model=list[FilmList])
+@router.get('/', response_model=list[FilmList] | FilmFacetedList)
 @cache_service.cached(
     endpoint="api_film_list",
-    params_extractor=lambda pagination, sort, genres, **kwargs: {
+    params_extractor=lambda pagination, facets, film_filter, sort, **kwargs: {
         "sort": sort,
-        "genres": genres,
+        "filter": film_filter.model_dump(),
+        "facets": facets.names,
+        "facets_only": facets.only,
         "page_size": pagination.page_size,
         "page_number": pagination.page_number
     }
 )
 async def film_list(pagination: PaginationDep,
+                    facets: FacetsDep,
+                    film_filter: FilmFilterDep,
                     sort: Annotated[str, Query(description='Field for sorting')] = '-imdb_rating',
-                    genres: Annotated[str | None, Query(description='Genre ID to search')] = None,
-                    film_service: FilmService = Depends(get_film_service)) -> list[FilmList]:
+                    film_service: FilmService = Depends(get_film_service)
+                    ) -> list[FilmList] | FilmFacetedList:
     if sort.startswith('-'):
         sort_order = 'desc'
         sort = sort[1:]
@@ -67,10 +80,13 @@ async def film_list(pagination: PaginationDep,
         sort_order = 'asc'
     films = await film_service.get_sort_list_by_param(sort, sort_order,
                                                       pagination.page_number,
-                                                      pagination.page_size, genres or "")
-    if not films:
+                                                      pagination.page_size, film_filter,
+                                                      facets.names, facets.only)
+    if not films or (isinstance(films, FilmFacetedList) and not facets.only and not films.items):
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                             detail='film not found')
+    if isinstance(films, FilmFacetedList):
+        return films
     adapter = TypeAdapter(list[FilmList])
     validated_list = adapter.validate_python(films)
     return validated_list
@@ -0,0 +1,50 @@
+from http import HTTPStatus
+from typing import Annotated, Literal
+
+from fastapi import Depends, HTTPException, Query
+from src.models.film import FilmFilter
+
+
+def _split_ids(value: str | None) -> tuple[str, ...]:
+    return tuple(sorted({item.strip() for item in (value or '').split(',') if item.strip()}))
+
+
+def get_film_filter(
+    genres: Annotated[str | None, Query(
+        description='Genre IDs to filter by, comma separated'
+    )] = None,
+    genres_mode: Annotated[Literal['any', 'all'], Query(
+        description='Films with any of the genres or with all of them'
+    )] = 'any',
+    rating_from: Annotated[float | None, Query(
+        description='Minimal IMDb rating', ge=0, le=10
+    )] = None,
+    rating_to: Annotated[float | None, Query(
+        description='Maximal IMDb rating', ge=0, le=10
+    )] = None,
+    persons: Annotated[str | None, Query(
+        description='Person IDs in any role, comma separated'
+    )] = None
+) -> FilmFilter:
+    """
+    Привести фильтры запроса к каноническому виду.
+
+    id сортируются и очищаются от повторов, а режим жанров для
+    одного жанра не важен, поэтому равнозначные запросы дают
+    одинаковый фильтр, один ключ кеша и один запрос к Elasticsearch.
+    """
+    if rating_from is not None and rating_to is not None and rating_from > rating_to:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                            detail='rating_from must not exceed rating_to')
+
+    genre_ids = _split_ids(genres)
+    return FilmFilter(
+        genres=genre_ids,
+        genres_mode=genres_mode if len(genre_ids) > 1 else 'any',
+        rating_from=rating_from,
+        rating_to=rating_to,
+        persons=_split_ids(persons)
+    )
+
+
+FilmFilterDep = Annotated[FilmFilter, Depends(get_film_filter)]
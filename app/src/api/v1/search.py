@@ -1,13 +1,14 @@
+import asyncio
 from http import HTTPStatus
-from typing import Annotated, Dict, Any
+from typing import Annotated, Any, Dict, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from src.api.v1.pagination import PaginationDep
 from src.core.config import cache_service
-from src.models.film import FilmList
+from src.models.film import FilmList, FilmSuggestion
 from src.models.genre import GenreList, Genre
-from src.models.person import PersonSearch
+from src.models.person import PersonSearch, PersonSuggestion
 from src.services.film import FilmService, get_film_service
 from src.services.genre import GenreService, get_genre_service
 from src.services.person import PersonService, get_person_service
@@ -27,6 +28,18 @@ class SearchResponse(BaseModel):
     total: int = Field(description="Общее количество найденных результатов")
 
 
+class SuggestResponse(BaseModel):
+    """Модель для ответа подсказок"""
+    films: list[FilmSuggestion] = Field(
+        default=[],
+        description="Фильмы, название которых начинается с запроса"
+    )
+    persons: list[PersonSuggestion] = Field(
+        default=[],
+        description="Персоны, имя которых начинается с запроса"
+    )
+
+
 @router.get('/search', response_model=SearchResponse)
 @cache_service.cached(
     endpoint="api_search",
@@ -82,3 +95,46 @@ async def universal_search(
         )
 
     return SearchResponse(results=results, total=total)
+
+
+@router.get('/suggest', response_model=SuggestResponse)
+async def suggest(
+        prefix: Annotated[str, Query(
+            description='Начало названия фильма или имени персоны',
+            min_length=1
+        )],
+        size: Annotated[int, Query(
+            description='Сколько подсказок вернуть для каждого типа',
+            ge=1,
+            le=20
+        )] = 5,
+        suggest_type: Annotated[Literal['films', 'persons', 'all'], Query(
+            description='Тип подсказок: films, persons, all'
+        )] = 'all',
+        film_service: FilmService = Depends(get_film_service),
+        person_service: PersonService = Depends(get_person_service)
+) -> SuggestResponse:
+    """
+    Подсказки при вводе поискового запроса.
+
+    Отвечает completion suggester по полям title.suggest и full_name.suggest: префиксы
+    ищутся в структуре в памяти Elasticsearch без полнотекстового
+    запроса. Ответ не кешируется в Redis — на каждое нажатие клавиши
+    получается новый ключ, и поход в кеш стоит не дешевле самой
+    подсказки.
+    """
+    async def no_suggestions():
+        return []
+
+    films, persons = await asyncio.gather(
+        film_service.suggest(prefix, size) if suggest_type in ['films', 'all'] else no_suggestions(),
+        person_service.suggest(prefix, size) if suggest_type in ['persons', 'all'] else no_suggestions(),
+    )
+
+    if not films and not persons:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='suggestions not found'
+        )
+
+    return SuggestResponse(films=films, persons=persons)
@@ -24,6 +24,13 @@ class Settings(BaseSettings):
     redis_port: int = Field(6379, alias='REDIS_PORT')
     elastic_host: str = Field('localhost', alias='ELASTIC_HOST_NAME')
     elastic_port: int = Field(9200, alias='ELASTIC_PORT')
+    # Поиск фильмов: поля multi_match с весами и окно топа, который пересчитывается rescore
+    film_search_fields: list[str] = Field(
+        ['title^3', 'actors_names^2', 'directors_names^2', 'writers_names', 'description'],
+        alias='FILM_SEARCH_FIELDS'
+    )
+    film_search_tie_breaker: float = Field(0.3, alias='FILM_SEARCH_TIE_BREAKER')
+    film_search_rescore_window: int = Field(50, alias='FILM_SEARCH_RESCORE_WINDOW')
 
 
 # Корень проекта
@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from src.models.base import UUIDBase
 from src.models.genre import GenreList
 from src.models.person import PersonFilmDitail
@@ -12,9 +15,52 @@ class FilmList(UUIDBase):
     writers: list[PersonFilmDitail] = []
 
 
+class FilmFilter(BaseModel):
+    """Фильтры списка фильмов в каноническом виде"""
+    genres: tuple[str, ...] = ()
+    genres_mode: Literal['any', 'all'] = 'any'
+    rating_from: float | None = None
+    rating_to: float | None = None
+    persons: tuple[str, ...] = ()
+
+    model_config = {
+        "frozen": True
+    }
+
+
+class FilmSuggestion(UUIDBase):
+    """Модель подсказки фильма при вводе поискового запроса"""
+    title: str
+    imdb_rating: float | None = None
+
+
 class FilmDitail(FilmList):
     description: str | None = None
     genres: list[GenreList] = []
     directors: list[PersonFilmDitail] = []
     actors: list[PersonFilmDitail] = []
     writers: list[PersonFilmDitail] = []
+
+
+class GenreFacet(BaseModel):
+    """Число фильмов жанра"""
+    id: str
+    count: int
+
+
+class RatingFacet(BaseModel):
+    """Число фильмов с рейтингом в интервале [rating, rating + 1)"""
+    rating: float
+    count: int
+
+
+class FilmFacets(BaseModel):
+    genres: list[GenreFacet] | None = None
+    rating_histogram: list[RatingFacet] | None = None
+
+
+class FilmFacetedList(BaseModel):
+    """Страница фильмов вместе с фасетами, посчитанными тем же запросом"""
+    total: int
+    items: list[FilmList] = []
+    facets: FilmFacets
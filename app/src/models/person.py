@@ -22,6 +22,11 @@ class PersonSearch(UUIDBase):
     }
 
 
+class PersonSuggestion(UUIDBase):
+    """Модель подсказки персоны при вводе поискового запроса"""
+    full_name: str
+
+
 class PersonDetail(UUIDBase):
     """Модель детальной информации о персоне"""
     full_name: str = Field(alias='name')
@@ -1,10 +1,38 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
+from src.core.config import settings
 from src.core.database import elastic_factory
-from src.models.film import FilmList, FilmDitail
+from src.models.film import (
+    FilmDitail,
+    FilmFacetedList,
+    FilmFacets,
+    FilmFilter,
+    FilmList,
+    FilmSuggestion,
+)
 from src.services.interfaces import FilmRepositoryInterface
 
+# Агрегации фасетов; считаются тем же запросом,
+# что и страница фильмов
+FACET_AGGREGATIONS = {
+    'genres': {'terms': {'field': 'genre_ids', 'size': 100}},
+    'rating_histogram': {
+        'histogram': {
+            'field': 'imdb_rating',
+            'interval': 1,
+            'min_doc_count': 0,
+            'extended_bounds': {'min': 0, 'max': 9}
+        }
+    },
+}
+
+# Поля документа, которые нужны моделям ответа:
+# описание и служебные *_ids в списки не попадают
+# и не гоняются по сети
+FILM_LIST_SOURCE = ['id', 'title', 'imdb_rating', 'genres', 'directors', 'actors', 'writers']
+FILM_DETAIL_SOURCE = FILM_LIST_SOURCE + ['description']
+
 
 class FilmRepository(FilmRepositoryInterface):
     """Репозиторий для работы с фильмами"""
@@ -22,44 +50,81 @@ class FilmRepository(FilmRepositoryInterface):
     async def get_by_id(self, entity_id: str) -> Optional[FilmDitail]:
         try:
             client = await self._get_client()
-            doc = await client.get(index='movies', id=entity_id)
+            doc = await client.get(index='movies', id=entity_id, source_includes=FILM_DETAIL_SOURCE)
             return FilmDitail(**doc['_source'])
         except NotFoundError:
             return None
 
-    async def search(self, query: str, page: int = 0, page_size: int = 10) -> Optional[List[FilmList]]:
+    async def search(self, query: str, page: int = 0, page_size: int = 10,
+                     facets: Sequence[str] = (),
+                     facets_only: bool = False) -> Optional[List[FilmList]]:
         try:
             body = {
+                "_source": FILM_LIST_SOURCE,
                 "from": page * page_size,
                 "size": page_size,
-                "query": {"match": {"title": query}}
+                "query": {
+                    "multi_match": {
+                        "query": query,
+                        "fields": settings.film_search_fields,
+                        "type": "best_fields",
+                        "tie_breaker": settings.film_search_tie_breaker
+                    }
+                },
+                "rescore": self._search_rescore(query, (page + 1) * page_size)
             }
+            if facets:
+                return await self._search_faceted(body, facets, facets_only)
             client = await self._get_client()
             result = await client.search(index='movies', body=body)
             return [FilmList(**hit['_source']) for hit in result['hits']['hits']]
         except NotFoundError:
             return []
 
+    async def suggest(self, prefix: str, size: int = 5) -> List[FilmSuggestion]:
+        try:
+            body = {
+                "_source": ["id", "title", "imdb_rating"],
+                "suggest": {
+                    "films": {
+                        "prefix": prefix,
+                        "completion": {
+                            "field": "title.suggest",
+                            "size": size,
+                            "skip_duplicates": True
+                        }
+                    }
+                }
+            }
+            client = await self._get_client()
+            result = await client.search(index='movies', body=body)
+            options = result['suggest']['films'][0]['options']
+            return [FilmSuggestion(**option['_source']) for option in options]
+        except NotFoundError:
+            return []
+
     async def get_sorted(self, sort_field: str, sort_order: str = "asc",
                          page: int = 0, page_size: int = 10, **kwargs) -> Optional[List[FilmList]]:
         try:
-            genres = kwargs.get('genres')
+            film_filter = kwargs.get('film_filter')
+            if film_filter is None and kwargs.get('genres'):
+                film_filter = FilmFilter(genres=(str(kwargs['genres']),))
+            facets = kwargs.get('facets')
             body = {
+                "_source": FILM_LIST_SOURCE,
                 "sort": [{sort_field: {"order": sort_order}}],
                 "from": page * page_size,
                 "size": page_size,
+                # Общее число совпадений не нужно: при сортировке
+                # индекса по -imdb_rating Elasticsearch прекращает
+                # обход сегмента, набрав страницу
+                "track_total_hits": False,
             }
-            if genres:
-                body["query"] = {
-                    'bool': {
-                        'filter': [{
-                            'nested': {
-                                'path': 'genres',
-                                'query': {'term': {'genres.id': str(genres)}}
-                            }
-                        }]
-                    }
-                }
+            filter_clauses = self._compile_filter(film_filter) if film_filter else []
+            if filter_clauses:
+                body["query"] = {'bool': {'filter': filter_clauses}}
+            if facets:
+                return await self._search_faceted(body, facets, kwargs.get('facets_only', False))
             client = await self._get_client()
             result = await client.search(index='movies', body=body)
             hits = result['hits']['hits']
@@ -68,3 +133,119 @@ class FilmRepository(FilmRepositoryInterface):
             return [FilmList(**hit['_source']) for hit in hits]
         except NotFoundError:
             return []
+
+    @staticmethod
+    def _search_rescore(query: str, hits_needed: int) -> Dict[str, Any]:
+        """
+        Дорогая часть ранжирования — только для топа совпадений.
+
+        В окне поднимаются фильмы, где слова запроса стоят рядом
+        (фраза с допуском), и фильмы с высоким рейтингом. Окно не
+        меньше запрошенной страницы, иначе порядок на границе окна
+        менялся бы между страницами.
+        """
+        return {
+            "window_size": max(settings.film_search_rescore_window, hits_needed),
+            "query": {
+                "rescore_query": {
+                    "bool": {
+                        "should": [
+                            {
+                                "multi_match": {
+                                    "query": query,
+                                    "fields": settings.film_search_fields,
+                                    "type": "phrase",
+                                    "slop": 2
+                                }
+                            },
+                            {
+                                "function_score": {
+                                    "field_value_factor": {
+                                        "field": "imdb_rating",
+                                        "modifier": "log1p",
+                                        "missing": 0
+                                    }
+                                }
+                            }
+                        ]
+                    }
+                },
+                "query_weight": 1,
+                "rescore_query_weight": 1
+            }
+        }
+
+    @staticmethod
+    def _compile_filter(film_filter: FilmFilter) -> List[Dict[str, Any]]:
+        """
+        Собрать фильтры в условия filter-контекста bool-запроса.
+
+        Условия не влияют на релевантность, поэтому Elasticsearch
+        кеширует их битовыми масками сегментов; порядок условий и
+        значений в них фиксирован, чтобы равнозначные фильтры
+        давали одинаковый запрос.
+        """
+        clauses = []
+
+        if film_filter.genres:
+            if film_filter.genres_mode == 'all':
+                clauses += [{'term': {'genre_ids': genre_id}} for genre_id in film_filter.genres]
+            else:
+                clauses.append({'terms': {'genre_ids': list(film_filter.genres)}})
+
+        rating_range = {
+            bound: value
+            for bound, value in (('gte', film_filter.rating_from), ('lte', film_filter.rating_to))
+            if value is not None
+        }
+        if rating_range:
+            clauses.append({'range': {'imdb_rating': rating_range}})
+
+        if film_filter.persons:
+            clauses.append({
+                'bool': {
+                    'should': [
+                        {'terms': {field: list(film_filter.persons)}}
+                        for field in ('actor_ids', 'director_ids', 'writer_ids')
+                    ],
+                    'minimum_should_match': 1
+                }
+            })
+
+        return clauses
+
+    async def _search_faceted(self, body: Dict[str, Any], facets: Sequence[str],
+                              facets_only: bool) -> FilmFacetedList:
+        """Выполнить запрос страницы вместе с агрегациями фасетов"""
+        body = {
+            **body,
+            "aggs": {name: FACET_AGGREGATIONS[name] for name in facets},
+            "track_total_hits": True
+        }
+        if facets_only:
+            # Документы не нужны: Elasticsearch только считает агрегации
+            body.update({"from": 0, "size": 0})
+            body.pop("sort", None)
+            body.pop("rescore", None)
+
+        client = await self._get_client()
+        result = await client.search(index='movies', body=body)
+        aggregations = result['aggregations']
+
+        film_facets = {}
+        if 'genres' in aggregations:
+            film_facets['genres'] = [
+                {"id": bucket['key'], "count": bucket['doc_count']}
+                for bucket in aggregations['genres']['buckets']
+            ]
+        if 'rating_histogram' in aggregations:
+            film_facets['rating_histogram'] = [
+                {"rating": bucket['key'], "count": bucket['doc_count']}
+                for bucket in aggregations['rating_histogram']['buckets']
+            ]
+
+        return FilmFacetedList(
+            total=result['hits']['total']['value'],
+            items=[FilmList(**hit['_source']) for hit in result['hits']['hits']],
+            facets=FilmFacets(**film_facets)
+        )
@@ -1,14 +1,19 @@
 from typing import List, Optional
 
-from src.models.person import PersonSearch, PersonDetail, FilmByPerson
+from elasticsearch import NotFoundError
+from src.core.logger import api_logger as logger
+from src.models.person import PersonSearch, PersonDetail, FilmByPerson, PersonSuggestion
 from src.repositories.elastic_repository import ElasticsearchRepository
 
+# Alias, в который пишет ETL (etl_service/documents/person.py, Person.Index.name)
+PERSON_INDEX = 'person'
+
 
 class PersonRepository(ElasticsearchRepository):
     """Репозиторий для работы с персонами"""
 
     async def get_by_id(self, person_id: str) -> Optional[PersonDetail]:
-        data = await super().get_by_id('persons', person_id)
+        data = await super().get_by_id(PERSON_INDEX, person_id)
         return PersonDetail(**data) if data else None
 
     async def search(self, query: str, page: int, page_size: int) -> List[PersonSearch]:
@@ -17,17 +22,41 @@ class PersonRepository(ElasticsearchRepository):
             "size": page_size,
             "query": {"match": {"full_name": query}}
         }
-        data = await super().search('persons', body)
+        data = await super().search(PERSON_INDEX, body)
         return [PersonSearch(**item) for item in data]
 
+    async def suggest(self, prefix: str, size: int = 5) -> List[PersonSuggestion]:
+        body = {
+            "_source": ["id", "full_name"],
+            "suggest": {
+                "persons": {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": "full_name.suggest",
+                        "size": size,
+                        "skip_duplicates": True
+                    }
+                }
+            }
+        }
+        try:
+            client = await self._get_client()
+            result = await client.search(index=PERSON_INDEX, body=body)
+        except NotFoundError:
+            # Подсказки по фильмам отдаются и без персон, но отсутствие индекса — ошибка развёртывания
+            logger.error(f"Index {PERSON_INDEX} not found, person suggestions are unavailable")
+            return []
+        options = result['suggest']['persons'][0]['options']
+        return [PersonSuggestion(**option['_source']) for option in options]
+
     async def get_films_by_person(self, person_id: str) -> List[FilmByPerson]:
         body = {
             "query": {
                 "bool": {
                     "should": [
-                        {"term": {"actors_ids": person_id}},
-                        {"term": {"directors_ids": person_id}},
-                        {"term": {"writers_ids": person_id}}
+                        {"term": {"actor_ids": person_id}},
+                        {"term": {"director_ids": person_id}},
+                        {"term": {"writer_ids": person_id}}
                     ]
                 }
             },
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
-from src.models.film import FilmList, FilmDitail
+from src.models.film import FilmList, FilmDitail, FilmSuggestion, FilmFacetedList, FilmFilter
 from src.services.interfaces import FilmRepositoryInterface
 
 
@@ -24,16 +24,24 @@ class FilmService:
         return films if films else None
 
     async def get_sort_list_by_param(self, sort_field: str, sort_order: str = "asc",
-                                     page: int = 0, page_size: int = 10, genres: str = "") -> Optional[List[FilmList]]:
+                                     page: int = 0, page_size: int = 10, film_filter: FilmFilter | None = None,
+                                     facets: Sequence[str] = (), facets_only: bool = False
+                                     ) -> Optional[List[FilmList] | FilmFacetedList]:
         films = await self._film_repo.get_sorted(
-            sort_field, sort_order, page, page_size, genres=genres
+            sort_field, sort_order, page, page_size,
+            film_filter=film_filter, facets=facets, facets_only=facets_only
         )
         return films if films else None
 
-    async def get_search_list(self, query: str, page: int = 0, page_size: int = 10) -> Optional[List[FilmList]]:
-        films = await self._film_repo.search(query, page, page_size)
+    async def get_search_list(self, query: str, page: int = 0, page_size: int = 10,
+                              facets: Sequence[str] = (), facets_only: bool = False
+                              ) -> Optional[List[FilmList] | FilmFacetedList]:
+        films = await self._film_repo.search(query, page, page_size, facets, facets_only)
         return films if films else None
 
+    async def suggest(self, prefix: str, size: int = 5) -> List[FilmSuggestion]:
+        return await self._film_repo.suggest(prefix, size)
+
 
 def get_film_service() -> FilmService:
     """Factory function for FilmService dependency injection"""
@@ -36,7 +36,16 @@ class SortableRepository(BaseRepository[T, ID], ABC):
         pass
 
 
-class FilmRepositoryInterface(SearchableRepository, SortableRepository, ABC):
+class SuggestibleRepository(BaseRepository[T, ID], ABC):
+    """Интерфейс для репозиториев с подсказками по префиксу"""
+
+    @abstractmethod
+    async def suggest(self, prefix: str, size: int = 5) -> List[Any]:
+        """Подсказки по началу названия"""
+        pass
+
+
+class FilmRepositoryInterface(SearchableRepository, SortableRepository, SuggestibleRepository, ABC):
     """Интерфейс для репозитория фильмов"""
     pass
 
@@ -50,7 +59,7 @@ class GenreRepositoryInterface(BaseRepository[GenreDitail, str], ABC):
         pass
 
 
-class PersonRepositoryInterface(SearchableRepository, ABC):
+class PersonRepositoryInterface(SearchableRepository, SuggestibleRepository, ABC):
     """Интерфейс для репозитория персон"""
 
     @abstractmethod
@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from src.models.person import PersonSearch, PersonDetail, FilmByPerson
+from src.models.person import PersonSearch, PersonDetail, FilmByPerson, PersonSuggestion
 from src.services.base import SearchableService
 from src.services.interfaces import PersonRepositoryInterface
 
@@ -23,6 +23,9 @@ class PersonService(SearchableService):
         films = await self._person_repo.get_films_by_person(person_id)
         return films
 
+    async def suggest(self, prefix: str, size: int = 5) -> List[PersonSuggestion]:
+        return await self._person_repo.suggest(prefix, size)
+
 
 def get_person_service() -> PersonService:
     """Factory function for PersonService dependency injection"""
@@ -11,6 +11,63 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
 
+# Персоны индексируются так же, как в ETL (etl_service/documents/person.py и documents/analysis.py):
+# версия person_v1 за alias person со строгим маппингом и подсказками full_name.suggest
+PERSON_ALIAS = "person"
+PERSON_INDEX_SETTINGS = {
+    "analysis": {
+        "filter": {
+            "english_stop": {"type": "stop", "stopwords": "_english_"},
+            "english_stemmer": {"type": "stemmer", "language": "english"},
+            "english_possessive_stemmer": {"type": "stemmer", "language": "possessive_english"},
+            "russian_stop": {"type": "stop", "stopwords": "_russian_"},
+            "russian_stemmer": {"type": "stemmer", "language": "russian"}
+        },
+        "analyzer": {
+            "ru_en": {
+                "tokenizer": "standard",
+                "filter": [
+                    "lowercase",
+                    "english_stop",
+                    "english_stemmer",
+                    "english_possessive_stemmer",
+                    "russian_stop",
+                    "russian_stemmer"
+                ]
+            }
+        }
+    }
+}
+PERSON_MAPPINGS = {
+    "dynamic": "strict",
+    "properties": {
+        "id": {"type": "keyword"},
+        "full_name": {
+            "type": "text",
+            "analyzer": "ru_en",
+            "fields": {"suggest": {"type": "completion", "analyzer": "standard"}}
+        },
+        "films": {
+            "type": "nested",
+            "dynamic": "strict",
+            "properties": {
+                "uuid": {"type": "keyword"},
+                "roles": {"type": "keyword"}
+            }
+        },
+        "last_change_date": {"type": "keyword", "index": False, "doc_values": False}
+    }
+}
+
+
+async def delete_index(es: AsyncElasticsearch, index_name: str):
+    """Удаление индекса; для alias, созданного ETL, удаляются его физические индексы"""
+    if await es.indices.exists_alias(name=index_name):
+        aliased_indices = await es.indices.get_alias(name=index_name)
+        await es.indices.delete(index=','.join(aliased_indices))
+    elif await es.indices.exists(index=index_name):
+        await es.indices.delete(index=index_name)
+
 
 @pytest.fixture(scope="session")
 def client():
@@ -51,15 +108,34 @@ def setup_test_data(test_settings):
                 await asyncio.sleep(2)
 
         # Очистка индексов перед тестами
-        indices_to_clean = ["movies", "persons", "genres"]
+        indices_to_clean = ["movies", PERSON_ALIAS, "genres"]
 
         for index_name in indices_to_clean:
-            if await es.indices.exists(index=index_name):
-                await es.indices.delete(index=index_name)
+            await delete_index(es, index_name)
 
         # Создаем индексы с тестовыми данными
-        await es.indices.create(index="movies")
-        await es.indices.create(index="persons")
+        # Подполя suggest и keyword-поля id не выводятся динамическим маппингом,
+        # *_names, как и в ETL, только ищутся и в _source не хранятся
+        await es.indices.create(index="movies", mappings={
+            "_source": {"excludes": ["directors_names", "actors_names", "writers_names"]},
+            "properties": {
+                "title": {
+                    "type": "text",
+                    "fields": {"raw": {"type": "keyword"}, "suggest": {"type": "completion"}}
+                },
+                "imdb_rating": {"type": "float"},
+                **{
+                    ids_field: {"type": "keyword"}
+                    for ids_field in ("genre_ids", "director_ids", "actor_ids", "writer_ids")
+                }
+            }
+        })
+        await es.indices.create(
+            index=f"{PERSON_ALIAS}_v1",
+            settings=PERSON_INDEX_SETTINGS,
+            mappings=PERSON_MAPPINGS,
+            aliases={PERSON_ALIAS: {}}
+        )
         await es.indices.create(index="genres")
 
         # Добавляем тестовый фильм
@@ -93,9 +169,13 @@ def setup_test_data(test_settings):
             "writers": [
                 {"id": writer_uuid, "name": "Test Writer"}
             ],
-            "actors_ids": [actor_uuid],
-            "directors_ids": [director_uuid],
-            "writers_ids": [writer_uuid]
+            "directors_names": ["Test Director"],
+            "actors_names": ["Test Actor"],
+            "writers_names": ["Test Writer"],
+            "genre_ids": [genre_uuid],
+            "actor_ids": [actor_uuid],
+            "director_ids": [director_uuid],
+            "writer_ids": [writer_uuid]
         }
 
         # Добавляем второй фильм для тестов списка и поиска
@@ -117,9 +197,13 @@ def setup_test_data(test_settings):
             "writers": [
                 {"id": writer_uuid, "name": "Test Writer"}
             ],
-            "actors_ids": [actor_uuid],
-            "directors_ids": [director_uuid],
-            "writers_ids": [writer_uuid]
+            "directors_names": ["Test Director"],
+            "actors_names": ["Test Actor"],
+            "writers_names": ["Test Writer"],
+            "genre_ids": [genre_uuid],
+            "actor_ids": [actor_uuid],
+            "director_ids": [director_uuid],
+            "writer_ids": [writer_uuid]
         }
 
         # Добавляем тестовые персоны
@@ -127,8 +211,8 @@ def setup_test_data(test_settings):
             "id": actor_uuid,
             "full_name": "Test Actor",
             "films": [
-                {"id": film_uuid, "title": "Test Film", "imdb_rating": 8.5, "roles": "actor"},
-                {"id": film_uuid2, "title": "Another Test Movie", "imdb_rating": 7.2, "roles": "actor"}
+                {"uuid": film_uuid, "roles": "actor"},
+                {"uuid": film_uuid2, "roles": "actor"}
             ]
         }
 
@@ -136,8 +220,8 @@ def setup_test_data(test_settings):
             "id": director_uuid,
             "full_name": "Test Director",
             "films": [
-                {"id": film_uuid, "title": "Test Film", "imdb_rating": 8.5, "roles": "director"},
-                {"id": film_uuid2, "title": "Another Test Movie", "imdb_rating": 7.2, "roles": "director"}
+                {"uuid": film_uuid, "roles": "director"},
+                {"uuid": film_uuid2, "roles": "director"}
             ]
         }
 
@@ -145,22 +229,22 @@ def setup_test_data(test_settings):
             "id": writer_uuid,
             "full_name": "Test Writer",
             "films": [
-                {"id": film_uuid, "title": "Test Film", "imdb_rating": 8.5, "roles": "writer"},
-                {"id": film_uuid2, "title": "Another Test Movie", "imdb_rating": 7.2, "roles": "writer"}
+                {"uuid": film_uuid, "roles": "writer"},
+                {"uuid": film_uuid2, "roles": "writer"}
             ]
         }
 
         # Индексируем тестовые данные
         await es.index(index="movies", id=film_uuid, body=test_film)
         await es.index(index="movies", id=film_uuid2, body=test_film2)
-        await es.index(index="persons", id=actor_uuid, body=test_person)
-        await es.index(index="persons", id=director_uuid, body=test_director)
-        await es.index(index="persons", id=writer_uuid, body=test_writer)
+        await es.index(index=PERSON_ALIAS, id=actor_uuid, body=test_person)
+        await es.index(index=PERSON_ALIAS, id=director_uuid, body=test_director)
+        await es.index(index=PERSON_ALIAS, id=writer_uuid, body=test_writer)
         await es.index(index="genres", id=genre_uuid, body=test_genre)
 
         # Принудительное обновление индексов
         await es.indices.refresh(index="movies")
-        await es.indices.refresh(index="persons")
+        await es.indices.refresh(index=PERSON_ALIAS)
         await es.indices.refresh(index="genres")
 
         # Проверяем, что данные успешно проиндексированы
@@ -169,7 +253,7 @@ def setup_test_data(test_settings):
             if not result['found']:
                 raise Exception(f"Failed to index test film with UUID: {film_uuid}")
 
-            person_result = await es.get(index="persons", id=actor_uuid)
+            person_result = await es.get(index=PERSON_ALIAS, id=actor_uuid)
             if not person_result['found']:
                 raise Exception(f"Failed to index test person with UUID: {actor_uuid}")
         except Exception as e:
@@ -200,10 +284,9 @@ def cleanup_test_data(test_settings):
 
         try:
             # Удаляем тестовые индексы
-            indices_to_clean = ["movies", "persons", "genres"]
+            indices_to_clean = ["movies", PERSON_ALIAS, "genres"]
             for index_name in indices_to_clean:
-                if await es.indices.exists(index=index_name):
-                    await es.indices.delete(index=index_name)
+                await delete_index(es, index_name)
         except Exception:
             # Игнорируем ошибки при очистке, так как это может нарушить CI/CD
             pass
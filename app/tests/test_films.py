@@ -1,4 +1,5 @@
-import pytest
+from uuid import uuid4
+
 from fastapi import status
 from fastapi.testclient import TestClient
 
@@ -69,9 +70,47 @@ class TestFilmEndpoints:
 
     def test_film_list_with_genre_filter(self, client: TestClient, setup_test_data):
         """Тест фильтрации списка фильмов по жанру"""
-        # Пропускаем этот тест, так как он требует nested структуру в Elasticsearch
-        # которая не настроена в тестовом окружении
-        pytest.skip("Genre filter requires nested Elasticsearch mapping")
+        genre_uuid = setup_test_data["genre_uuid"]
+        response = client.get(f"/api/v1/films/?genres={genre_uuid}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 2
+
+    def test_film_list_with_any_of_genres(self, client: TestClient, setup_test_data):
+        """Тест фильтрации по любому из нескольких жанров"""
+        genre_uuid = setup_test_data["genre_uuid"]
+        response = client.get(f"/api/v1/films/?genres={uuid4()},{genre_uuid}&genres_mode=any")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 2
+
+    def test_film_list_with_all_genres(self, client: TestClient, setup_test_data):
+        """Тест фильтрации по всем жанрам сразу"""
+        genre_uuid = setup_test_data["genre_uuid"]
+        response = client.get(f"/api/v1/films/?genres={uuid4()},{genre_uuid}&genres_mode=all")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_film_list_with_rating_range(self, client: TestClient, setup_test_data):
+        """Тест фильтрации по диапазону рейтинга"""
+        response = client.get("/api/v1/films/?rating_from=8&rating_to=9")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [film["title"] for film in response.json()] == ["Test Film"]
+
+    def test_film_list_with_person_filter(self, client: TestClient, setup_test_data):
+        """Тест фильтрации по персоне"""
+        writer_uuid = setup_test_data["writer_uuid"]
+        response = client.get(f"/api/v1/films/?persons={writer_uuid}&rating_to=8")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [film["title"] for film in response.json()] == ["Another Test Movie"]
+
+    def test_film_list_invalid_rating_range(self, client: TestClient):
+        """Тест фильтра с минимальным рейтингом больше максимального"""
+        response = client.get("/api/v1/films/?rating_from=9&rating_to=8")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
     def test_film_list_not_found(self, client: TestClient):
         """Тест получения ошибки 404 когда фильмы не найдены"""
@@ -80,6 +119,45 @@ class TestFilmEndpoints:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.json()["detail"] == "film not found"
 
+    def test_film_list_with_facets(self, client: TestClient, setup_test_data):
+        """Тест списка фильмов с фасетами"""
+        response = client.get("/api/v1/films/?facets=rating_histogram,genres")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] == 2
+        assert len(data["items"]) == 2
+        assert data["facets"]["genres"] == [{"id": setup_test_data["genre_uuid"], "count": 2}]
+        histogram = {bucket["rating"]: bucket["count"] for bucket in data["facets"]["rating_histogram"]}
+        assert histogram[8.0] == 1
+        assert histogram[7.0] == 1
+        assert histogram[0.0] == 0
+
+    def test_film_list_facets_only(self, client: TestClient, setup_test_data):
+        """Тест получения только фасетов без фильмов"""
+        response = client.get("/api/v1/films/?facets=genres&facets_only=true")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["items"] == []
+        assert data["facets"]["genres"][0]["count"] == 2
+        assert data["facets"]["rating_histogram"] is None
+
+    def test_film_search_with_facets(self, client: TestClient, setup_test_data):
+        """Тест поиска фильмов с фасетами"""
+        response = client.get("/api/v1/films/search?query=Another&facets=genres")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [film["title"] for film in data["items"]] == ["Another Test Movie"]
+        assert data["facets"]["genres"][0]["count"] == 1
+
+    def test_film_list_unknown_facet(self, client: TestClient):
+        """Тест запроса неизвестного фасета"""
+        response = client.get("/api/v1/films/?facets=countries")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
     def test_film_search_success(self, client: TestClient):
         """Тест успешного поиска фильмов"""
         response = client.get("/api/v1/films/search?query=Test")
@@ -92,6 +170,27 @@ class TestFilmEndpoints:
             assert "title" in film
             assert "imdb_rating" in film
 
+    def test_film_search_by_actor_name(self, client: TestClient, setup_test_data):
+        """Тест поиска фильмов по имени актёра"""
+        response = client.get("/api/v1/films/search?query=Actor")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {film["title"] for film in response.json()} == {"Test Film", "Another Test Movie"}
+
+    def test_film_search_by_description(self, client: TestClient, setup_test_data):
+        """Тест поиска фильмов по описанию"""
+        response = client.get("/api/v1/films/search?query=functional")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [film["title"] for film in response.json()] == ["Test Film"]
+
+    def test_film_search_title_ranked_first(self, client: TestClient, setup_test_data):
+        """Тест: совпадение в названии важнее совпадения в описании"""
+        response = client.get("/api/v1/films/search?query=Another Test Movie")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()[0]["title"] == "Another Test Movie"
+
     def test_film_search_with_pagination(self, client: TestClient):
         """Тест поиска фильмов с пагинацией"""
         response = client.get("/api/v1/films/search?query=Test&page_size=1&page_number=0")
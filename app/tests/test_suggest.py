@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from elasticsearch import AsyncElasticsearch
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def missing_persons_index(test_settings, setup_test_data):
+    """Убрать alias персон на время теста, как будто ETL ещё не создал индекс"""
+    hosts = [f"http://{test_settings.elastic_host}:{test_settings.elastic_port}"]
+    alias = {"index": "person_v1", "alias": "person"}
+
+    async def update_alias(action: str):
+        es = AsyncElasticsearch(hosts=hosts)
+        try:
+            await es.indices.update_aliases(actions=[{action: alias}])
+        finally:
+            await es.close()
+
+    asyncio.run(update_alias("remove"))
+    yield
+    asyncio.run(update_alias("add"))
+
+
+class TestSuggestEndpoints:
+    """Тесты для endpoint'а подсказок"""
+
+    def test_suggest_all_success(self, client: TestClient, setup_test_data):
+        """Тест подсказок по фильмам и персонам"""
+        response = client.get("/api/v1/suggest?prefix=Tes")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [film["title"] for film in data["films"]] == ["Test Film"]
+        assert {person["full_name"] for person in data["persons"]} == {"Test Actor", "Test Director", "Test Writer"}
+
+    def test_suggest_films_only(self, client: TestClient, setup_test_data):
+        """Тест подсказок только по фильмам"""
+        response = client.get("/api/v1/suggest?prefix=anoth&suggest_type=films")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["persons"] == []
+        assert data["films"][0]["title"] == "Another Test Movie"
+        assert data["films"][0]["imdb_rating"] == 7.2
+
+    def test_suggest_size(self, client: TestClient, setup_test_data):
+        """Тест ограничения числа подсказок"""
+        response = client.get("/api/v1/suggest?prefix=Test&suggest_type=persons&size=1")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["persons"]) == 1
+
+    def test_suggest_not_found(self, client: TestClient, setup_test_data):
+        """Тест подсказок с пустым результатом"""
+        response = client.get("/api/v1/suggest?prefix=xyz123")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "suggestions not found"
+
+    def test_suggest_without_persons_index(self, client: TestClient, missing_persons_index, caplog):
+        """Тест подсказок, когда индекса персон нет: фильмы отдаются, ошибка пишется в лог"""
+        response = client.get("/api/v1/suggest?prefix=Tes")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["persons"] == []
+        assert [film["title"] for film in data["films"]] == ["Test Film"]
+        assert "Index person not found" in caplog.text
+
+    def test_suggest_unknown_type(self, client: TestClient):
+        """Тест подсказок с неизвестным типом"""
+        response = client.get("/api/v1/suggest?prefix=Tes&suggest_type=genres")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_suggest_empty_prefix(self, client: TestClient):
+        """Тест подсказок с пустым префиксом"""
+        response = client.get("/api/v1/suggest?prefix=")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,406 @@
+"""
+Асинхронный ETL-процесс Postgres -> Elasticsearch
+"""
+import asyncio
+import sys
+from contextlib import AbstractContextManager, asynccontextmanager, nullcontext
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterable, Callable, Iterable
+
+import orjson
+import psycopg
+import pytz
+from dateutil import parser
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk
+from elasticsearch.serializer import OrjsonSerializer
+from psycopg.conninfo import make_conninfo
+from psycopg.types.json import set_json_loads
+from psycopg_pool import AsyncConnectionPool
+
+from documents.index_row import IndexRow
+from documents.movie import Movie
+from documents.movie_renames import RenamedEntity, aget_last_modified
+from helpers.backoff_func_wrapper import backoff
+from logger import logger
+from metrics import metrics
+from runner import (
+    MOVIES_PIPELINE,
+    PIPELINES,
+    RENAME_FAN_OUTS,
+    IndexPipeline,
+    advance_sync_state,
+    create_dead_letter_storage,
+    create_state_storage,
+    migrate_index_version,
+    record_rejected,
+    rewind_sync_state,
+)
+from services.elasticsearch_index_manager import ElasticsearchIndexManager
+from services.elasticsearch_service import BulkRetries, ElasticsearchService
+from settings import settings
+from state_manager.content_hash_storage import ContentHashStorage
+from state_manager.state_manager import StateManager
+
+
+async def configure_async_connection(connection: psycopg.AsyncConnection):
+    set_json_loads(orjson.loads, connection)
+
+
+@asynccontextmanager
+async def in_thread(context_manager: AbstractContextManager) -> AsyncGenerator[Any, None]:
+    """Выполнить вход и выход синхронного контекстного менеджера вне цикла событий."""
+    value = await asyncio.to_thread(context_manager.__enter__)
+    try:
+        yield value
+    except BaseException:
+        if not await asyncio.to_thread(context_manager.__exit__, *sys.exc_info()):
+            raise
+    else:
+        await asyncio.to_thread(context_manager.__exit__, None, None, None)
+
+
+class AsyncEtlRunner:
+    """
+    ETL-процесс на asyncio.
+
+    Индексы обновляются параллельными задачами в одном цикле событий: чтение
+    из Postgres асинхронными серверными курсорами перекрывается с отправкой в
+    Elasticsearch, причём одновременно выполняется до bulk_concurrency запросов _bulk.
+
+    Управление версиями индексов редкое и остаётся синхронным, оно выполняется
+    в отдельном потоке. Событийный режим LISTEN/NOTIFY, координация экземпляров
+    и параллельная полная переиндексация доступны в синхронном EtlRunner.
+    """
+
+    def __init__(self):
+        etl_settings = settings.etl_settings
+        es_settings = settings.elasticsearch_settings
+        database_settings = settings.database_settings
+
+        if etl_settings.coordination_enabled:
+            raise ValueError("Асинхронный ETL не поддерживает координацию экземпляров (ETL_COORDINATION_ENABLED)")
+        if etl_settings.raw_bulk:
+            logger.warning(
+                "⚠️ ETL_RAW_BULK не поддерживается асинхронным ETL, "
+                "документы отправляются через async_streaming_bulk"
+            )
+
+        self.es = AsyncElasticsearch(
+            hosts=[es_settings.get_host()],
+            connections_per_node=es_settings.connections_per_node,
+            request_timeout=es_settings.request_timeout,
+            max_retries=es_settings.max_retries,
+            retry_on_timeout=True,
+            serializer=OrjsonSerializer(),
+        )
+
+        # Синхронный клиент нужен только менеджеру индексов
+        self.sync_es_service = ElasticsearchService()
+        self.sync_es_service.create_connection([es_settings.get_host()])
+        self.index_manager = ElasticsearchIndexManager(
+            self.sync_es_service.get_connection(), etl_settings.force_merge_max_segments
+        )
+        self.state_manager = StateManager(create_state_storage())
+
+        self.db_pool = AsyncConnectionPool(
+            make_conninfo(**database_settings.get_dsn()),
+            min_size=database_settings.pool_min_size,
+            max_size=database_settings.pool_max_size,
+            check=AsyncConnectionPool.check_connection,
+            configure=configure_async_connection,
+            name='etl-async',
+            open=False,
+        )
+
+        self.content_hashes = None
+        if etl_settings.content_hash_enabled:
+            self.content_hashes = ContentHashStorage(logger, etl_settings.content_hash_path)
+
+        self.dead_letters = create_dead_letter_storage()
+
+        self._verified_indices: dict[str, str] = {}
+
+    async def run(self, full: bool = False):
+        await self.db_pool.open()
+
+        while True:
+            try:
+                await self.run_cycle(full)
+                full = False
+                metrics.finish_cycle()
+            except Exception as e:
+                self._verified_indices.clear()
+                logger.exception(e)
+
+            await asyncio.sleep(settings.etl_settings.poll_interval)
+
+    async def close(self):
+        await self.db_pool.close()
+        await self.es.close()
+        self.sync_es_service.get_connection().close()
+        if self.content_hashes is not None:
+            self.content_hashes.close()
+        self.dead_letters.close()
+
+    async def run_cycle(self, full: bool = False):
+        """Обновить все индексы параллельными задачами."""
+        results = await asyncio.gather(
+            *(self._update_pipeline(pipeline, full) for pipeline in PIPELINES),
+            return_exceptions=True,
+        )
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            logger.error(f"❌ Ошибка асинхронного обновления индекса: {error}")
+        if errors:
+            raise errors[0]
+
+    async def _update_pipeline(self, pipeline: IndexPipeline, full: bool):
+        await self.update_index(pipeline, full)
+        if pipeline is MOVIES_PIPELINE:
+            await self.update_movie_renames()
+
+    async def update_index(self, pipeline: IndexPipeline, full: bool = False):
+        try:
+            if await self.ensure_index(pipeline):
+                return
+
+            last_sync_state = self._get_sync_state(pipeline.state_key)
+            if last_sync_state is None or full:
+                last_sync_state = pytz.UTC.localize(datetime.min)
+
+            # Без синхронного подсчёта изменений режим массовой загрузки включается только для --full
+            bulk_load = self.index_manager.bulk_load_mode(pipeline.document_class) if full else nullcontext()
+
+            async with self.db_pool.connection() as connection:
+                async with in_thread(bulk_load):
+                    last_sync_state = await self._index_batches(
+                        pipeline,
+                        pipeline.aget_index_data(connection, last_sync_state, 100),
+                        last_sync_state,
+                        skip_unchanged=not full,
+                    )
+
+            self.state_manager.set_state(pipeline.state_key, last_sync_state.isoformat())
+            logger.info(f"✅ Обновление индекса {pipeline.title} завершено успешно")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при обновлении индекса {pipeline.title}: {e}")
+            raise
+
+    async def ensure_index(self, pipeline: IndexPipeline) -> bool:
+        """
+        Проверить индекс, если его описание ещё не проверялось.
+
+        Returns:
+            True если индекс был перестроен и уже содержит актуальные данные
+        """
+        document_class = pipeline.document_class
+        alias = document_class.Index.name
+        mapping_version = self.index_manager.get_mapping_version(document_class)
+
+        if self._verified_indices.get(alias) == mapping_version:
+            return False
+
+        if await asyncio.to_thread(self.index_manager.ensure_index_exists, document_class):
+            self._forget_all_hashes(alias)
+
+        rebuilt = False
+        if await asyncio.to_thread(self.index_manager.index_needs_recreation, document_class):
+            await self.rebuild_index(pipeline)
+            rebuilt = True
+        else:
+            await asyncio.to_thread(self.index_manager.apply_dynamic_settings, document_class)
+
+        self._verified_indices[alias] = mapping_version
+        return rebuilt
+
+    async def rebuild_index(self, pipeline: IndexPipeline):
+        """Blue/green перестроение индекса, как в EtlRunner.rebuild_index."""
+        async with self.db_pool.connection() as connection:
+            started_at = (await (await connection.execute('SELECT now()')).fetchone())[0]
+
+        if await asyncio.to_thread(migrate_index_version, self.index_manager, pipeline):
+            rewind_sync_state(self.state_manager, pipeline, started_at)
+            self._forget_all_hashes(pipeline.document_class.Index.name)
+            return
+
+        document_class = pipeline.document_class
+        last_sync_state = pytz.UTC.localize(datetime.min)
+        self._forget_all_hashes(document_class.Index.name)
+
+        async with in_thread(self.index_manager.building_index_version(document_class)) as target_index:
+            async with self.db_pool.connection() as connection:
+                last_sync_state = await self._index_batches(
+                    pipeline,
+                    pipeline.aget_index_data(connection, last_sync_state, 100),
+                    last_sync_state,
+                    target_index,
+                    skip_unchanged=False,
+                )
+
+            await asyncio.to_thread(self.index_manager.activate_index_version, document_class, target_index)
+        self.state_manager.set_state(pipeline.state_key, last_sync_state.isoformat())
+        await asyncio.to_thread(self.index_manager.cleanup_index_versions, document_class)
+        logger.info(f"✅ Индекс {document_class.Index.name} перестроен в {target_index}")
+
+    async def update_movie_renames(self):
+        """Распространить переименования персон и жанров на документы фильмов."""
+        try:
+            async with self.db_pool.connection() as connection:
+                for fan_out in RENAME_FAN_OUTS:
+                    last_sync_state = self._get_sync_state(fan_out.state_key)
+
+                    if last_sync_state is None:
+                        last_modified = await aget_last_modified(connection, fan_out.table)
+                        if last_modified is not None:
+                            self.state_manager.set_state(
+                                fan_out.state_key, pytz.UTC.localize(last_modified).isoformat()
+                            )
+                        continue
+
+                    async for renames in fan_out.aget_renames(connection, last_sync_state, 100):
+                        await self._apply_renames(renames, fan_out.build_actions)
+                        last_sync_state = advance_sync_state(last_sync_state, renames)
+
+                    self.state_manager.set_state(fan_out.state_key, last_sync_state.isoformat())
+
+            logger.info("✅ Переименования персон и жанров распространены на фильмы")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при обновлении имён в индексе фильмов: {e}")
+            raise
+
+    async def _apply_renames(self, renames: list[RenamedEntity], build_actions: Callable):
+        await self._bulk(Movie.Index.name, list(build_actions(renames)), ignore_status=(404,))
+        self._forget_hashes(Movie.Index.name, (film_work_id for item in renames for film_work_id in item.film_work_ids))
+
+    async def _index_batches(
+            self,
+            pipeline: IndexPipeline,
+            batches: AsyncIterable[list[IndexRow]],
+            last_sync_state: datetime,
+            index_name: str | None = None,
+            skip_unchanged: bool = True,
+    ) -> datetime:
+        """
+        Проиндексировать пачки документов и вернуть новую отметку синхронизации.
+
+        Следующая пачка читается из Postgres, пока предыдущие ещё отправляются:
+        одновременно выполняется не больше bulk_concurrency запросов _bulk.
+        """
+        semaphore = asyncio.Semaphore(settings.etl_settings.bulk_concurrency)
+        in_flight: set[asyncio.Task] = set()
+
+        try:
+            async for rows in metrics.abatches(pipeline.document_class.Index.name, batches):
+                last_sync_state = advance_sync_state(last_sync_state, rows)
+
+                rows = self._filter_unchanged(pipeline, rows, skip_unchanged)
+                if not rows:
+                    continue
+
+                await semaphore.acquire()
+                task = asyncio.create_task(self._bulk_index_rows(pipeline, rows, index_name, semaphore))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            await asyncio.gather(*in_flight)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+
+        return last_sync_state
+
+    async def _bulk_index_rows(
+            self,
+            pipeline: IndexPipeline,
+            rows: list[IndexRow],
+            index_name: str | None,
+            semaphore: asyncio.Semaphore,
+    ):
+        alias = pipeline.document_class.Index.name
+        target_index = index_name or alias
+
+        # Документы сериализуются здесь, а в тело _bulk вставляются как есть (orjson.Fragment):
+        # так размер тела известен без повторной сериализации
+        with metrics.stage(alias, 'transform'):
+            sources = [(str(row.id), orjson.dumps(row.document)) for row in rows]
+
+        try:
+            with metrics.stage(alias, 'bulk'):
+                rejected_ids = await self._bulk(
+                    alias,
+                    [
+                        {'_index': target_index, '_id': doc_id, '_source': orjson.Fragment(source)}
+                        for doc_id, source in sources
+                    ],
+                )
+        finally:
+            semaphore.release()
+
+        metrics.record_bulk(alias, len(rows), sum(len(source) for _, source in sources), len(rejected_ids))
+        accepted_dates = [row.last_change_date for row in rows if str(row.id) not in rejected_ids]
+        if accepted_dates:
+            metrics.record_change_date(alias, max(accepted_dates))
+
+        if self.content_hashes is not None:
+            self.content_hashes.save(
+                alias, {str(row.id): row.content_hash for row in rows if str(row.id) not in rejected_ids}
+            )
+        logger.info(f"✅ Индекс {target_index}: проиндексировано {len(rows) - len(rejected_ids)} документов")
+
+    async def _bulk(self, alias: str, actions: list[dict], ignore_status: tuple[int, ...] = ()) -> set[str]:
+        """
+        Отправить операции в _bulk, отклонённые сохранить в очередь недоставленных.
+
+        Операции, отклонённые с временными статусами, повторяются по тем же правилам,
+        что и в ElasticsearchService (BulkRetries).
+
+        Returns:
+            id отклонённых документов
+        """
+        es_settings = settings.elasticsearch_settings
+        retries = BulkRetries(
+            actions, ignore_status, es_settings.bulk_retries, es_settings.retry_backoff, es_settings.retry_max_backoff
+        )
+        while retries.pending:
+            await asyncio.sleep(retries.handle(await self._send_actions(retries.pending, ignore_status)))
+
+        return record_rejected(self.dead_letters, alias, retries.rejected)
+
+    # Сбои соединения повторяются так же, как в ElasticsearchService._send_actions
+    @backoff(0.1, 2, 10, logger, max_retries=10, jitter=True)
+    async def _send_actions(self, actions: list[dict], ignore_status: tuple[int, ...]) -> list[dict]:
+        """Отправить операции и вернуть ответ Elasticsearch по каждой из них в том же порядке."""
+        results = async_streaming_bulk(
+            self.es,
+            actions,
+            chunk_size=max(len(actions), 1),
+            raise_on_error=False,
+            ignore_status=ignore_status,
+        )
+        return [next(iter(info.values())) async for _, info in results]
+
+    def _filter_unchanged(self, pipeline: IndexPipeline, rows: list[IndexRow], skip_unchanged: bool) -> list[IndexRow]:
+        if self.content_hashes is None or not skip_unchanged:
+            return rows
+
+        alias = pipeline.document_class.Index.name
+        with metrics.stage(alias, 'transform'):
+            changed_ids = self.content_hashes.filter_changed(alias, {str(row.id): row.content_hash for row in rows})
+        return [row for row in rows if str(row.id) in changed_ids]
+
+    def _forget_hashes(self, index_name: str, doc_ids: Iterable):
+        if self.content_hashes is not None:
+            self.content_hashes.delete(index_name, doc_ids)
+
+    def _forget_all_hashes(self, index_name: str):
+        if self.content_hashes is not None:
+            self.content_hashes.clear(index_name)
+
+    def _get_sync_state(self, state_key: str) -> datetime | None:
+        last_sync_state = self.state_manager.get_state(state_key)
+        return parser.isoparse(last_sync_state) if last_sync_state is not None else None
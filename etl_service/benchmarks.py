@@ -0,0 +1,104 @@
+"""
+Замеры запросов к индексу фильмов.
+
+Запросы выполняются с отключённым request cache, время берётся из поля took
+ответа Elasticsearch, поэтому сетевые задержки клиента в замер не попадают.
+Сравниваются версии индекса (например, movies_v3 до и movies_v4 после смены
+настроек), которые cleanup_index_versions оставляет для отката. Перед замерами
+в лог пишется размер каждой версии на диске.
+"""
+import statistics
+
+from elasticsearch import Elasticsearch
+from logger import logger
+
+PAGE_SIZE = 50
+SEARCH_FIELDS = ['title^3', 'actors_names^2', 'directors_names^2', 'writers_names', 'description']
+# Поля, которые API запрашивает для списков фильмов
+LIST_SOURCE = ['id', 'title', 'imdb_rating', 'genres', 'directors', 'actors', 'writers']
+
+
+def listing_queries(es: Elasticsearch, index_name: str) -> dict[str, dict]:
+    """Запросы списка фильмов API: без фильтра, с фильтром по самому частому жанру и поиск."""
+    top_rated = {
+        '_source': LIST_SOURCE,
+        'size': PAGE_SIZE,
+        'sort': [{'imdb_rating': {'order': 'desc'}}],
+        'track_total_hits': False,
+    }
+    queries = {
+        'список по -imdb_rating': top_rated,
+        'список по title.raw': {**top_rated, 'sort': [{'title.raw': {'order': 'asc'}}]},
+    }
+
+    genre_id = _most_common_genre(es, index_name)
+    if genre_id is None:
+        logger.warning(f"⚠️ В индексе {index_name} нет genre_ids, запрос с фильтром по жанру пропущен")
+    else:
+        queries['жанр, список по -imdb_rating'] = {
+            **top_rated,
+            'query': {'bool': {'filter': [{'term': {'genre_ids': genre_id}}]}},
+        }
+
+    title = _top_rated_title(es, index_name)
+    if title is not None:
+        queries['поиск по названию лучшего фильма'] = {
+            '_source': LIST_SOURCE,
+            'size': PAGE_SIZE,
+            'query': {'multi_match': {'query': title, 'fields': SEARCH_FIELDS, 'type': 'best_fields'}},
+        }
+    return queries
+
+
+def report_index_sizes(es: Elasticsearch, index_names: list[str]) -> None:
+    """Записать в лог размер первичных шардов, число документов и сегментов каждого индекса."""
+    for index_name in index_names:
+        stats = es.indices.stats(index=index_name, metric=['docs', 'store', 'segments'])
+        primaries = stats['_all']['primaries']
+        docs = primaries['docs']['count']
+        size = primaries['store']['size_in_bytes']
+        logger.info(
+            f"{index_name}: {size / 2 ** 20:.1f} МБ, {docs} документов "
+            f"({size / docs if docs else 0:.0f} байт на документ), "
+            f"{primaries['segments']['count']} сегментов"
+        )
+
+
+def benchmark(es: Elasticsearch, index_names: list[str], queries: dict[str, dict], runs: int = 20) -> None:
+    """
+    Выполнить каждый запрос на каждом индексе runs раз и записать в лог медиану и p95 took.
+
+    Первый прогон прогревает кеши файловой системы и в статистику не входит.
+    """
+    for title, body in queries.items():
+        for index_name in index_names:
+            es.search(index=index_name, request_cache=False, **body)
+            took = sorted(
+                es.search(index=index_name, request_cache=False, **body)['took']
+                for _ in range(runs)
+            )
+            p95 = took[min(len(took) - 1, round(len(took) * 0.95))]
+            logger.info(
+                f"{title} | {index_name}: медиана {statistics.median(took):.1f} мс, p95 {p95} мс"
+            )
+
+
+def benchmark_listing(es: Elasticsearch, index_names: list[str], runs: int = 20) -> None:
+    report_index_sizes(es, index_names)
+    benchmark(es, index_names, listing_queries(es, index_names[0]), runs)
+
+
+def _most_common_genre(es: Elasticsearch, index_name: str) -> str | None:
+    response = es.search(
+        index=index_name,
+        size=0,
+        aggs={'genres': {'terms': {'field': 'genre_ids', 'size': 1}}},
+    )
+    buckets = response['aggregations']['genres']['buckets']
+    return buckets[0]['key'] if buckets else None
+
+
+def _top_rated_title(es: Elasticsearch, index_name: str) -> str | None:
+    response = es.search(index=index_name, size=1, _source=['title'], sort=[{'imdb_rating': {'order': 'desc'}}])
+    hits = response['hits']['hits']
+    return hits[0]['_source']['title'] if hits else None
@@ -0,0 +1,34 @@
+"""
+Общий анализ текста для всех индексов.
+
+Публикуется в Elasticsearch один раз компонентным шаблоном, который подключают
+шаблоны индексов movies, person и genres (см. ElasticsearchIndexManager.ensure_templates).
+"""
+
+ANALYSIS_COMPONENT_TEMPLATE = 'etl_analysis'
+
+ANALYSIS = {
+    'filter': {
+        'english_stop': {'type': 'stop', 'stopwords': '_english_'},
+        'english_stemmer': {'type': 'stemmer', 'language': 'english'},
+        'english_possessive_stemmer': {
+            'type': 'stemmer',
+            'language': 'possessive_english',
+        },
+        'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
+        'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
+    },
+    'analyzer': {
+        'ru_en': {
+            'tokenizer': 'standard',
+            'filter': [
+                'lowercase',
+                'english_stop',
+                'english_stemmer',
+                'english_possessive_stemmer',
+                'russian_stop',
+                'russian_stemmer',
+            ],
+        }
+    },
+}
@@ -1,23 +1,22 @@
 from datetime import datetime
-from typing import Generator
+from typing import AsyncGenerator, Generator, Iterable
+from uuid import UUID
 
 import psycopg
+from documents.index_row import IndexRow, afetch_index_rows, fetch_index_rows
 from elasticsearch_dsl import (
     Document,
     Keyword,
     MetaField,
     Text,
 )
-from psycopg import ServerCursor
-from psycopg.conninfo import make_conninfo
-from psycopg.rows import class_row
 
 
 class Genre(Document):
     id = Keyword()
     name = Text(analyzer='ru_en')
     description = Text(analyzer='ru_en')
-    last_change_date = Keyword(index=False)
+    last_change_date = Keyword(index=False, doc_values=False)
 
     class Meta:
         dynamic = MetaField('strict')
@@ -26,52 +25,65 @@ class Genre(Document):
         name = 'genres'
         settings = {
             'refresh_interval': '1s',
-            'analysis': {
-                'filter': {
-                    'english_stop': {'type': 'stop', 'stopwords': '_english_'},
-                    'english_stemmer': {'type': 'stemmer', 'language': 'english'},
-                    'english_possessive_stemmer': {
-                        'type': 'stemmer',
-                        'language': 'possessive_english',
-                    },
-                    'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
-                    'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
-                },
-                'analyzer': {
-                    'ru_en': {
-                        'tokenizer': 'standard',
-                        'filter': [
-                            'lowercase',
-                            'english_stop',
-                            'english_stemmer',
-                            'english_possessive_stemmer',
-                            'russian_stop',
-                            'russian_stemmer',
-                        ],
-                    }
-                },
-            },
+            # Жанров единицы: один шард без разбиения запросов, копия на каждом узле,
+            # чтобы чтение не уходило по сети
+            'number_of_shards': 1,
+            'auto_expand_replicas': '0-all',
         }
 
 
-def get_genres_index_data(
-        database_settings: dict,
-        last_sync_state: datetime,
-        batch_size: int = 100
-) -> Generator[list[Genre], None, None]:
-    dsn = make_conninfo(**database_settings)
-
-    with psycopg.connect(dsn, row_factory=class_row(Genre)) as conn, ServerCursor(conn, 'fetcher') as cursor:
-        query = """
+GENRES_SQL = """
                     SELECT 
                         id, 
                         name, 
                         description, 
                         modified AS last_change_date
                     FROM content.genre
-                    WHERE modified >= %s
+                    WHERE {condition}
                 """
-        cursor.execute(query, (last_sync_state,))
 
-        while results := cursor.fetchmany(size=batch_size):
-            yield results
+
+def get_genres_index_data(
+        connection: psycopg.Connection,
+        last_sync_state: datetime,
+        batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = GENRES_SQL.format(condition='modified >= %s')
+    yield from fetch_index_rows(connection, query, (last_sync_state,), batch_size)
+
+
+async def aget_genres_index_data(
+        connection: psycopg.AsyncConnection,
+        last_sync_state: datetime,
+        batch_size: int = 100
+) -> AsyncGenerator[list[IndexRow], None]:
+    query = GENRES_SQL.format(condition='modified >= %s')
+    async for rows in afetch_index_rows(connection, query, (last_sync_state,), batch_size):
+        yield rows
+
+
+def count_genres_index_data(connection: psycopg.Connection, last_sync_state: datetime) -> int:
+    """Количество жанров, которые будут переиндексированы с момента last_sync_state."""
+    row = connection.execute(
+        'SELECT count(*) FROM content.genre WHERE modified >= %s', (last_sync_state,)
+    ).fetchone()
+    return row[0]
+
+
+def get_genres_index_data_by_ids(
+        connection: psycopg.Connection,
+        genre_ids: Iterable[str],
+        batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = GENRES_SQL.format(condition='id = ANY(%s::uuid[])')
+    yield from fetch_index_rows(connection, query, (list(genre_ids),), batch_size)
+
+
+def get_genres_index_data_by_range(
+        connection: psycopg.Connection,
+        lower: UUID,
+        upper: UUID | None,
+        batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = GENRES_SQL.format(condition='id >= %s AND (%s::uuid IS NULL OR id < %s::uuid)')
+    yield from fetch_index_rows(connection, query, (lower, upper, upper), batch_size)
@@ -0,0 +1,63 @@
+"""
+Строки выгрузки для индексации.
+
+Postgres сразу собирает итоговый документ в jsonb, поэтому ETL не создаёт
+промежуточные объекты elasticsearch-dsl: классы Document описывают только маппинг.
+"""
+from datetime import datetime
+from typing import Any, AsyncGenerator, Generator, NamedTuple
+from uuid import UUID
+
+import psycopg
+from psycopg import AsyncServerCursor, ServerCursor
+from psycopg.abc import AdaptContext, Buffer
+from psycopg.adapt import Loader
+from psycopg.rows import args_row
+
+
+class IndexRow(NamedTuple):
+    id: UUID
+    last_change_date: datetime
+    # dict, либо байты JSON, если для соединения зарегистрирован RawJsonLoader
+    document: dict[str, Any] | bytes
+    # Хэш содержимого без служебного last_change_date
+    content_hash: str
+
+
+class RawJsonLoader(Loader):
+    """Отдаёт jsonb как есть, в текстовом представлении Postgres, без разбора в Python."""
+
+    def load(self, data: Buffer) -> bytes:
+        return bytes(data)
+
+
+def register_raw_json_loader(context: AdaptContext) -> None:
+    context.adapters.register_loader('jsonb', RawJsonLoader)
+
+
+def as_document_sql(query: str) -> str:
+    """Обернуть запрос так, чтобы каждая его строка вернулась одним jsonb-документом."""
+    return (
+        'SELECT d.id, d.last_change_date, j.document, '
+        "md5((j.document - 'last_change_date')::text) AS content_hash "
+        'FROM (' + query + ') d '
+        'CROSS JOIN LATERAL (SELECT to_jsonb(d) AS document) j'
+    )
+
+
+def fetch_index_rows(
+        connection: psycopg.Connection, query: str, params: dict | tuple, batch_size: int
+) -> Generator[list[IndexRow], None, None]:
+    with ServerCursor(connection, 'fetcher', row_factory=args_row(IndexRow)) as cursor:
+        cursor.execute(as_document_sql(query), params)
+        while results := cursor.fetchmany(size=batch_size):
+            yield results
+
+
+async def afetch_index_rows(
+        connection: psycopg.AsyncConnection, query: str, params: dict | tuple, batch_size: int
+) -> AsyncGenerator[list[IndexRow], None]:
+    async with AsyncServerCursor(connection, 'fetcher', row_factory=args_row(IndexRow)) as cursor:
+        await cursor.execute(as_document_sql(query), params)
+        while results := await cursor.fetchmany(size=batch_size):
+            yield results
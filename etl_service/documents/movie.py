@@ -1,165 +1,271 @@
 from datetime import datetime
-from typing import Generator
+from typing import AsyncGenerator, Generator, Iterable
+from uuid import UUID
 
 import psycopg
+from documents.index_row import IndexRow, afetch_index_rows, fetch_index_rows
 from elasticsearch_dsl import (
+    Completion,
     Document,
     Float,
     InnerDoc,
     Keyword,
     MetaField,
-    Nested,
+    Object,
     Text,
 )
-from psycopg import ServerCursor
-from psycopg.conninfo import make_conninfo
-from psycopg.rows import class_row
 
 
+# Вложенные объекты фильма только отображаются: фильтры работают по плоским *_ids,
+# поиск — по *_names, поэтому поля внутри объектов не индексируются
 class Genre(InnerDoc):
-    id = Keyword()
-    name = Text(analyzer='ru_en')
+    id = Keyword(index=False, doc_values=False)
+    name = Keyword(index=False, doc_values=False)
 
     class Meta:
         dynamic = MetaField('strict')
 
 
 class Director(InnerDoc):
-    id = Keyword()
-    name = Text(analyzer='ru_en')
+    id = Keyword(index=False, doc_values=False)
+    name = Keyword(index=False, doc_values=False)
 
     class Meta:
         dynamic = MetaField('strict')
 
 
 class Actor(InnerDoc):
-    id = Keyword()
-    name = Text(analyzer='ru_en')
+    id = Keyword(index=False, doc_values=False)
+    name = Keyword(index=False, doc_values=False)
 
     class Meta:
         dynamic = MetaField('strict')
 
 
 class Writer(InnerDoc):
-    id = Keyword()
-    name = Text(analyzer='ru_en')
+    id = Keyword(index=False, doc_values=False)
+    name = Keyword(index=False, doc_values=False)
 
     class Meta:
         dynamic = MetaField('strict')
 
 
+PERSON_ROLES = ('directors', 'actors', 'writers')
+
+# Пересобирает *_names из вложенных объектов персон документа source.
+# *_names не хранятся в _source, поэтому их нужно восстанавливать при каждой перезаписи
+# документа на стороне Elasticsearch: в _update-скриптах и при _reindex.
+PERSON_NAMES_SCRIPT = """
+for (String role : [%s]) {
+    List people = source[role];
+    if (people == null) {
+        continue;
+    }
+    Set names = new LinkedHashSet();
+    for (Map person : people) {
+        names.add(person.name);
+    }
+    source[role + '_names'] = new ArrayList(names);
+}
+""" % ', '.join(f"'{role}'" for role in PERSON_ROLES)
+
+
 class Movie(Document):
     id = Keyword()
     imdb_rating = Float()
-    genres = Nested(Genre)
-    title = Text(analyzer='ru_en', fields={'raw': Keyword()})
+    genres = Object(Genre)
+    # title.suggest — префиксные подсказки (completion suggester) для /api/v1/suggest
+    title = Text(analyzer='ru_en', fields={'raw': Keyword(), 'suggest': Completion(analyzer='standard')})
     description = Text(analyzer='ru_en')
+    # Только для поиска: имена уже есть во вложенных объектах, в _source не хранятся.
+    # Позиции нужны фразовому rescore поиска, поэтому index_options не урезаются
     directors_names = Text(analyzer='ru_en')
     actors_names = Text(analyzer='ru_en')
     writers_names = Text(analyzer='ru_en')
-    directors = Nested(Director)
-    actors = Nested(Actor)
-    writers = Nested(Writer)
-    last_change_date = Keyword(index=False)
+    directors = Object(Director)
+    actors = Object(Actor)
+    writers = Object(Writer)
+    # Плоские id для фильтров: term по keyword обходится дешевле nested-запроса,
+    # вложенные объекты выше остаются для отображения
+    genre_ids = Keyword(multi=True)
+    director_ids = Keyword(multi=True)
+    actor_ids = Keyword(multi=True)
+    writer_ids = Keyword(multi=True)
+    last_change_date = Keyword(index=False, doc_values=False)
 
     class Index:
         name = 'movies'
         settings = {
             'refresh_interval': '1s',
-            'analysis': {
-                'filter': {
-                    'english_stop': {'type': 'stop', 'stopwords': '_english_'},
-                    'english_stemmer': {'type': 'stemmer', 'language': 'english'},
-                    'english_possessive_stemmer': {
-                        'type': 'stemmer',
-                        'language': 'possessive_english',
-                    },
-                    'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
-                    'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
-                },
-                'analyzer': {
-                    'ru_en': {
-                        'tokenizer': 'standard',
-                        'filter': [
-                            'lowercase',
-                            'english_stop',
-                            'english_stemmer',
-                            'english_possessive_stemmer',
-                            'russian_stop',
-                            'russian_stemmer',
-                        ],
-                    }
-                },
-            },
+            # Шарды и реплики подбираются по объёму командой main.py sizing
+            'number_of_shards': 1,
+            'number_of_replicas': 1,
+            # Сегменты хранятся отсортированными по рейтингу: топ списка по -imdb_rating
+            # собирается без обхода всех совпадений
+            'sort.field': ['imdb_rating'],
+            'sort.order': ['desc'],
+            'sort.missing': ['_last'],
+            # Хранимые поля (_source) сжимаются DEFLATE вместо LZ4: меньше места на диске
+            # и в page cache ценой небольшой задержки при чтении документов
+            'codec': 'best_compression',
         }
+        # При _reindex исключённые из _source *_names пересобираются из объектов
+        reindex_processors = [{'script': {'lang': 'painless', 'source': 'Map source = ctx;' + PERSON_NAMES_SCRIPT}}]
+        reindex_fields = tuple(f'{role}_names' for role in PERSON_ROLES)
 
     class Meta:
         dynamic = MetaField('strict')
+        source = MetaField(excludes=[f'{role}_names' for role in PERSON_ROLES])
 
 
-def get_movie_index_data(
-        database_settings: dict, last_sync_state: datetime, batch_size: int = 100
-) -> Generator[list[Movie], None, None]:
-    dsn = make_conninfo(**database_settings)
-
-    with psycopg.connect(dsn, row_factory=class_row(Movie)) as conn, ServerCursor(conn, 'fetcher') as cursor:
-        raw_sql = """
-        SELECT
-            fw.id,
-            fw.title,
-            fw.description,
-            fw.rating as imdb_rating,
-            COALESCE (json_agg(
-                    DISTINCT jsonb_build_object(
-                        'id', g.id,
-                        'name', g.name
-                    )
-            ), '[]') as genres,
-            COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='director'),'{}') as directors_names,
-            COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='actor'),'{}') as actors_names, 
-            COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='writer'),'{}') as writers_names,  
+# id фильмов, затронутых изменениями с момента последней синхронизации.
+# Каждая ветка использует индекс на modified/created соответствующей таблицы.
+# Переименования персон и жанров сюда не входят: их обрабатывает documents.movie_renames
+# частичными обновлениями без повторной агрегации фильмов.
+CHANGED_SINCE_SQL = """
+        SELECT fw.id
+        FROM content.film_work fw
+        WHERE fw.modified > %(last_sync_state)s
+        UNION
+        SELECT pfw.film_work_id
+        FROM content.person_film_work pfw
+        WHERE pfw.created > %(last_sync_state)s
+        UNION
+        SELECT gfw.film_work_id
+        FROM content.genre_film_work gfw
+        WHERE gfw.created > %(last_sync_state)s
+"""
+
+# Фильмы с указанными id (режим LISTEN/NOTIFY).
+CHANGED_BY_IDS_SQL = """
+        SELECT fw.id
+        FROM content.film_work fw
+        WHERE fw.id = ANY(%(film_work_ids)s::uuid[])
+"""
+
+# Фильмы одного диапазона id (параллельная полная переиндексация).
+CHANGED_BY_RANGE_SQL = """
+        SELECT fw.id
+        FROM content.film_work fw
+        WHERE fw.id >= %(lower)s AND (%(upper)s::uuid IS NULL OR fw.id < %(upper)s::uuid)
+"""
+
+# Агрегация выполняется только для фильмов из changed_film_works, а не для всего каталога.
+MOVIES_AGGREGATION_SQL = """
+    SELECT
+        fw.id,
+        fw.title,
+        fw.description,
+        fw.rating as imdb_rating,
+        COALESCE (json_agg(
+                DISTINCT jsonb_build_object(
+                    'id', g.id,
+                    'name', g.name
+                )
+        ), '[]') as genres,
+        COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='director'),'{}') as directors_names,
+        COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='actor'),'{}') as actors_names,
+        COALESCE (array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role='writer'),'{}') as writers_names,
+        COALESCE (
+            json_agg(
+                DISTINCT jsonb_build_object(
+                    'id', p.id,
+                    'name', p.full_name
+                )
+            ) FILTER (WHERE p.id is not null and pfw.role='director'),
+            '[]'
+        ) as directors,
+
+            COALESCE (
+            json_agg(
+                DISTINCT jsonb_build_object(
+                    'id', p.id,
+                    'name', p.full_name
+                )
+            ) FILTER (WHERE p.id is not null and pfw.role='actor'),
+            '[]'
+        ) as actors,
+
             COALESCE (
-                json_agg(
-                    DISTINCT jsonb_build_object(
-                        'id', p.id,
-                        'name', p.full_name
-                    )
-                ) FILTER (WHERE p.id is not null and pfw.role='director'),
-                '[]'
-            ) as directors,
-
-                COALESCE (
-                json_agg(
-                    DISTINCT jsonb_build_object(
-                        'id', p.id,
-                        'name', p.full_name
-                    )
-                ) FILTER (WHERE p.id is not null and pfw.role='actor'),
-                '[]'
-            ) as actors,
-
-                COALESCE (
-                json_agg(
-                    DISTINCT jsonb_build_object(
-                        'id', p.id,
-                        'name', p.full_name
-                    )
-                ) FILTER (WHERE p.id is not null and pfw.role='writer'),
-                '[]'
-            ) as writers
-            ,max(v.last_change_date) last_change_date
-
-            FROM content.film_work fw
-            LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
-            LEFT JOIN content.person p ON p.id = pfw.person_id
-            LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
-            LEFT JOIN content.genre g ON g.id = gfw.genre_id
-            cross join lateral (values (fw.modified), (pfw.created), (p.modified), (gfw.created), (g.modified)) v(last_change_date)
-            GROUP BY fw.id
-            having max(v.last_change_date) > %s
-            ORDER BY fw.modified
-        """
-
-        cursor.execute(raw_sql, (last_sync_state,))
-        while results := cursor.fetchmany(size=batch_size):
-            yield results
+            json_agg(
+                DISTINCT jsonb_build_object(
+                    'id', p.id,
+                    'name', p.full_name
+                )
+            ) FILTER (WHERE p.id is not null and pfw.role='writer'),
+            '[]'
+        ) as writers,
+        COALESCE (array_agg(DISTINCT g.id) FILTER (WHERE g.id is not null), '{}') as genre_ids,
+        COALESCE (array_agg(DISTINCT p.id) FILTER (WHERE pfw.role='director'), '{}') as director_ids,
+        COALESCE (array_agg(DISTINCT p.id) FILTER (WHERE pfw.role='actor'), '{}') as actor_ids,
+        COALESCE (array_agg(DISTINCT p.id) FILTER (WHERE pfw.role='writer'), '{}') as writer_ids
+        ,max(v.last_change_date) last_change_date
+
+        FROM changed_film_works cfw
+        JOIN content.film_work fw ON fw.id = cfw.id
+        LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
+        LEFT JOIN content.person p ON p.id = pfw.person_id
+        LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
+        LEFT JOIN content.genre g ON g.id = gfw.genre_id
+        cross join lateral (values (fw.modified), (pfw.created), (gfw.created)) v(last_change_date)
+        GROUP BY fw.id
+        ORDER BY fw.modified
+"""
+
+
+def _build_movies_sql(changed_film_works_sql: str) -> str:
+    return f'WITH changed_film_works AS ({changed_film_works_sql})' + MOVIES_AGGREGATION_SQL
+
+
+def get_movie_index_data(
+        connection: psycopg.Connection, last_sync_state: datetime, batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    yield from fetch_index_rows(
+        connection,
+        _build_movies_sql(CHANGED_SINCE_SQL),
+        {'last_sync_state': last_sync_state},
+        batch_size,
+    )
+
+
+async def aget_movie_index_data(
+        connection: psycopg.AsyncConnection, last_sync_state: datetime, batch_size: int = 100
+) -> AsyncGenerator[list[IndexRow], None]:
+    async for rows in afetch_index_rows(
+        connection,
+        _build_movies_sql(CHANGED_SINCE_SQL),
+        {'last_sync_state': last_sync_state},
+        batch_size,
+    ):
+        yield rows
+
+
+def count_movie_index_data(connection: psycopg.Connection, last_sync_state: datetime) -> int:
+    """Количество фильмов, которые будут переиндексированы с момента last_sync_state."""
+    row = connection.execute(
+        f'SELECT count(*) FROM ({CHANGED_SINCE_SQL}) changed_film_works',
+        {'last_sync_state': last_sync_state},
+    ).fetchone()
+    return row[0]
+
+
+def get_movie_index_data_by_ids(
+        connection: psycopg.Connection, film_work_ids: Iterable[str], batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    yield from fetch_index_rows(
+        connection,
+        _build_movies_sql(CHANGED_BY_IDS_SQL),
+        {'film_work_ids': list(film_work_ids)},
+        batch_size,
+    )
+
+
+def get_movie_index_data_by_range(
+        connection: psycopg.Connection, lower: UUID, upper: UUID | None, batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    yield from fetch_index_rows(
+        connection,
+        _build_movies_sql(CHANGED_BY_RANGE_SQL),
+        {'lower': lower, 'upper': upper},
+        batch_size,
+    )
@@ -0,0 +1,195 @@
+"""
+Распространение переименований персон и жанров на денормализованные документы фильмов.
+
+Вместо повторной агрегации фильмов каждому затронутому документу отправляется
+bulk-операция update со скриптом, который меняет только вложенные записи.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncGenerator, Generator, Iterable
+from uuid import UUID
+
+import psycopg
+from documents.movie import PERSON_NAMES_SCRIPT, PERSON_ROLES, Movie
+from psycopg import AsyncServerCursor, ServerCursor, sql
+from psycopg.rows import class_row
+
+# Обновляет имя персоны во всех ролях. *_names не хранятся в _source фильма,
+# поэтому при любом изменении они пересобираются из объектов для всех ролей.
+# Если имя уже актуально, документ не переиндексируется (ctx.op = 'noop').
+PERSON_RENAME_SCRIPT = """
+boolean changed = false;
+for (String role : params.roles) {
+    List people = ctx._source[role];
+    if (people == null) {
+        continue;
+    }
+    for (Map person : people) {
+        if (person.id == params.id && person.name != params.name) {
+            person.name = params.name;
+            changed = true;
+        }
+    }
+}
+if (changed) {
+    Map source = ctx._source;
+""" + PERSON_NAMES_SCRIPT + """
+} else {
+    ctx.op = 'noop';
+}
+"""
+
+GENRE_RENAME_SCRIPT = """
+boolean changed = false;
+if (ctx._source.genres != null) {
+    for (Map genre : ctx._source.genres) {
+        if (genre.id == params.id && genre.name != params.name) {
+            genre.name = params.name;
+            changed = true;
+        }
+    }
+}
+if (changed) {
+    Map source = ctx._source;
+""" + PERSON_NAMES_SCRIPT + """
+} else {
+    ctx.op = 'noop';
+}
+"""
+
+PERSON_RENAMES_SQL = """
+    SELECT
+        p.id,
+        p.full_name AS name,
+        p.modified AS last_change_date,
+        array_agg(DISTINCT pfw.film_work_id) AS film_work_ids
+    FROM content.person p
+    JOIN content.person_film_work pfw ON pfw.person_id = p.id
+    WHERE {condition}
+    GROUP BY p.id
+    ORDER BY p.modified
+"""
+
+GENRE_RENAMES_SQL = """
+    SELECT
+        g.id,
+        g.name,
+        g.modified AS last_change_date,
+        array_agg(DISTINCT gfw.film_work_id) AS film_work_ids
+    FROM content.genre g
+    JOIN content.genre_film_work gfw ON gfw.genre_id = g.id
+    WHERE {condition}
+    GROUP BY g.id
+    ORDER BY g.modified
+"""
+
+
+@dataclass
+class RenamedEntity:
+    """Персона или жанр с актуальным именем и фильмами, в которые они встроены."""
+    id: UUID
+    name: str
+    last_change_date: datetime
+    film_work_ids: list[UUID]
+
+
+def _fetch_renames(
+        connection: psycopg.Connection, query: str, params: tuple, batch_size: int
+) -> Generator[list[RenamedEntity], None, None]:
+    with ServerCursor(connection, 'fetcher', row_factory=class_row(RenamedEntity)) as cursor:
+        cursor.execute(query, params)
+        while results := cursor.fetchmany(size=batch_size):
+            yield results
+
+
+async def _afetch_renames(
+        connection: psycopg.AsyncConnection, query: str, params: tuple, batch_size: int
+) -> AsyncGenerator[list[RenamedEntity], None]:
+    async with AsyncServerCursor(connection, 'fetcher', row_factory=class_row(RenamedEntity)) as cursor:
+        await cursor.execute(query, params)
+        while results := await cursor.fetchmany(size=batch_size):
+            yield results
+
+
+def get_person_renames(
+        connection: psycopg.Connection, last_sync_state: datetime, batch_size: int = 100
+) -> Generator[list[RenamedEntity], None, None]:
+    query = PERSON_RENAMES_SQL.format(condition='p.modified > %s')
+    yield from _fetch_renames(connection, query, (last_sync_state,), batch_size)
+
+
+def get_person_renames_by_ids(
+        connection: psycopg.Connection, person_ids: Iterable[str], batch_size: int = 100
+) -> Generator[list[RenamedEntity], None, None]:
+    query = PERSON_RENAMES_SQL.format(condition='p.id = ANY(%s::uuid[])')
+    yield from _fetch_renames(connection, query, (list(person_ids),), batch_size)
+
+
+async def aget_person_renames(
+        connection: psycopg.AsyncConnection, last_sync_state: datetime, batch_size: int = 100
+) -> AsyncGenerator[list[RenamedEntity], None]:
+    query = PERSON_RENAMES_SQL.format(condition='p.modified > %s')
+    async for renames in _afetch_renames(connection, query, (last_sync_state,), batch_size):
+        yield renames
+
+
+def get_genre_renames(
+        connection: psycopg.Connection, last_sync_state: datetime, batch_size: int = 100
+) -> Generator[list[RenamedEntity], None, None]:
+    query = GENRE_RENAMES_SQL.format(condition='g.modified > %s')
+    yield from _fetch_renames(connection, query, (last_sync_state,), batch_size)
+
+
+async def aget_genre_renames(
+        connection: psycopg.AsyncConnection, last_sync_state: datetime, batch_size: int = 100
+) -> AsyncGenerator[list[RenamedEntity], None]:
+    query = GENRE_RENAMES_SQL.format(condition='g.modified > %s')
+    async for renames in _afetch_renames(connection, query, (last_sync_state,), batch_size):
+        yield renames
+
+
+def get_genre_renames_by_ids(
+        connection: psycopg.Connection, genre_ids: Iterable[str], batch_size: int = 100
+) -> Generator[list[RenamedEntity], None, None]:
+    query = GENRE_RENAMES_SQL.format(condition='g.id = ANY(%s::uuid[])')
+    yield from _fetch_renames(connection, query, (list(genre_ids),), batch_size)
+
+
+def get_last_modified(connection: psycopg.Connection, table: str) -> datetime | None:
+    """Последнее изменение в таблице content.<table> (отправная точка для первой синхронизации)."""
+    row = connection.execute(
+        sql.SQL('SELECT max(modified) FROM content.{}').format(sql.Identifier(table))
+    ).fetchone()
+    return row[0]
+
+
+async def aget_last_modified(connection: psycopg.AsyncConnection, table: str) -> datetime | None:
+    cursor = await connection.execute(
+        sql.SQL('SELECT max(modified) FROM content.{}').format(sql.Identifier(table))
+    )
+    row = await cursor.fetchone()
+    return row[0]
+
+
+def build_person_rename_actions(renames: list[RenamedEntity]) -> Generator[dict[str, Any], None, None]:
+    for person in renames:
+        params = {'id': str(person.id), 'name': person.name, 'roles': list(PERSON_ROLES)}
+        yield from _build_update_actions(person.film_work_ids, PERSON_RENAME_SCRIPT, params)
+
+
+def build_genre_rename_actions(renames: list[RenamedEntity]) -> Generator[dict[str, Any], None, None]:
+    for genre in renames:
+        params = {'id': str(genre.id), 'name': genre.name}
+        yield from _build_update_actions(genre.film_work_ids, GENRE_RENAME_SCRIPT, params)
+
+
+def _build_update_actions(
+        film_work_ids: list[UUID], script: str, params: dict[str, Any]
+) -> Generator[dict[str, Any], None, None]:
+    for film_work_id in film_work_ids:
+        yield {
+            '_op_type': 'update',
+            '_index': Movie.Index.name,
+            '_id': str(film_work_id),
+            'script': {'source': script, 'lang': 'painless', 'params': params},
+        }
@@ -1,8 +1,11 @@
 from datetime import datetime
-from typing import Generator
+from typing import AsyncGenerator, Generator, Iterable
+from uuid import UUID
 
 import psycopg
+from documents.index_row import IndexRow, afetch_index_rows, fetch_index_rows
 from elasticsearch_dsl import (
+    Completion,
     Document,
     Float,
     InnerDoc,
@@ -11,9 +14,6 @@ from elasticsearch_dsl import (
     Nested,
     Text,
 )
-from psycopg import ServerCursor
-from psycopg.conninfo import make_conninfo
-from psycopg.rows import class_row
 
 
 class FilmRole(InnerDoc):
@@ -26,52 +26,25 @@ class FilmRole(InnerDoc):
 
 class Person(Document):
     id = Keyword()
-    full_name = Text(analyzer='ru_en')
+    # full_name.suggest — префиксные подсказки (completion suggester) для /api/v1/suggest
+    full_name = Text(analyzer='ru_en', fields={'suggest': Completion(analyzer='standard')})
     films = Nested(FilmRole)
-    last_change_date = Keyword(index=False)
+    last_change_date = Keyword(index=False, doc_values=False)
 
     class Index:
         name = 'person'
         settings = {
             'refresh_interval': '1s',
-            'analysis': {
-                'filter': {
-                    'english_stop': {'type': 'stop', 'stopwords': '_english_'},
-                    'english_stemmer': {'type': 'stemmer', 'language': 'english'},
-                    'english_possessive_stemmer': {
-                        'type': 'stemmer',
-                        'language': 'possessive_english',
-                    },
-                    'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
-                    'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
-                },
-                'analyzer': {
-                    'ru_en': {
-                        'tokenizer': 'standard',
-                        'filter': [
-                            'lowercase',
-                            'english_stop',
-                            'english_stemmer',
-                            'english_possessive_stemmer',
-                            'russian_stop',
-                            'russian_stemmer',
-                        ],
-                    }
-                },
-            },
+            # Шарды и реплики подбираются по объёму командой main.py sizing
+            'number_of_shards': 1,
+            'number_of_replicas': 1,
         }
 
     class Meta:
         dynamic = MetaField('strict')
 
 
-def get_person_index_data(
-        database_settings: dict, last_sync_state: datetime, batch_size: int = 100
-) -> Generator[list[Person], None, None]:
-    dsn = make_conninfo(**database_settings)
-
-    with psycopg.connect(dsn, row_factory=class_row(Person)) as conn, ServerCursor(conn, 'fetcher') as cursor:
-        query = """
+PERSONS_SQL = """
             SELECT 
                 p.id, 
                 p.full_name, 
@@ -87,10 +60,43 @@ def get_person_index_data(
                 ) as films
             FROM content.person p
             LEFT JOIN content.person_film_work pf ON pf.person_id = p.id
-            WHERE p.modified >= %s
+            WHERE {condition}
             GROUP BY p.id, p.full_name, p.modified
         """
 
-        cursor.execute(query, (last_sync_state,))
-        while results := cursor.fetchmany(size=batch_size):
-            yield results
+
+def get_person_index_data(
+        connection: psycopg.Connection, last_sync_state: datetime, batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = PERSONS_SQL.format(condition='p.modified >= %s')
+    yield from fetch_index_rows(connection, query, (last_sync_state,), batch_size)
+
+
+async def aget_person_index_data(
+        connection: psycopg.AsyncConnection, last_sync_state: datetime, batch_size: int = 100
+) -> AsyncGenerator[list[IndexRow], None]:
+    query = PERSONS_SQL.format(condition='p.modified >= %s')
+    async for rows in afetch_index_rows(connection, query, (last_sync_state,), batch_size):
+        yield rows
+
+
+def count_person_index_data(connection: psycopg.Connection, last_sync_state: datetime) -> int:
+    """Количество персон, которые будут переиндексированы с момента last_sync_state."""
+    row = connection.execute(
+        'SELECT count(*) FROM content.person p WHERE p.modified >= %s', (last_sync_state,)
+    ).fetchone()
+    return row[0]
+
+
+def get_person_index_data_by_ids(
+        connection: psycopg.Connection, person_ids: Iterable[str], batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = PERSONS_SQL.format(condition='p.id = ANY(%s::uuid[])')
+    yield from fetch_index_rows(connection, query, (list(person_ids),), batch_size)
+
+
+def get_person_index_data_by_range(
+        connection: psycopg.Connection, lower: UUID, upper: UUID | None, batch_size: int = 100
+) -> Generator[list[IndexRow], None, None]:
+    query = PERSONS_SQL.format(condition='p.id >= %s AND (%s::uuid IS NULL OR p.id < %s::uuid)')
+    yield from fetch_index_rows(connection, query, (lower, upper, upper), batch_size)
@@ -1,4 +1,7 @@
+import asyncio
+import inspect
 import logging
+import random
 import time
 from functools import wraps
 from logging import Logger
@@ -9,8 +12,44 @@ def backoff(
         factor=2,
         border_sleep_time=10,
         logger: Logger = logging.getLogger('backoff'),
+        max_retries: int | None = None,
+        jitter: bool = False,
 ):
+    """
+    Повторять вызов при исключении с экспоненциальной задержкой.
+
+    max_retries ограничивает число повторов (None — без ограничения), после чего
+    исключение пробрасывается. jitter выбирает задержку случайно в пределах [0, sleep_time],
+    чтобы одновременно упавшие клиенты не повторяли запросы синхронно.
+    Корутины оборачиваются так же, но ждут через asyncio.sleep, не блокируя цикл событий.
+    """
+    def next_sleep_time(func, n: int, e: Exception) -> float | None:
+        if max_retries is not None and n > max_retries:
+            logger.error(f'{func.__name__} failed with {e}. Giving up after {max_retries} retries')
+            return None
+        sleep_time = min(start_sleep_time * (factor ** n), border_sleep_time)
+        if jitter:
+            sleep_time = random.uniform(0, sleep_time)
+        logger.error(f'{func.__name__} failed with {e}. Retrying in {sleep_time} seconds')
+        return sleep_time
+
     def func_wrapper(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_inner(*args, **kwargs):
+                n = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        n += 1
+                        sleep_time = next_sleep_time(func, n, e)
+                        if sleep_time is None:
+                            raise
+                        await asyncio.sleep(sleep_time)
+
+            return async_inner
+
         @wraps(func)
         def inner(*args, **kwargs):
             n = 0
@@ -19,8 +58,9 @@ def backoff(
                     return func(*args, **kwargs)
                 except Exception as e:
                     n += 1
-                    sleep_time = min(start_sleep_time * (factor ** n), border_sleep_time)
-                    logger.error(f'{func.__name__} failed with {e}. Retrying in {sleep_time} seconds')
+                    sleep_time = next_sleep_time(func, n, e)
+                    if sleep_time is None:
+                        raise
                     time.sleep(sleep_time)
 
         return inner
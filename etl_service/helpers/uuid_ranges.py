@@ -0,0 +1,16 @@
+from uuid import UUID
+
+UUID_SPACE = 2 ** 128
+
+
+def uuid_ranges(count: int) -> list[tuple[UUID, UUID | None]]:
+    """
+    Разбить пространство UUID на count непересекающихся диапазонов [lower, upper).
+
+    Верхняя граница последнего диапазона — None (без ограничения).
+    """
+    if count < 1:
+        raise ValueError('count must be positive')
+
+    bounds = [UUID(int=UUID_SPACE * i // count) for i in range(count)]
+    return list(zip(bounds, bounds[1:] + [None]))
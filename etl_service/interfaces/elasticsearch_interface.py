@@ -1,9 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Generator, Any
+from dataclasses import dataclass
+from typing import Generator, Any, Iterable
 
 from elasticsearch import Elasticsearch
 
 
+@dataclass
+class RejectedAction:
+    """Операция bulk, окончательно отклонённая Elasticsearch."""
+    action: dict[str, Any]
+    status: int
+    error: Any
+
+
 class IElasticsearchService(ABC):
     """
     Интерфейс для сервиса работы с Elasticsearch.
@@ -11,12 +20,34 @@ class IElasticsearchService(ABC):
     """
 
     @abstractmethod
-    def bulk_index(self, data: Generator[dict[str, Any], Any, None]) -> None:
+    def bulk_index(
+            self,
+            data: Generator[dict[str, Any], Any, None],
+            ignore_status: tuple[int, ...] = (),
+    ) -> list[RejectedAction]:
         """
         Массовая индексация данных в Elasticsearch.
         
         Args:
             data: Генератор данных для индексации
+            ignore_status: HTTP-статусы отдельных операций, которые не считаются ошибкой
+
+        Returns:
+            Операции, отклонённые окончательно
+        """
+        pass
+
+    @abstractmethod
+    def bulk_index_raw(self, index_name: str, documents: Iterable[tuple[str, bytes]]) -> list[RejectedAction]:
+        """
+        Массовая индексация документов, уже сериализованных в JSON.
+
+        Args:
+            index_name: Индекс, в который записываются документы
+            documents: Пары (id документа, JSON-документ в байтах)
+
+        Returns:
+            Операции, отклонённые окончательно
         """
         pass
 
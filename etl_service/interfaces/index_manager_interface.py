@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from datetime import datetime
 from typing import Type
 
 
@@ -9,22 +11,151 @@ class IIndexManager(ABC):
     """
 
     @abstractmethod
-    def recreate_index_with_analyzers(self, document_class: Type) -> None:
+    def recreate_index_with_analyzers(self, document_class: Type) -> str:
         """
-        Пересоздать индекс с правильными анализаторами.
+        Создать новую версию индекса с правильными анализаторами.
         
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Имя созданного физического индекса
+        """
+        pass
+
+    @abstractmethod
+    def ensure_templates(self, document_class: Type) -> None:
+        """
+        Опубликовать шаблоны, из которых создаются версии индекса документа.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def missing_source_fields(self, document_class: Type) -> list[str]:
+        """
+        Поля нового описания, которых нет в живом индексе и которые нужно взять из Postgres.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def removed_source_fields(self, document_class: Type) -> list[str]:
+        """
+        Поля старых документов, которых нет в новом описании: с ними _reindex невозможен.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def reindex_index_version(self, document_class: Type, index_name: str) -> int:
+        """
+        Перенести документы живого индекса в новую версию на стороне Elasticsearch.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            index_name: Новая версия индекса
+
+        Returns:
+            Число перенесённых документов
+        """
+        pass
+
+    @abstractmethod
+    def activate_index_version(self, document_class: Type, index_name: str) -> None:
+        """
+        Сделать версию индекса живой, атомарно переключив на неё alias.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            index_name: Физический индекс
+        """
+        pass
+
+    @abstractmethod
+    def apply_dynamic_settings(self, document_class: Type) -> None:
+        """
+        Применить к живому индексу настройки, которые меняются без новой версии.
+
         Args:
             document_class: Класс документа Elasticsearch-dsl
         """
         pass
 
     @abstractmethod
-    def ensure_index_exists(self, document_class: Type) -> None:
+    def building_index_version(self, document_class: Type) -> AbstractContextManager[str]:
+        """
+        Контекст новой версии индекса: версия, не ставшая живой к концу блока, удаляется.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def bulk_load_mode(self, document_class: Type) -> AbstractContextManager:
+        """
+        Контекст массовой загрузки: без refresh и реплик, с восстановлением настроек по выходу.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def rollback_index_version(self, document_class: Type) -> tuple[str, datetime | None]:
+        """
+        Вернуть alias на предыдущую версию индекса и закрепить её.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Имя индекса, ставшего живым, и время создания версии,
+            с которой выполнен откат
+        """
+        pass
+
+    @abstractmethod
+    def unpin_index_version(self, document_class: Type) -> None:
+        """
+        Снять закрепление с живой версии индекса.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        pass
+
+    @abstractmethod
+    def cleanup_index_versions(self, document_class: Type, keep: int = 2) -> list[str]:
+        """
+        Удалить старые версии индекса, кроме живой и последних keep.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            keep: Сколько последних версий оставить
+
+        Returns:
+            Список удалённых индексов
+        """
+        pass
+
+    @abstractmethod
+    def ensure_index_exists(self, document_class: Type) -> bool:
         """
         Убедиться что индекс существует с правильными настройками.
         
         Args:
             document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            True если индекс был создан заново
         """
         pass
 
@@ -0,0 +1,91 @@
+import threading
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+
+
+class LeaseLostError(RuntimeError):
+    """Аренда истекла или перешла к другому экземпляру, пока шла работа под ней."""
+
+
+class Lease:
+    """
+    Аренда, удерживаемая блоком hold.
+
+    Ложна, если захватить аренду не удалось. Потерю аренды во время блока
+    фиксирует фоновое продление; перед каждой записью владелец вызывает check.
+    """
+
+    def __init__(self, name: str, acquired: bool):
+        self.name = name
+        self._acquired = acquired
+        self._lost = threading.Event()
+
+    def __bool__(self) -> bool:
+        return self._acquired
+
+    def mark_lost(self) -> None:
+        self._lost.set()
+
+    def is_held(self) -> bool:
+        return self._acquired and not self._lost.is_set()
+
+    def check(self) -> None:
+        """Прервать работу, если аренда больше не принадлежит этому экземпляру."""
+        if not self.is_held():
+            raise LeaseLostError(f"Аренда {self.name} потеряна, запись прервана")
+
+
+class ILeaseManager(ABC):
+    """
+    Интерфейс для менеджера распределённых аренд.
+    Аренда гарантирует, что работу с данным именем выполняет только один экземпляр ETL.
+    """
+
+    @abstractmethod
+    def acquire(self, name: str) -> bool:
+        """
+        Захватить аренду, если она свободна.
+
+        Args:
+            name: Имя аренды
+
+        Returns:
+            True если аренда захвачена этим экземпляром
+        """
+        pass
+
+    @abstractmethod
+    def renew(self, name: str) -> bool:
+        """
+        Продлить свою аренду.
+
+        Args:
+            name: Имя аренды
+
+        Returns:
+            False если аренда истекла или принадлежит другому экземпляру
+        """
+        pass
+
+    @abstractmethod
+    def release(self, name: str) -> None:
+        """
+        Освободить свою аренду.
+
+        Args:
+            name: Имя аренды
+        """
+        pass
+
+    @abstractmethod
+    def hold(self, name: str) -> AbstractContextManager[Lease]:
+        """
+        Удерживать аренду на время блока, продлевая её в фоне.
+
+        Args:
+            name: Имя аренды
+
+        Returns:
+            Контекстный менеджер, возвращающий аренду; она истинна, если захвачена
+        """
+        pass
@@ -1,142 +1,150 @@
-import time
-from datetime import datetime
-
-import pytz
-from dateutil import parser
-
-from documents.genre import Genre, get_genres_index_data
-from documents.movie import Movie, get_movie_index_data
-from documents.person import Person, get_person_index_data
-from logger import logger
+import argparse
+import asyncio
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+from async_runner import AsyncEtlRunner
+from benchmarks import benchmark_listing
+from documents.genre import Genre
+from documents.movie import Movie
+from documents.person import Person
+from metrics import start_metrics_server
+from runner import PIPELINES, EtlRunner
 from services.elasticsearch_index_manager import ElasticsearchIndexManager
 from services.elasticsearch_service import ElasticsearchService
 from settings import settings
-from state_manager.json_file_storage import JsonFileStorage
-from state_manager.state_manager import StateManager
-
-
-def update_movie_index():
-    # Инициализация сервисов
+from sizing import report_sizing
+
+DOCUMENT_CLASSES = {document_class.Index.name: document_class for document_class in (Movie, Person, Genre)}
+
+
+def parse_args() -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(description='ETL из Postgres в Elasticsearch')
+    arg_parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Полная синхронизация всех индексов в режиме массовой загрузки при первом проходе',
+    )
+    arg_parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Число процессов для полной синхронизации (только вместе с --full)',
+    )
+    subparsers = arg_parser.add_subparsers(dest='command')
+
+    rollback_parser = subparsers.add_parser('rollback', help='Вернуть alias на предыдущую версию индекса')
+    rollback_parser.add_argument('index', choices=DOCUMENT_CLASSES)
+
+    unpin_parser = subparsers.add_parser('unpin', help='Снять закрепление версии')
+    unpin_parser.add_argument('index', choices=DOCUMENT_CLASSES)
+
+    cleanup_parser = subparsers.add_parser('cleanup', help='Удалить старые версии индекса')
+    cleanup_parser.add_argument('index', choices=DOCUMENT_CLASSES)
+    cleanup_parser.add_argument('--keep', type=int, default=2, help='Сколько последних версий оставить')
+
+    benchmark_parser = subparsers.add_parser(
+        'benchmark', help='Сравнить размер версий индекса фильмов и время запросов к ним'
+    )
+    benchmark_parser.add_argument(
+        'indices', nargs='*', default=[Movie.Index.name], help='Индексы для сравнения, например movies_v1 movies_v2'
+    )
+    benchmark_parser.add_argument('--runs', type=int, default=20, help='Сколько раз выполнить каждый запрос')
+
+    subparsers.add_parser('sizing', help='Рекомендовать число шардов и реплик по объёму данных')
+
+    replay_parser = subparsers.add_parser(
+        'replay-dead-letters', help='Повторить операции, отклонённые Elasticsearch'
+    )
+    replay_parser.add_argument('--limit', type=int, default=None, help='Сколько операций повторить')
+
+    args = arg_parser.parse_args()
+    if args.workers < 1:
+        arg_parser.error('--workers должен быть положительным')
+    if args.workers > 1 and not args.full:
+        arg_parser.error('--workers используется только вместе с --full')
+    return args
+
+
+def create_es_connection() -> ElasticsearchService:
     es_service = ElasticsearchService()
     es_service.create_connection([settings.elasticsearch_settings.get_host()])
+    return es_service
 
-    index_manager = ElasticsearchIndexManager(es_service.get_connection())
-    state_manager = StateManager(JsonFileStorage(logger=logger))
 
-    last_sync_state = state_manager.get_state('movie_index_last_sync_state')
+def manage_index_versions(args: argparse.Namespace):
+    es_service = create_es_connection()
+    index_manager = ElasticsearchIndexManager(
+        es_service.get_connection(), settings.etl_settings.force_merge_max_segments
+    )
+    index_manager.cleanup_index_versions(DOCUMENT_CLASSES[args.index], keep=args.keep)
 
-    if last_sync_state is None:
-        last_sync_state = pytz.UTC.localize(datetime.min)
-    else:
-        last_sync_state = parser.isoparse(last_sync_state)
 
+def manage_pinned_version(args: argparse.Namespace):
+    # Откат меняет состояние синхронизации: нужен EtlRunner
+    runner = EtlRunner()
     try:
-        index_manager.ensure_index_exists(Movie)
-
-        for rows in get_movie_index_data(settings.database_settings.get_dsn(), last_sync_state, 100):
-            es_load_data = (dict(d.to_dict(True, skip_empty=False), **{'_id': d.id}) for d in rows)
-
-            es_service.bulk_index(es_load_data)
-
-            last_change_date = pytz.UTC.localize(max(item.last_change_date for item in rows))
-            if last_change_date > last_sync_state:
-                last_sync_state = last_change_date
+        if args.command == 'rollback':
+            runner.rollback_index(args.index)
+        else:
+            runner.unpin_index(args.index)
+    finally:
+        runner.close()
 
-        state_manager.set_state('movie_index_last_sync_state', last_sync_state.isoformat())
-        logger.info("✅ Обновление индекса фильмов завершено успешно")
-
-    except Exception as e:
-        logger.error(f"❌ Ошибка при обновлении индекса фильмов: {e}")
-        raise
-
-
-def update_person_index():
-    # Инициализация сервисов
-    es_service = ElasticsearchService()
-    es_service.create_connection([settings.elasticsearch_settings.get_host()])
-
-    index_manager = ElasticsearchIndexManager(es_service.get_connection())
-    state_manager = StateManager(JsonFileStorage(logger=logger))
-
-    # Получаем состояние синхронизации
-    last_sync_state = state_manager.get_state('person_index_last_sync_state')
-
-    if last_sync_state is None:
-        last_sync_state = pytz.UTC.localize(datetime.min)
-    else:
-        last_sync_state = parser.isoparse(last_sync_state)
 
+async def run_async(full: bool = False):
+    runner = AsyncEtlRunner()
     try:
-        # Обеспечиваем существование индекса с правильными анализаторами
-        index_manager.ensure_index_exists(Person)
-
-        # Загружаем и индексируем данные
-        for rows in get_person_index_data(settings.database_settings.get_dsn(), last_sync_state, 100):
-            es_load_data = (dict(d.to_dict(True, skip_empty=False), **{'_id': d.id}) for d in rows)
-
-            es_service.bulk_index(es_load_data)
-
-            last_change_date = pytz.UTC.localize(max(item.last_change_date for item in rows))
-            if last_change_date > last_sync_state:
-                last_sync_state = last_change_date
+        await runner.run(full)
+    finally:
+        await runner.close()
 
-        # Сохраняем состояние
-        state_manager.set_state('person_index_last_sync_state', last_sync_state.isoformat())
-        logger.info("✅ Обновление индекса персон завершено успешно")
 
-    except Exception as e:
-        logger.error(f"❌ Ошибка при обновлении индекса персон: {e}")
-        raise
-
-
-def update_genre_index():
-    """
-    Обновить индекс жанров в Elasticsearch с использованием новых сервисов.
-    """
-    # Инициализация сервисов
-    es_service = ElasticsearchService()
-    es_service.create_connection([settings.elasticsearch_settings.get_host()])
-
-    index_manager = ElasticsearchIndexManager(es_service.get_connection())
-    state_manager = StateManager(JsonFileStorage(logger=logger))
-
-    # Получаем состояние синхронизации
-    last_sync_state = state_manager.get_state('genre_index_last_sync_state')
+def replay_dead_letters(limit: int | None = None):
+    runner = EtlRunner()
+    try:
+        runner.replay_dead_letters(limit)
+    finally:
+        runner.close()
 
-    if last_sync_state is None:
-        last_sync_state = pytz.UTC.localize(datetime.min)
-    else:
-        last_sync_state = parser.isoparse(last_sync_state)
 
+def sizing():
+    es_service = create_es_connection()
     try:
-        # Обеспечиваем существование индекса с правильными анализаторами
-        index_manager.ensure_index_exists(Genre)
+        with psycopg.connect(make_conninfo(**settings.database_settings.get_dsn())) as connection:
+            report_sizing(es_service.get_connection(), connection, PIPELINES)
+    finally:
+        es_service.get_connection().close()
 
-        # Загружаем и индексируем данные
-        for rows in get_genres_index_data(settings.database_settings.get_dsn(), last_sync_state, 100):
-            es_load_data = (dict(d.to_dict(True, skip_empty=False), **{'_id': d.id}) for d in rows)
 
-            es_service.bulk_index(es_load_data)
+def run(full: bool = False, workers: int = 1):
+    etl_settings = settings.etl_settings
+    if etl_settings.metrics_enabled:
+        start_metrics_server(etl_settings.metrics_host, etl_settings.metrics_port)
 
-            last_change_date = pytz.UTC.localize(max(item.last_change_date for item in rows))
-            if last_change_date > last_sync_state:
-                last_sync_state = last_change_date
+    if etl_settings.async_enabled and workers == 1:
+        asyncio.run(run_async(full))
+        return
 
-        # Сохраняем состояние
-        state_manager.set_state('genre_index_last_sync_state', last_sync_state.isoformat())
-        logger.info("✅ Обновление индекса жанров завершено успешно")
-
-    except Exception as e:
-        logger.error(f"❌ Ошибка при обновлении индекса жанров: {e}")
-        raise
+    runner = EtlRunner()
+    try:
+        runner.run(full, workers)
+    finally:
+        runner.close()
 
 
 if __name__ == '__main__':
-    while True:
-        try:
-            update_movie_index()
-            update_genre_index()
-            update_person_index()
-            time.sleep(60)
-        except Exception as e:
-            logger.exception(e)
+    cli_args = parse_args()
+    if cli_args.command is None:
+        run(cli_args.full, cli_args.workers)
+    elif cli_args.command == 'replay-dead-letters':
+        replay_dead_letters(cli_args.limit)
+    elif cli_args.command == 'sizing':
+        sizing()
+    elif cli_args.command == 'benchmark':
+        benchmark_listing(create_es_connection().get_connection(), cli_args.indices, cli_args.runs)
+    elif cli_args.command in ('rollback', 'unpin'):
+        manage_pinned_version(cli_args)
+    else:
+        manage_index_versions(cli_args)
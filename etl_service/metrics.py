@@ -0,0 +1,213 @@
+"""
+Метрики ETL: время этапов, объёмы и отставание индексов от Postgres.
+
+Счётчики копятся в процессе и отдаются в текстовом формате Prometheus
+по HTTP (/metrics), а по итогам каждого цикла пишутся в лог одной JSON-строкой
+на индекс.
+"""
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterable, AsyncGenerator, Generator, Iterable, Sequence
+
+import orjson
+import pytz
+from logger import logger
+
+# Этапы обработки пачки: чтение из Postgres, подготовка тела _bulk, запрос к Elasticsearch
+STAGES = ('extract', 'transform', 'bulk')
+
+
+@dataclass
+class PipelineMetrics:
+    stage_seconds: dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    stage_count: dict[str, int] = field(default_factory=lambda: dict.fromkeys(STAGES, 0))
+    rows_fetched: int = 0
+    documents_indexed: int = 0
+    bytes_sent: int = 0
+    rejected: int = 0
+    # Самое позднее last_change_date среди проиндексированных документов (UTC)
+    newest_change: datetime | None = None
+
+    def lag_seconds(self) -> float | None:
+        if self.newest_change is None:
+            return None
+        return (datetime.now(pytz.UTC) - self.newest_change).total_seconds()
+
+
+class EtlMetrics:
+    """Метрики по индексам. Обновляются из цикла ETL, читаются HTTP-сервером в другом потоке."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: dict[str, PipelineMetrics] = {}
+        self._cycle_start: dict[str, PipelineMetrics] = {}
+        self._cycle_started_at = time.monotonic()
+        self._cycles = 0
+
+    def batches(self, pipeline: str, batches: Iterable[Sequence]) -> Generator[Sequence, None, None]:
+        """Учесть время чтения каждой пачки из Postgres и число строк в ней."""
+        iterator = iter(batches)
+        while True:
+            started_at = time.perf_counter()
+            rows = next(iterator, None)
+            if rows is None:
+                return
+            self._observe(pipeline, 'extract', time.perf_counter() - started_at, rows_fetched=len(rows))
+            yield rows
+
+    async def abatches(self, pipeline: str, batches: AsyncIterable[Sequence]) -> AsyncGenerator[Sequence, None]:
+        iterator = aiter(batches)
+        while True:
+            started_at = time.perf_counter()
+            rows = await anext(iterator, None)
+            if rows is None:
+                return
+            self._observe(pipeline, 'extract', time.perf_counter() - started_at, rows_fetched=len(rows))
+            yield rows
+
+    @contextmanager
+    def stage(self, pipeline: str, stage: str) -> Generator[None, None, None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(pipeline, stage, time.perf_counter() - started_at)
+
+    def record_bulk(self, pipeline: str, documents: int, bytes_sent: int, rejected: int):
+        with self._lock:
+            pipeline_metrics = self._pipeline(pipeline)
+            pipeline_metrics.documents_indexed += documents - rejected
+            pipeline_metrics.bytes_sent += bytes_sent
+            pipeline_metrics.rejected += rejected
+
+    def record_change_date(self, pipeline: str, last_change_date: datetime):
+        """Запомнить last_change_date проиндексированной пачки для расчёта отставания."""
+        if last_change_date.tzinfo is None:
+            last_change_date = pytz.UTC.localize(last_change_date)
+        with self._lock:
+            pipeline_metrics = self._pipeline(pipeline)
+            if pipeline_metrics.newest_change is None or last_change_date > pipeline_metrics.newest_change:
+                pipeline_metrics.newest_change = last_change_date
+
+    def finish_cycle(self):
+        """Записать в лог итоги цикла по каждому индексу и начать новый цикл."""
+        with self._lock:
+            elapsed = time.monotonic() - self._cycle_started_at
+            self._cycles += 1
+            summaries = [
+                self._summary(pipeline, totals, self._cycle_start.get(pipeline, PipelineMetrics()), elapsed)
+                for pipeline, totals in self._totals.items()
+            ]
+            self._cycle_start = copy.deepcopy(self._totals)
+            self._cycle_started_at = time.monotonic()
+
+        for summary in summaries:
+            logger.info(f"✅ Итоги цикла ETL: {orjson.dumps(summary).decode()}")
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            totals = copy.deepcopy(self._totals)
+            cycles = self._cycles
+
+        lines = [
+            '# HELP etl_cycles_total Завершённые циклы ETL',
+            '# TYPE etl_cycles_total counter',
+            f'etl_cycles_total {cycles}',
+            '# HELP etl_stage_seconds Время этапов обработки пачек',
+            '# TYPE etl_stage_seconds summary',
+        ]
+        for pipeline, pipeline_metrics in totals.items():
+            for stage in STAGES:
+                labels = f'pipeline="{pipeline}",stage="{stage}"'
+                lines.append(f'etl_stage_seconds_sum{{{labels}}} {pipeline_metrics.stage_seconds[stage]}')
+                lines.append(f'etl_stage_seconds_count{{{labels}}} {pipeline_metrics.stage_count[stage]}')
+
+        counters = (
+            ('etl_rows_fetched_total', 'Строки, прочитанные из Postgres', 'rows_fetched'),
+            ('etl_documents_indexed_total', 'Документы, принятые Elasticsearch', 'documents_indexed'),
+            ('etl_bulk_bytes_total', 'Байты документов, отправленных в _bulk', 'bytes_sent'),
+            ('etl_rejected_total', 'Документы, окончательно отклонённые Elasticsearch', 'rejected'),
+        )
+        for name, description, attribute in counters:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            lines += [
+                f'{name}{{pipeline="{pipeline}"}} {getattr(pipeline_metrics, attribute)}'
+                for pipeline, pipeline_metrics in totals.items()
+            ]
+
+        lines += [
+            '# HELP etl_freshness_lag_seconds Время с последнего изменения, попавшего в индекс',
+            '# TYPE etl_freshness_lag_seconds gauge',
+        ]
+        for pipeline, pipeline_metrics in totals.items():
+            lag = pipeline_metrics.lag_seconds()
+            if lag is not None:
+                lines.append(f'etl_freshness_lag_seconds{{pipeline="{pipeline}"}} {lag}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _observe(self, pipeline: str, stage: str, seconds: float, rows_fetched: int = 0):
+        with self._lock:
+            pipeline_metrics = self._pipeline(pipeline)
+            pipeline_metrics.stage_seconds[stage] += seconds
+            pipeline_metrics.stage_count[stage] += 1
+            pipeline_metrics.rows_fetched += rows_fetched
+
+    def _pipeline(self, pipeline: str) -> PipelineMetrics:
+        return self._totals.setdefault(pipeline, PipelineMetrics())
+
+    @staticmethod
+    def _summary(pipeline: str, totals: PipelineMetrics, start: PipelineMetrics, elapsed: float) -> dict:
+        stage_seconds = {
+            stage: round(totals.stage_seconds[stage] - start.stage_seconds[stage], 3) for stage in STAGES
+        }
+        documents_indexed = totals.documents_indexed - start.documents_indexed
+        busy_seconds = sum(stage_seconds.values())
+        lag = totals.lag_seconds()
+        return {
+            'pipeline': pipeline,
+            # С прошлой сводки; в событийном режиме сюда входит и обработка уведомлений
+            'period_seconds': round(elapsed, 3),
+            **{f'{stage}_seconds': seconds for stage, seconds in stage_seconds.items()},
+            'rows_fetched': totals.rows_fetched - start.rows_fetched,
+            'documents_indexed': documents_indexed,
+            'rows_per_second': round(documents_indexed / busy_seconds, 1) if busy_seconds else 0.0,
+            'bytes_sent': totals.bytes_sent - start.bytes_sent,
+            'rejected': totals.rejected - start.rejected,
+            'freshness_lag_seconds': round(lag, 3) if lag is not None else None,
+        }
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Опросы сборщика метрик не засоряют лог ETL
+        pass
+
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Запустить HTTP-сервер метрик в фоновом потоке."""
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name='etl-metrics', daemon=True).start()
+    logger.info(f"✅ Метрики ETL доступны на http://{host}:{port}/metrics")
+    return server
+
+
+metrics = EtlMetrics()
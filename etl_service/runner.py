@@ -0,0 +1,974 @@
+"""
+Долгоживущий ETL-процесс Postgres -> Elasticsearch
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Generator, Iterable, Type
+from uuid import UUID
+
+import orjson
+import psycopg
+import pytz
+from dateutil import parser
+from elasticsearch_dsl import Document
+from psycopg.conninfo import make_conninfo
+from psycopg.types.json import set_json_loads
+from psycopg_pool import ConnectionPool
+from redis import Redis
+
+from documents.genre import (
+    Genre,
+    aget_genres_index_data,
+    count_genres_index_data,
+    get_genres_index_data,
+    get_genres_index_data_by_ids,
+    get_genres_index_data_by_range,
+)
+from documents.index_row import IndexRow, register_raw_json_loader
+from documents.movie import (
+    Movie,
+    aget_movie_index_data,
+    count_movie_index_data,
+    get_movie_index_data,
+    get_movie_index_data_by_ids,
+    get_movie_index_data_by_range,
+)
+from documents.movie_renames import (
+    RenamedEntity,
+    aget_genre_renames,
+    aget_person_renames,
+    build_genre_rename_actions,
+    build_person_rename_actions,
+    get_genre_renames,
+    get_genre_renames_by_ids,
+    get_last_modified,
+    get_person_renames,
+    get_person_renames_by_ids,
+)
+from documents.person import (
+    Person,
+    aget_person_index_data,
+    count_person_index_data,
+    get_person_index_data,
+    get_person_index_data_by_ids,
+    get_person_index_data_by_range,
+)
+from helpers.uuid_ranges import uuid_ranges
+from interfaces.elasticsearch_interface import RejectedAction
+from interfaces.lease_manager_interface import Lease
+from logger import logger
+from metrics import metrics
+from services.change_listener import ChangeSet, PostgresChangeListener
+from services.elasticsearch_index_manager import ElasticsearchIndexManager
+from services.elasticsearch_service import ElasticsearchService
+from services.lease_manager import RedisLeaseManager
+from settings import settings
+from state_manager.base_storage import BaseStorage
+from state_manager.content_hash_storage import ContentHashStorage
+from state_manager.dead_letter_storage import DeadLetter, DeadLetterStorage
+from state_manager.json_file_storage import JsonFileStorage
+from state_manager.redis_storage import RedisStorage
+from state_manager.sqlite_storage import SqliteStorage
+from state_manager.state_manager import StateManager
+
+
+@dataclass(frozen=True)
+class IndexPipeline:
+    """Описание загрузки одного индекса: документ, ключ состояния и запросы к Postgres."""
+    document_class: Type[Document]
+    state_key: str
+    get_index_data: Callable
+    get_index_data_by_ids: Callable
+    get_index_data_by_range: Callable
+    count_index_data: Callable
+    title: str
+    # Асинхронная выгрузка изменений для AsyncEtlRunner
+    aget_index_data: Callable
+
+
+MOVIES_PIPELINE = IndexPipeline(
+    Movie,
+    'movie_index_last_sync_state',
+    get_movie_index_data,
+    get_movie_index_data_by_ids,
+    get_movie_index_data_by_range,
+    count_movie_index_data,
+    'фильмов',
+    aget_movie_index_data,
+)
+PERSONS_PIPELINE = IndexPipeline(
+    Person,
+    'person_index_last_sync_state',
+    get_person_index_data,
+    get_person_index_data_by_ids,
+    get_person_index_data_by_range,
+    count_person_index_data,
+    'персон',
+    aget_person_index_data,
+)
+GENRES_PIPELINE = IndexPipeline(
+    Genre,
+    'genre_index_last_sync_state',
+    get_genres_index_data,
+    get_genres_index_data_by_ids,
+    get_genres_index_data_by_range,
+    count_genres_index_data,
+    'жанров',
+    aget_genres_index_data,
+)
+
+PIPELINES = (MOVIES_PIPELINE, GENRES_PIPELINE, PERSONS_PIPELINE)
+PIPELINES_BY_INDEX = {pipeline.document_class.Index.name: pipeline for pipeline in PIPELINES}
+
+
+@dataclass(frozen=True)
+class RenameFanOut:
+    """Распространение переименований из таблицы table на вложенные записи фильмов."""
+    table: str
+    state_key: str
+    get_renames: Callable
+    build_actions: Callable
+    # Асинхронная выгрузка переименований для AsyncEtlRunner
+    aget_renames: Callable
+
+
+RENAME_FAN_OUTS = (
+    RenameFanOut(
+        'person',
+        'movie_person_renames_last_sync_state',
+        get_person_renames,
+        build_person_rename_actions,
+        aget_person_renames,
+    ),
+    RenameFanOut(
+        'genre',
+        'movie_genre_renames_last_sync_state',
+        get_genre_renames,
+        build_genre_rename_actions,
+        aget_genre_renames,
+    ),
+)
+
+# Запас на расхождение часов Postgres и Elasticsearch при откате
+ROLLBACK_STATE_MARGIN = timedelta(minutes=5)
+
+
+def configure_connection(connection: psycopg.Connection):
+    # Документы приходят из Postgres готовым jsonb: в режиме raw_bulk они уходят
+    # в Elasticsearch байтами как есть, иначе разбираются orjson
+    if settings.etl_settings.raw_bulk:
+        register_raw_json_loader(connection)
+    else:
+        set_json_loads(orjson.loads, connection)
+
+
+def create_es_service() -> ElasticsearchService:
+    es_settings = settings.elasticsearch_settings
+    es_service = ElasticsearchService(
+        connections_per_node=es_settings.connections_per_node,
+        request_timeout=es_settings.request_timeout,
+        max_retries=es_settings.max_retries,
+        bulk_retries=es_settings.bulk_retries,
+        retry_backoff=es_settings.retry_backoff,
+        retry_max_backoff=es_settings.retry_max_backoff,
+    )
+    es_service.create_connection([es_settings.get_host()])
+    return es_service
+
+
+def create_redis() -> Redis:
+    return Redis(host=settings.redis_settings.host, port=settings.redis_settings.port)
+
+
+def create_state_storage() -> BaseStorage:
+    storage = settings.etl_settings.state_storage
+
+    if storage == 'redis':
+        return RedisStorage(logger, create_redis())
+    if storage == 'json':
+        return JsonFileStorage(logger=logger)
+    return SqliteStorage(logger)
+
+
+def create_lease_manager() -> RedisLeaseManager | None:
+    if not settings.etl_settings.coordination_enabled:
+        return None
+    return RedisLeaseManager(create_redis(), settings.etl_settings.lease_ttl_seconds)
+
+
+def hold_lease(lease_manager: RedisLeaseManager | None, name: str) -> AbstractContextManager[Lease]:
+    """Аренда для работы name; без координации работа всегда принадлежит этому экземпляру."""
+    if lease_manager is None:
+        return nullcontext(Lease(name, acquired=True))
+    return lease_manager.hold(name)
+
+
+def create_dead_letter_storage() -> DeadLetterStorage:
+    return DeadLetterStorage(logger, settings.etl_settings.dead_letter_path)
+
+
+def send_index_rows(
+        es_service: ElasticsearchService, alias: str, index_name: str, rows: list[IndexRow]
+) -> list[RejectedAction]:
+    """
+    Отправить пачку документов в index_name и учесть её в метриках индекса alias.
+
+    В _bulk документы всегда уходят готовыми байтами: в режиме raw_bulk их отдаёт
+    Postgres, иначе они сериализуются здесь. Так размер тела запроса известен без
+    повторной сериализации.
+    """
+    with metrics.stage(alias, 'transform'):
+        documents = [
+            (str(row.id), row.document if isinstance(row.document, bytes) else orjson.dumps(row.document))
+            for row in rows
+        ]
+
+    with metrics.stage(alias, 'bulk'):
+        rejected = es_service.bulk_index_raw(index_name, documents)
+
+    metrics.record_bulk(alias, len(documents), sum(len(source) for _, source in documents), len(rejected))
+    rejected_ids = {str(item.action['_id']) for item in rejected}
+    accepted_dates = [row.last_change_date for row in rows if str(row.id) not in rejected_ids]
+    if accepted_dates:
+        metrics.record_change_date(alias, max(accepted_dates))
+    return rejected
+
+
+def advance_sync_state(last_sync_state: datetime, rows: list) -> datetime:
+    """Отметка синхронизации после пачки rows: самое позднее изменение в ней, если оно новее."""
+    return max(last_sync_state, pytz.UTC.localize(max(row.last_change_date for row in rows)))
+
+
+def rewind_sync_state(state_manager: StateManager, pipeline: IndexPipeline, since: datetime) -> None:
+    """
+    Вернуть состояние синхронизации индекса на since, если оно ушло дальше.
+
+    Для фильмов вместе с ним возвращаются состояния переименований. Следующий цикл
+    перечитает изменения начиная с since; отсутствующее состояние не трогается.
+    """
+    state_keys = [pipeline.state_key]
+    if pipeline is MOVIES_PIPELINE:
+        state_keys += [fan_out.state_key for fan_out in RENAME_FAN_OUTS]
+
+    for state_key in state_keys:
+        last_sync_state = state_manager.get_state(state_key)
+        if last_sync_state is not None and parser.isoparse(last_sync_state) > since:
+            state_manager.set_state(state_key, since.isoformat())
+
+
+def migrate_index_version(
+        index_manager: ElasticsearchIndexManager,
+        pipeline: IndexPipeline,
+        check_lease: Callable[[], None] | None = None,
+) -> bool:
+    """
+    Перенести индекс в новую версию серверным _reindex, если все поля нового
+    описания есть в старом индексе, а поля старых документов — в новом описании.
+
+    Общий шаг blue/green перестроения EtlRunner и AsyncEtlRunner: вызовы
+    менеджера индексов синхронные, асинхронный ETL выполняет его в отдельном потоке.
+    Изменения, записанные в старую версию во время переноса, в новую могут не попасть,
+    поэтому после успешного переноса вызывающий возвращает состояние синхронизации
+    на время Postgres перед его началом (rewind_sync_state).
+
+    Args:
+        check_lease: Проверка аренды перед переключением alias
+
+    Returns:
+        True если новая версия стала живой, False если её нужно заполнить из Postgres
+    """
+    document_class = pipeline.document_class
+    missing_fields = index_manager.missing_source_fields(document_class)
+    if missing_fields:
+        logger.info(
+            f"Индекс {document_class.Index.name}: поля {', '.join(missing_fields)} есть только в Postgres, "
+            f"новая версия заполняется из базы"
+        )
+        return False
+
+    removed_fields = index_manager.removed_source_fields(document_class)
+    if removed_fields:
+        logger.info(
+            f"Индекс {document_class.Index.name}: поля {', '.join(removed_fields)} убраны из описания, "
+            f"но есть в старых документах, новая версия заполняется из базы"
+        )
+        return False
+
+    with index_manager.building_index_version(document_class) as target_index:
+        try:
+            index_manager.reindex_index_version(document_class, target_index)
+        except Exception as e:
+            # Недостроенная версия удаляется на выходе из блока, база заполнит новую
+            logger.warning(
+                f"⚠️ Индекс {document_class.Index.name}: перенос через _reindex не удался ({e}), "
+                f"новая версия заполняется из базы"
+            )
+            return False
+
+        if check_lease is not None:
+            check_lease()
+        index_manager.activate_index_version(document_class, target_index)
+
+    index_manager.cleanup_index_versions(document_class)
+    logger.info(f"✅ Индекс {document_class.Index.name} перенесён в {target_index}")
+    return True
+
+
+def record_rejected(dead_letters: DeadLetterStorage, alias: str, rejected: list[RejectedAction]) -> set[str]:
+    """
+    Сохранить отклонённые операции в очередь недоставленных.
+
+    Тело индексируемого документа не сохраняется: при повторе документ
+    заново выгружается из Postgres.
+
+    Returns:
+        id отклонённых документов
+    """
+    for item in rejected:
+        action = {key: value for key, value in item.action.items() if key != '_source'}
+        dead_letters.add(alias, str(item.action['_id']), action, item.status, item.error)
+    return {str(item.action['_id']) for item in rejected}
+
+
+def index_partition(alias: str, target_index: str, lower: UUID, upper: UUID | None) -> str | None:
+    """
+    Загрузить один диапазон id в target_index. Выполняется в отдельном процессе
+    со своим соединением с Postgres и клиентом Elasticsearch.
+
+    Returns:
+        Последнее изменение среди загруженных строк (ISO) или None, если диапазон пуст
+    """
+    pipeline = PIPELINES_BY_INDEX[alias]
+    last_change_date = None
+
+    # Аренда диапазона не даёт двум координаторам (например, после переключения) загружать его одновременно
+    with hold_lease(create_lease_manager(), f'partition:{target_index}:{lower}') as lease:
+        if not lease:
+            raise RuntimeError(f"Диапазон {lower} индекса {target_index} загружает другой экземпляр")
+
+        es_service = create_es_service()
+        dead_letters = create_dead_letter_storage()
+        try:
+            with psycopg.connect(make_conninfo(**settings.database_settings.get_dsn())) as connection:
+                configure_connection(connection)
+                batches = pipeline.get_index_data_by_range(connection, lower, upper, 100)
+                for rows in metrics.batches(alias, batches):
+                    lease.check()
+                    record_rejected(dead_letters, alias, send_index_rows(es_service, alias, target_index, rows))
+
+                    batch_change_date = max(row.last_change_date for row in rows)
+                    if last_change_date is None or batch_change_date > last_change_date:
+                        last_change_date = batch_change_date
+
+            # Метрики процесса-загрузчика не попадают в /metrics координатора, поэтому пишутся в лог
+            metrics.finish_cycle()
+        finally:
+            es_service.get_connection().close()
+            dead_letters.close()
+
+    return pytz.UTC.localize(last_change_date).isoformat() if last_change_date is not None else None
+
+
+class EtlRunner:
+    """
+    ETL-процесс, живущий между циклами синхронизации.
+
+    Один клиент Elasticsearch с пулом HTTP-соединений и пул соединений Postgres
+    создаются при старте и переиспользуются всеми циклами. Проверка индекса
+    выполняется один раз для каждой версии описания документа и повторяется
+    только после смены маппинга или ошибки цикла.
+
+    С включённой координацией несколько экземпляров делят работу через аренды в Redis:
+    индекс обновляет тот, кто захватил его аренду, уведомления NOTIFY обрабатывает
+    держатель аренды changes, а состояние синхронизации общее.
+    """
+
+    def __init__(self):
+        database_settings = settings.database_settings
+        etl_settings = settings.etl_settings
+
+        if etl_settings.coordination_enabled and etl_settings.state_storage != 'redis':
+            raise ValueError("Координация нескольких экземпляров требует ETL_STATE_STORAGE=redis")
+
+        self.es_service = create_es_service()
+
+        self.index_manager = ElasticsearchIndexManager(
+            self.es_service.get_connection(), settings.etl_settings.force_merge_max_segments
+        )
+        self.state_manager = StateManager(create_state_storage())
+
+        # check_connection перед выдачей соединения прозрачно заменяет разорванные соединения
+        self.db_pool = ConnectionPool(
+            make_conninfo(**database_settings.get_dsn()),
+            min_size=database_settings.pool_min_size,
+            max_size=database_settings.pool_max_size,
+            check=ConnectionPool.check_connection,
+            configure=configure_connection,
+            name='etl',
+            open=True,
+        )
+
+        self.change_listener = None
+        if settings.etl_settings.listen_enabled:
+            self.change_listener = PostgresChangeListener(database_settings.get_dsn())
+
+        self.lease_manager = create_lease_manager()
+        self.dead_letters = create_dead_letter_storage()
+
+        # Локальные хэши верны, только пока индексы пишет один экземпляр
+        self.content_hashes = None
+        if etl_settings.content_hash_enabled and not etl_settings.coordination_enabled:
+            self.content_hashes = ContentHashStorage(logger, etl_settings.content_hash_path)
+
+        # alias -> версия описания документа, для которой индекс уже проверен
+        self._verified_indices: dict[str, str] = {}
+        # Аренда, под которой выполняется текущая работа; проверяется перед каждой записью
+        self._lease: Lease | None = None
+
+    def run(self, full: bool = False, workers: int = 1):
+        while True:
+            try:
+                self.run_cycle(full, workers)
+                # Полная синхронизация выполняется только один раз, дальше работаем инкрементально
+                full = False
+                metrics.finish_cycle()
+                self.wait_for_changes()
+            except Exception as e:
+                # После сбоя индексы проверяются заново: их могли удалить или пересоздать
+                self._verified_indices.clear()
+                logger.exception(e)
+
+    def close(self):
+        if self.change_listener is not None:
+            self.change_listener.close()
+        if self.content_hashes is not None:
+            self.content_hashes.close()
+        self.dead_letters.close()
+        self.db_pool.close()
+        self.es_service.get_connection().close()
+
+    def run_cycle(self, full: bool = False, workers: int = 1):
+        """Полный проход по изменениям; в событийном режиме служит страховочной сверкой."""
+        for pipeline in PIPELINES:
+            alias = pipeline.document_class.Index.name
+
+            with self._hold(f'pipeline:{alias}') as lease:
+                if not lease:
+                    logger.info(f"Индекс {alias} обновляет другой экземпляр, пропускаем")
+                    continue
+
+                # Пока аренда была у другого экземпляра, он мог сдвинуть общее состояние
+                self.state_manager.reload()
+                unfinished = self.state_manager.get_state(f'{pipeline.state_key}_partitions')
+
+                if full and workers > 1:
+                    self.rebuild_index_parallel(pipeline, workers)
+                elif unfinished:
+                    # Параллельная переиндексация прервалась (в том числе на другом экземпляре)
+                    self.rebuild_index_parallel(pipeline, unfinished['workers'])
+                else:
+                    self.update_index(pipeline, full)
+
+                if pipeline is MOVIES_PIPELINE:
+                    self.update_movie_renames()
+
+    def update_index(self, pipeline: IndexPipeline, full: bool = False):
+        try:
+            if self.ensure_index(pipeline):
+                return
+
+            last_sync_state = self._get_sync_state(pipeline.state_key)
+            if last_sync_state is None or full:
+                last_sync_state = pytz.UTC.localize(datetime.min)
+
+            with self.db_pool.connection() as connection:
+                with self._bulk_load_context(pipeline, connection, last_sync_state, full):
+                    # При --full документы отправляются заново даже с неизменным содержимым
+                    last_sync_state = self._index_batches(
+                        pipeline,
+                        pipeline.get_index_data(connection, last_sync_state, 100),
+                        last_sync_state,
+                        skip_unchanged=not full,
+                    )
+
+            self._set_state(pipeline.state_key, last_sync_state.isoformat())
+            logger.info(f"✅ Обновление индекса {pipeline.title} завершено успешно")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при обновлении индекса {pipeline.title}: {e}")
+            raise
+
+    def ensure_index(self, pipeline: IndexPipeline) -> bool:
+        """
+        Проверить индекс, если его описание ещё не проверялось.
+
+        Returns:
+            True если индекс был перестроен и уже содержит актуальные данные
+        """
+        document_class = pipeline.document_class
+        alias = document_class.Index.name
+        mapping_version = self.index_manager.get_mapping_version(document_class)
+
+        if self._verified_indices.get(alias) == mapping_version:
+            return False
+
+        if self.index_manager.ensure_index_exists(document_class):
+            self._forget_all_hashes(alias)
+
+        rebuilt = False
+        if self.index_manager.index_needs_recreation(document_class):
+            self.rebuild_index(pipeline)
+            rebuilt = True
+        else:
+            self.index_manager.apply_dynamic_settings(document_class)
+
+        self._verified_indices[alias] = mapping_version
+        return rebuilt
+
+    def rebuild_index(self, pipeline: IndexPipeline):
+        """
+        Blue/green перестроение индекса.
+
+        Новая версия заполняется, пока клиенты продолжают читать старую, затем alias
+        переключается атомарно, а лишние старые версии удаляются. Если все поля нового
+        описания есть в старом индексе, документы переносятся серверным _reindex
+        (migrate_index_version), а состояние синхронизации возвращается на начало
+        переноса; иначе версия заполняется из Postgres целиком.
+        """
+        with self.db_pool.connection() as connection:
+            started_at = connection.execute('SELECT now()').fetchone()[0]
+
+        if migrate_index_version(self.index_manager, pipeline, self._check_lease):
+            # Копия может быть старше документов, записанных во время переноса,
+            # поэтому их хэши неверны, а сами изменения загрузит следующий цикл
+            self._check_lease()
+            rewind_sync_state(self.state_manager, pipeline, started_at)
+            self._forget_all_hashes(pipeline.document_class.Index.name)
+            return
+
+        document_class = pipeline.document_class
+        last_sync_state = pytz.UTC.localize(datetime.min)
+        # Новая версия пуста, поэтому хэши старой версии к ней неприменимы
+        self._forget_all_hashes(document_class.Index.name)
+
+        with self.index_manager.building_index_version(document_class) as target_index:
+            with self.db_pool.connection() as connection:
+                last_sync_state = self._index_batches(
+                    pipeline,
+                    pipeline.get_index_data(connection, last_sync_state, 100),
+                    last_sync_state,
+                    target_index,
+                    skip_unchanged=False,
+                )
+
+            self._check_lease()
+            self.index_manager.activate_index_version(document_class, target_index)
+
+        self._set_state(pipeline.state_key, last_sync_state.isoformat())
+        self.index_manager.cleanup_index_versions(document_class)
+        logger.info(f"✅ Индекс {document_class.Index.name} перестроен в {target_index}")
+
+    def rebuild_index_parallel(self, pipeline: IndexPipeline, workers: int):
+        """
+        Полная переиндексация в несколько процессов (--full --workers N).
+
+        Пространство id делится на N диапазонов, каждый процесс загружает свой
+        диапазон в общую новую версию индекса. Завершённые диапазоны фиксируются
+        в состоянии, поэтому прерванная переиндексация продолжается с оставшихся.
+
+        Состоянием синхронизации становится время Postgres на старте переиндексации:
+        изменения, сделанные во время загрузки (в том числе в уже загруженных
+        диапазонах), подхватит следующий инкрементальный проход.
+        """
+        document_class = pipeline.document_class
+        alias = document_class.Index.name
+        progress_key = f'{pipeline.state_key}_partitions'
+        progress = self.state_manager.get_state(progress_key)
+
+        if (
+                progress
+                and progress['workers'] == workers
+                and self.es_service.get_connection().indices.exists(index=progress['target_index'])
+        ):
+            logger.info(f"Индекс {alias}: продолжаем загрузку в {progress['target_index']}")
+        else:
+            with self.db_pool.connection() as connection:
+                started_at = connection.execute('SELECT now()').fetchone()[0]
+            target_index = self.index_manager.recreate_index_with_analyzers(document_class)
+            progress = {
+                'target_index': target_index,
+                'workers': workers,
+                'started_at': started_at.isoformat(),
+                'done': {},
+            }
+            self._set_state(progress_key, progress)
+
+        target_index = progress['target_index']
+        # Новая версия наполняется в обход хэшей, поэтому сохранённые хэши к ней неприменимы
+        self._forget_all_hashes(alias)
+
+        pending = {
+            str(partition): bounds
+            for partition, bounds in enumerate(uuid_ranges(workers))
+            if str(partition) not in progress['done']
+        }
+        failed = []
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {
+                executor.submit(index_partition, alias, target_index, lower, upper): partition
+                for partition, (lower, upper) in pending.items()
+            }
+            for future in as_completed(futures):
+                partition = futures[future]
+                try:
+                    progress['done'][partition] = future.result()
+                except Exception as e:
+                    failed.append(partition)
+                    logger.error(f"❌ Индекс {alias}: ошибка загрузки диапазона {partition}: {e}")
+                    continue
+
+                self._set_state(progress_key, progress)
+                logger.info(f"Индекс {alias}: диапазон {partition} из {workers} загружен в {target_index}")
+
+        if failed:
+            raise RuntimeError(f"Индекс {alias}: не загружены диапазоны {', '.join(sorted(failed))}")
+
+        if 'started_at' in progress:
+            last_sync_state = parser.isoparse(progress['started_at'])
+        else:
+            # Переиндексация начата до появления started_at: время старта неизвестно,
+            # поэтому следующий инкрементальный проход перечитает все изменения
+            last_sync_state = pytz.UTC.localize(datetime.min)
+
+        self._check_lease()
+
+        self.index_manager.activate_index_version(document_class, target_index)
+        self._set_state(pipeline.state_key, last_sync_state.isoformat())
+        self._set_state(progress_key, None)
+        self.index_manager.cleanup_index_versions(document_class)
+        logger.info(f"✅ Индекс {alias} перестроен в {target_index} ({workers} процессов)")
+
+    def update_movie_renames(self):
+        """
+        Распространить переименования персон и жанров на документы фильмов.
+        Затрагиваются только вложенные записи, фильмы заново не агрегируются.
+        """
+        try:
+            with self.db_pool.connection() as connection:
+                for fan_out in RENAME_FAN_OUTS:
+                    last_sync_state = self._get_sync_state(fan_out.state_key)
+
+                    if last_sync_state is None:
+                        # При первом запуске фильмы индексируются целиком с актуальными именами,
+                        # поэтому переименования отслеживаются только начиная с текущего момента
+                        last_modified = get_last_modified(connection, fan_out.table)
+                        if last_modified is not None:
+                            self._set_state(fan_out.state_key, pytz.UTC.localize(last_modified).isoformat())
+                        continue
+
+                    for renames in fan_out.get_renames(connection, last_sync_state, 100):
+                        self._apply_renames(renames, fan_out.build_actions)
+                        last_sync_state = advance_sync_state(last_sync_state, renames)
+
+                    self._set_state(fan_out.state_key, last_sync_state.isoformat())
+
+            logger.info("✅ Переименования персон и жанров распространены на фильмы")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при обновлении имён в индексе фильмов: {e}")
+            raise
+
+    def reindex_changes(self, changes: ChangeSet):
+        """
+        Переиндексировать только документы, затронутые изменениями из канала NOTIFY.
+        Документы, которых больше нет в Postgres, удаляются из индексов.
+        """
+        requested_ids = {
+            MOVIES_PIPELINE: changes.movie_ids,
+            PERSONS_PIPELINE: changes.person_ids,
+            GENRES_PIPELINE: changes.genre_ids,
+        }
+
+        try:
+            with self.db_pool.connection() as connection:
+                for pipeline, ids in requested_ids.items():
+                    if ids:
+                        self._reindex_by_ids(pipeline, connection, ids)
+
+                # Переименования доходят до фильмов частичными обновлениями вложенных записей
+                for renames in get_person_renames_by_ids(connection, changes.renamed_person_ids):
+                    self._apply_renames(renames, build_person_rename_actions)
+                for renames in get_genre_renames_by_ids(connection, changes.renamed_genre_ids):
+                    self._apply_renames(renames, build_genre_rename_actions)
+
+            logger.info(
+                f"✅ Переиндексированы изменения: фильмы {len(changes.movie_ids)}, "
+                f"персоны {len(changes.person_ids)}, жанры {len(changes.genre_ids)}"
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при переиндексации изменений: {e}")
+            raise
+
+    def replay_dead_letters(self, limit: int | None = None) -> int:
+        """
+        Повторить операции из очереди недоставленных.
+
+        Индексируемые документы заново выгружаются из Postgres, поэтому повтор
+        подхватывает исправленные данные; документы, которых больше нет в Postgres,
+        удаляются из индекса. Частичные обновления отправляются как были сохранены.
+
+        Returns:
+            Количество успешно повторённых операций
+        """
+        letters = self.dead_letters.fetch(limit)
+        replayed = []
+
+        with self.db_pool.connection() as connection:
+            for alias in {letter.index_name for letter in letters}:
+                pipeline = PIPELINES_BY_INDEX[alias]
+                index_letters = [letter for letter in letters if letter.index_name == alias]
+                replayed += self._replay_index_letters(pipeline, connection, index_letters)
+                replayed += self._replay_stored_letters(alias, index_letters)
+
+        self.dead_letters.remove(letter.id for letter in replayed)
+        logger.info(
+            f"✅ Повторено операций: {len(replayed)} из {len(letters)}, "
+            f"в очереди осталось {self.dead_letters.count()}"
+        )
+        return len(replayed)
+
+    def rollback_index(self, alias: str) -> str:
+        """
+        Вернуть alias на предыдущую версию индекса.
+
+        Предыдущая версия перестала получать записи, когда создали
+        следующую, поэтому состояние синхронизации перематывается
+        на момент её создания, а хэши содержимого сбрасываются:
+        пропущенные изменения загрузятся в следующем цикле.
+        Откаченная версия закрепляется и не пересоздаётся до unpin.
+
+        Returns:
+            Имя индекса, ставшего живым
+        """
+        pipeline = PIPELINES_BY_INDEX[alias]
+
+        with self._hold(f'pipeline:{alias}') as lease:
+            if not lease:
+                raise RuntimeError(f"Индекс {alias} обновляет другой экземпляр")
+
+            self.state_manager.reload()
+            index_name, replaced_at = self.index_manager.rollback_index_version(pipeline.document_class)
+
+            if replaced_at is not None:
+                rewind_to = replaced_at - ROLLBACK_STATE_MARGIN
+            else:
+                rewind_to = pytz.UTC.localize(datetime.min)
+            self._check_lease()
+            rewind_sync_state(self.state_manager, pipeline, rewind_to)
+
+            self._forget_all_hashes(alias)
+            self._verified_indices.pop(alias, None)
+
+        logger.info(f"✅ {alias} откачен на {index_name}, загрузка с {rewind_to.isoformat()}")
+        return index_name
+
+    def unpin_index(self, alias: str):
+        """Снять закрепление откаченной версии индекса."""
+        self.index_manager.unpin_index_version(PIPELINES_BY_INDEX[alias].document_class)
+        self._verified_indices.pop(alias, None)
+
+    def _replay_index_letters(
+            self, pipeline: IndexPipeline, connection: psycopg.Connection, letters: list[DeadLetter]
+    ) -> list[DeadLetter]:
+        letters_by_id = {
+            letter.doc_id: letter for letter in letters if letter.action.get('_op_type', 'index') == 'index'
+        }
+        if not letters_by_id:
+            return []
+
+        missing_ids = set(letters_by_id)
+        rejected_ids = set()
+
+        for rows in pipeline.get_index_data_by_ids(connection, set(letters_by_id)):
+            rejected_ids |= self._bulk_index_rows(pipeline, rows, skip_unchanged=False)
+            missing_ids.difference_update(str(row.id) for row in rows)
+
+        if missing_ids:
+            self._delete_documents(pipeline, missing_ids)
+
+        return [letter for doc_id, letter in letters_by_id.items() if doc_id not in rejected_ids]
+
+    def _replay_stored_letters(self, alias: str, letters: list[DeadLetter]) -> list[DeadLetter]:
+        stored = [letter for letter in letters if letter.action.get('_op_type', 'index') != 'index']
+        if not stored:
+            return []
+
+        rejected = self.es_service.bulk_index((letter.action for letter in stored), ignore_status=(404,))
+        rejected_ids = record_rejected(self.dead_letters, alias, rejected)
+        return [letter for letter in stored if letter.doc_id not in rejected_ids]
+
+    def wait_for_changes(self):
+        """
+        Ожидание до следующего опроса Postgres.
+        В событийном режиме всё это время обрабатываются уведомления об изменениях.
+        """
+        etl_settings = settings.etl_settings
+
+        if self.change_listener is None:
+            time.sleep(etl_settings.poll_interval)
+            return
+
+        with self._hold('changes') as lease:
+            if not lease:
+                # Уведомления обрабатывает другой экземпляр
+                time.sleep(etl_settings.poll_interval)
+                return
+
+            deadline = time.monotonic() + etl_settings.poll_interval
+            while (remaining := deadline - time.monotonic()) > 0:
+                changes = self.change_listener.wait(remaining, etl_settings.debounce_seconds)
+                if changes:
+                    self.reindex_changes(changes)
+
+    @contextmanager
+    def _hold(self, name: str) -> Generator[Lease, None, None]:
+        """Удерживать аренду name и проверять её перед записями внутри блока."""
+        with hold_lease(self.lease_manager, name) as lease:
+            self._lease = lease if lease else None
+            try:
+                yield lease
+            finally:
+                self._lease = None
+
+    def _check_lease(self):
+        """Прервать цикл, если аренду перехватил другой экземпляр: его записи новее наших."""
+        if self._lease is not None:
+            self._lease.check()
+
+    def _set_state(self, key: str, value):
+        self._check_lease()
+        self.state_manager.set_state(key, value)
+
+    def _reindex_by_ids(self, pipeline: IndexPipeline, connection: psycopg.Connection, ids: set[str]):
+        missing_ids = set(ids)
+
+        batches = pipeline.get_index_data_by_ids(connection, ids)
+        for rows in metrics.batches(pipeline.document_class.Index.name, batches):
+            self._bulk_index_rows(pipeline, rows)
+            missing_ids.difference_update(str(d.id) for d in rows)
+
+        if missing_ids:
+            self._delete_documents(pipeline, missing_ids)
+
+    def _delete_documents(self, pipeline: IndexPipeline, doc_ids: set[str]):
+        index_name = pipeline.document_class.Index.name
+        self._check_lease()
+        rejected = self.es_service.bulk_index(
+            ({'_op_type': 'delete', '_index': index_name, '_id': doc_id} for doc_id in doc_ids),
+            ignore_status=(404,),
+        )
+        record_rejected(self.dead_letters, index_name, rejected)
+        self._forget_hashes(index_name, doc_ids)
+
+    def _apply_renames(self, renames: list[RenamedEntity], build_actions: Callable):
+        self._check_lease()
+        rejected = self.es_service.bulk_index(build_actions(renames), ignore_status=(404,))
+        record_rejected(self.dead_letters, Movie.Index.name, rejected)
+        # Скрипт меняет документы фильмов в обход хэшей, поэтому сохранённые хэши больше не верны
+        self._forget_hashes(Movie.Index.name, (film_work_id for item in renames for film_work_id in item.film_work_ids))
+
+    def _index_batches(
+            self,
+            pipeline: IndexPipeline,
+            batches: Iterable[list[IndexRow]],
+            last_sync_state: datetime,
+            index_name: str | None = None,
+            skip_unchanged: bool = True,
+    ) -> datetime:
+        """Проиндексировать пачки документов и вернуть новую отметку синхронизации."""
+        for rows in metrics.batches(pipeline.document_class.Index.name, batches):
+            self._bulk_index_rows(pipeline, rows, index_name, skip_unchanged)
+            last_sync_state = advance_sync_state(last_sync_state, rows)
+
+        return last_sync_state
+
+    def _bulk_index_rows(
+            self,
+            pipeline: IndexPipeline,
+            rows: list[IndexRow],
+            index_name: str | None = None,
+            skip_unchanged: bool = True,
+    ) -> set[str]:
+        """
+        Отправить пачку документов в Elasticsearch.
+
+        Документы, содержимое которых не изменилось с прошлой отправки, пропускаются:
+        правка, не затрагивающая поиск, не должна приводить к переиндексации.
+        Отклонённые документы уходят в очередь недоставленных, остальная пачка индексируется.
+
+        Returns:
+            id отклонённых документов
+        """
+        alias = pipeline.document_class.Index.name
+        target_index = index_name or alias
+
+        if self.content_hashes is not None and skip_unchanged:
+            with metrics.stage(alias, 'transform'):
+                hashes = {str(row.id): row.content_hash for row in rows}
+                changed_ids = self.content_hashes.filter_changed(alias, hashes)
+            if len(changed_ids) < len(rows):
+                logger.debug(f"Индекс {alias}: пропущено {len(rows) - len(changed_ids)} неизменённых документов")
+            rows = [row for row in rows if str(row.id) in changed_ids]
+
+        if not rows:
+            return set()
+
+        self._check_lease()
+        rejected = send_index_rows(self.es_service, alias, target_index, rows)
+        rejected_ids = record_rejected(self.dead_letters, alias, rejected)
+
+        if self.content_hashes is not None:
+            # Хэши фиксируются только для документов, принятых Elasticsearch
+            self.content_hashes.save(
+                alias, {str(row.id): row.content_hash for row in rows if str(row.id) not in rejected_ids}
+            )
+        return rejected_ids
+
+    def _forget_hashes(self, index_name: str, doc_ids: Iterable):
+        if self.content_hashes is not None:
+            self.content_hashes.delete(index_name, doc_ids)
+
+    def _forget_all_hashes(self, index_name: str):
+        if self.content_hashes is not None:
+            self.content_hashes.clear(index_name)
+
+    def _bulk_load_context(
+            self,
+            pipeline: IndexPipeline,
+            connection: psycopg.Connection,
+            last_sync_state: datetime,
+            full: bool,
+    ) -> AbstractContextManager:
+        """
+        Режим массовой загрузки для полной синхронизации (--full) или большого числа изменений.
+        В остальных случаях индекс остаётся с рабочими настройками.
+        """
+        document_class = pipeline.document_class
+
+        if not full:
+            backlog = pipeline.count_index_data(connection, last_sync_state)
+            if backlog < settings.etl_settings.bulk_load_threshold:
+                return nullcontext()
+            logger.info(f"Индекс {document_class.Index.name}: {backlog} изменений, используется массовая загрузка")
+
+        return self.index_manager.bulk_load_mode(document_class)
+
+    def _get_sync_state(self, state_key: str) -> datetime | None:
+        last_sync_state = self.state_manager.get_state(state_key)
+        return parser.isoparse(last_sync_state) if last_sync_state is not None else None
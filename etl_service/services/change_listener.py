@@ -0,0 +1,131 @@
+"""
+Слушатель изменений Postgres через LISTEN/NOTIFY
+"""
+import json
+import select
+import time
+from dataclasses import dataclass, field
+
+import psycopg
+from helpers.backoff_func_wrapper import backoff
+from logger import logger
+from psycopg import Notify, sql
+from psycopg.conninfo import make_conninfo
+
+# Канал задан в триггере content.notify_content_change
+# (movies_admin/movies/migrations/0003_content_change_notify_triggers.py), поэтому не настраивается
+NOTIFY_CHANNEL = 'content_changes'
+
+
+@dataclass
+class ChangeSet:
+    """
+    Набор id, изменившихся за окно дебаунса.
+
+    movie_ids/person_ids/genre_ids — документы соответствующих индексов,
+    renamed_person_ids/renamed_genre_ids — персоны и жанры, чьи имена нужно обновить в фильмах.
+    """
+    movie_ids: set[str] = field(default_factory=set)
+    person_ids: set[str] = field(default_factory=set)
+    genre_ids: set[str] = field(default_factory=set)
+    renamed_person_ids: set[str] = field(default_factory=set)
+    renamed_genre_ids: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return any((
+            self.movie_ids,
+            self.person_ids,
+            self.genre_ids,
+            self.renamed_person_ids,
+            self.renamed_genre_ids,
+        ))
+
+    def add(self, payload: dict) -> None:
+        """Разложить уведомление триггера content.notify_content_change по индексам."""
+        table = payload.get('table')
+        row_id = payload.get('id')
+
+        if table == 'film_work':
+            self.movie_ids.add(row_id)
+        elif table == 'person':
+            self.person_ids.add(row_id)
+            self.renamed_person_ids.add(row_id)
+        elif table == 'genre':
+            self.genre_ids.add(row_id)
+            self.renamed_genre_ids.add(row_id)
+        elif table == 'person_film_work':
+            self.movie_ids.add(payload['film_work_id'])
+            self.person_ids.add(payload['person_id'])
+        elif table == 'genre_film_work':
+            self.movie_ids.add(payload['film_work_id'])
+
+
+class PostgresChangeListener:
+    """
+    Получает id изменённых строк из канала NOTIFY и копит их с дебаунсом.
+    """
+
+    def __init__(self, database_settings: dict):
+        self._dsn = make_conninfo(**database_settings)
+        self._channel = NOTIFY_CHANNEL
+        self._connection: psycopg.Connection | None = None
+        self._changes = ChangeSet()
+        self.logger = logger
+
+    @backoff(0.1, 2, 10, logger)
+    def connect(self) -> None:
+        """Открыть соединение в autocommit и подписаться на канал."""
+        self._connection = psycopg.connect(self._dsn, autocommit=True)
+        self._connection.add_notify_handler(self._on_notify)
+        self._connection.execute(sql.SQL('LISTEN {}').format(sql.Identifier(self._channel)))
+        self.logger.info(f"✅ Подписка на канал {self._channel} установлена")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def wait(self, timeout: float, debounce: float) -> ChangeSet:
+        """
+        Дождаться изменений.
+
+        Блокируется не дольше timeout до первого уведомления, затем ещё debounce секунд
+        собирает последующие, чтобы серия правок превратилась в одну переиндексацию.
+
+        Args:
+            timeout: Максимальное время ожидания первого уведомления
+            debounce: Окно накопления уведомлений
+
+        Returns:
+            Накопленный набор изменений (пустой, если уведомлений не было)
+        """
+        if self._connection is None or self._connection.closed:
+            self.connect()
+
+        try:
+            deadline = time.monotonic() + timeout
+            while not self._changes and (remaining := deadline - time.monotonic()) > 0:
+                self._poll(remaining)
+
+            if self._changes:
+                debounce_deadline = time.monotonic() + debounce
+                while (remaining := debounce_deadline - time.monotonic()) > 0:
+                    self._poll(remaining)
+        except psycopg.OperationalError as e:
+            self.logger.error(f"❌ Соединение слушателя {self._channel} потеряно: {e}")
+            self.close()
+
+        changes, self._changes = self._changes, ChangeSet()
+        return changes
+
+    def _poll(self, timeout: float) -> None:
+        ready, _, _ = select.select([self._connection.fileno()], [], [], timeout)
+        if ready:
+            # Любая команда заставляет psycopg прочитать входящие уведомления и вызвать обработчики
+            self._connection.execute('SELECT 1')
+
+    def _on_notify(self, notify: Notify) -> None:
+        try:
+            self._changes.add(json.loads(notify.payload))
+        except (ValueError, KeyError) as e:
+            self.logger.warning(f"Некорректное уведомление в канале {notify.channel}: {notify.payload} ({e})")
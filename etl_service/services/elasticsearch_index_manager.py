@@ -1,6 +1,18 @@
-from typing import Type
+"""
+Сервисы для ETL
+"""
+import fnmatch
+import hashlib
+import json
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Generator, Type
 
-from elasticsearch import Elasticsearch
+import pytz
+from documents.analysis import ANALYSIS, ANALYSIS_COMPONENT_TEMPLATE
+from elasticsearch import Elasticsearch, NotFoundError
 from elasticsearch_dsl import Document
 from interfaces.index_manager_interface import IIndexManager
 from logger import logger
@@ -9,29 +21,60 @@ from logger import logger
 class ElasticsearchIndexManager(IIndexManager):
     """
     Менеджер индексов Elasticsearch.
-    Решает проблему с инициализацией анализаторов путем пересоздания индексов.
+
+    Каждый документ хранится в версионных физических индексах (movies_v1, movies_v2, ...),
+    а клиенты обращаются к ним через alias с именем из Document.Index.name.
+    Пересоздание индекса выполняется по схеме blue/green: новая версия заполняется
+    в фоне и подменяет старую атомарным переключением alias.
+
+    Версии создаются из шаблонов: общий компонентный шаблон с анализом и шаблон
+    индекса на каждый документ. В _meta маппинга каждой версии хранится хэш описания,
+    по которому определяется, нужна ли новая версия.
+
+    Новая версия заполняется серверным _reindex из живой, если все поля нового
+    описания уже есть в старом, а поля старых документов остались в новом.
+    Необязательные преобразования при переносе задаются в классе документа:
+    Index.reindex_processors (процессоры ingest pipeline) и Index.reindex_fields
+    (поля, которые эти процессоры заполняют).
     """
 
-    def __init__(self, elasticsearch_client: Elasticsearch):
+    # Настройки на время массовой загрузки новой версии индекса
+    BULK_LOAD_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0, 'auto_expand_replicas': 'false'}
+    DEFAULT_REFRESH_INTERVAL = '1s'
+    DEFAULT_NUMBER_OF_REPLICAS = 1
+    # Настройки, которые меняются на живом индексе без новой версии и не входят в хэш описания
+    DYNAMIC_SETTINGS = frozenset({'refresh_interval', 'number_of_replicas', 'auto_expand_replicas'})
+    TEMPLATE_PRIORITY = 100
+    REINDEX_POLL_SECONDS = 5
+
+    def __init__(self, elasticsearch_client: Elasticsearch, force_merge_max_segments: int | None = None):
         self.es = elasticsearch_client
+        self.force_merge_max_segments = force_merge_max_segments
         self.logger = logger
 
-    def recreate_index_with_analyzers(self, document_class: Type) -> None:
+    def recreate_index_with_analyzers(self, document_class: Type) -> str:
         """
-        Пересоздать индекс с правильными анализаторами.
-        
+        Создать новую версию индекса с правильными анализаторами.
+
+        Живой индекс не затрагивается: новая версия создаётся с настройками
+        массовой загрузки и становится доступной клиентам только после
+        activate_index_version.
+
         Args:
             document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Имя созданного физического индекса
         """
-        index_name = document_class.Index.name
+        alias = document_class.Index.name
+        versions = self._get_versions(alias)
+        index_name = self._versioned_name(alias, max(versions, default=0) + 1)
 
         try:
-            if self.es.indices.exists(index=index_name):
-                self.logger.info(f"Удаляем существующий индекс: {index_name}")
-                self.es.indices.delete(index=index_name)
-
-            self.logger.info(f"Создаем индекс с анализаторами: {index_name}")
-            document_class.init(using=self.es)
+            self.logger.info(f"Создаем новую версию индекса {alias}: {index_name}")
+            self.ensure_templates(document_class)
+            # Маппинг и настройки приходят из шаблона, здесь только режим массовой загрузки
+            self.es.indices.create(index=index_name, settings={'index': self.BULK_LOAD_SETTINGS})
 
             settings = self.es.indices.get_settings(index=index_name)
             analysis = settings[index_name]['settings']['index'].get('analysis', {})
@@ -41,87 +84,511 @@ class ElasticsearchIndexManager(IIndexManager):
             else:
                 self.logger.warning(f"⚠️ Анализатор ru_en не найден в индексе {index_name}")
 
+            return index_name
+
         except Exception as e:
-            self.logger.error(f"❌ Ошибка при пересоздании индекса {index_name}: {e}")
+            self.logger.error(f"❌ Ошибка при создании новой версии индекса {alias}: {e}")
             raise
 
-    def ensure_index_exists(self, document_class: Type) -> None:
+    def ensure_templates(self, document_class: Type[Document]) -> None:
         """
-        Убедиться что индекс существует с правильными настройками.
-        
+        Опубликовать компонентный шаблон анализа и шаблон версий индекса документа.
+
         Args:
             document_class: Класс документа Elasticsearch-dsl
         """
-        index_name = document_class.Index.name
+        alias = document_class.Index.name
+
+        self.es.cluster.put_component_template(
+            name=ANALYSIS_COMPONENT_TEMPLATE,
+            template={'settings': {'analysis': ANALYSIS}},
+        )
+        self.es.indices.put_index_template(
+            name=alias,
+            index_patterns=[f'{alias}_v*'],
+            composed_of=[ANALYSIS_COMPONENT_TEMPLATE],
+            priority=self.TEMPLATE_PRIORITY,
+            template=self.index_template(document_class),
+        )
+        self.logger.info(f"✅ Шаблон индекса {alias} обновлён")
+
+    @classmethod
+    def index_template(cls, document_class: Type[Document]) -> dict:
+        """
+        Маппинг и настройки версии индекса, без анализа из компонентного шаблона.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        mappings = document_class._doc_type.mapping.to_dict()
+        mappings['_meta'] = {'mapping_hash': cls.get_mapping_version(document_class)}
+        return {'settings': {'index': document_class.Index.settings}, 'mappings': mappings}
+
+    def missing_source_fields(self, document_class: Type[Document]) -> list[str]:
+        """
+        Поля нового описания, которых нет в маппинге живого индекса.
+
+        Такие поля нельзя получить из _source старых документов, их данные есть только в Postgres.
+        То же относится к полям, исключённым из _source живого индекса.
+        Подполя (fields) строятся из того же значения и в список не попадают.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Пути отсутствующих полей через точку
+        """
+        current = self._get_current_mappings(document_class.Index.name)
+        expected = document_class._doc_type.mapping.to_dict().get('properties', {})
+        excludes = current.get('_source', {}).get('excludes', [])
+        derived = set(getattr(document_class.Index, 'reindex_fields', ()))
+
+        return [
+            path for path in self._missing_properties(expected, current.get('properties', {}), excludes)
+            if path not in derived
+        ]
+
+    def removed_source_fields(self, document_class: Type[Document]) -> list[str]:
+        """
+        Поля маппинга живого индекса, которых нет в новом описании.
+
+        Старые документы по-прежнему содержат их в _source, и _reindex в версию
+        с dynamic: strict падает на них (strict_dynamic_mapping_exception).
+        Поля, исключённые из _source живого индекса, в документах отсутствуют
+        и в список не попадают.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Пути удалённых полей через точку
+        """
+        current = self._get_current_mappings(document_class.Index.name)
+        expected = document_class._doc_type.mapping.to_dict().get('properties', {})
+        excludes = current.get('_source', {}).get('excludes', [])
+
+        return [
+            path for path in self._missing_properties(current.get('properties', {}), expected, [])
+            if not any(fnmatch.fnmatchcase(path, pattern) for pattern in excludes)
+        ]
+
+    def reindex_index_version(self, document_class: Type[Document], index_name: str) -> int:
+        """
+        Перенести документы живого индекса в новую версию серверным _reindex.
+
+        Перенос делится на срезы (slices=auto) по числу шардов и выполняется задачей
+        Elasticsearch, за которой менеджер следит до завершения.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            index_name: Новая версия индекса
+
+        Returns:
+            Число перенесённых документов
+        """
+        alias = document_class.Index.name
+        dest = {'index': index_name}
+
+        processors = getattr(document_class.Index, 'reindex_processors', None)
+        if processors:
+            dest['pipeline'] = f'{alias}_reindex'
+            self.es.ingest.put_pipeline(
+                id=dest['pipeline'],
+                description=f'Преобразование документов {alias} при переносе в новую версию',
+                processors=processors,
+            )
+
+        self.logger.info(f"Переносим документы {alias} в {index_name} через _reindex")
+        task_id = self.es.reindex(
+            source={'index': alias},
+            dest=dest,
+            slices='auto',
+            wait_for_completion=False,
+        )['task']
+
+        while True:
+            task = self.es.tasks.get(task_id=task_id)
+            if task['completed']:
+                break
+            status = task['task']['status']
+            self.logger.info(f"Индекс {index_name}: перенесено {status['created']} из {status['total']}")
+            time.sleep(self.REINDEX_POLL_SECONDS)
+
+        response = task.get('response', {})
+        if task.get('error') or response.get('failures'):
+            raise RuntimeError(
+                f"Перенос {alias} в {index_name} завершился ошибкой: "
+                f"{task.get('error') or response['failures'][:3]}"
+            )
+
+        self.logger.info(f"✅ В {index_name} перенесено {response['created']} документов за {response['took']} мс")
+        return response['created']
+
+    def activate_index_version(self, document_class: Type, index_name: str) -> None:
+        """
+        Вернуть индексу рабочие настройки и атомарно переключить на него alias.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            index_name: Физический индекс, который станет живым
+        """
+        alias = document_class.Index.name
 
         try:
-            if not self.es.indices.exists(index=index_name):
-                self.logger.info(f"Индекс {index_name} не существует, создаем...")
-                document_class.init(using=self.es)
-                return
-
-            if self.index_needs_recreation(document_class):
-                self.logger.info(f"Индекс {index_name} требует пересоздания для анализаторов")
-                self.recreate_index_with_analyzers(document_class)
-            else:
-                self.logger.info(f"✅ Индекс {index_name} существует с правильными настройками")
+            self._finish_bulk_load(document_class, index_name)
+            self._switch_alias(alias, index_name)
+            self.logger.info(f"✅ Alias {alias} переключен на {index_name}")
 
         except Exception as e:
-            self.logger.error(f"❌ Ошибка при проверке индекса {index_name}: {e}")
+            self.logger.error(f"❌ Ошибка при переключении alias {alias} на {index_name}: {e}")
+            raise
+
+    def apply_dynamic_settings(self, document_class: Type[Document]) -> None:
+        """
+        Применить к живому индексу динамические настройки документа (refresh, реплики).
+
+        Они не входят в хэш описания, поэтому их изменение не создаёт новую версию индекса.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        alias = document_class.Index.name
+        settings = self._steady_state_settings(document_class)
+
+        for index_name in self._get_alias_indices(alias):
+            self.es.indices.put_settings(index=index_name, settings={'index': settings})
+
+    @contextmanager
+    def building_index_version(self, document_class: Type) -> Generator[str, None, None]:
+        """
+        Создать новую версию индекса на время её заполнения.
+
+        Версия, которая к концу блока не стала живой (заполнение прервалось ошибкой
+        или вызывающий от неё отказался), удаляется: иначе каждый неудачный цикл
+        оставлял бы по недостроенной версии.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Имя созданного физического индекса
+        """
+        alias = document_class.Index.name
+        index_name = self.recreate_index_with_analyzers(document_class)
+        try:
+            yield index_name
+        finally:
+            self._discard_unless_live(alias, index_name)
+
+    @contextmanager
+    def bulk_load_mode(self, document_class: Type) -> Generator[None, None, None]:
+        """
+        Перевести живой индекс в режим массовой загрузки на время блока.
+
+        Отключаются периодический refresh и реплики, по выходу из блока
+        возвращаются рабочие настройки документа и, если задано, выполняется force merge.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        alias = document_class.Index.name
+        index_names = self._get_alias_indices(alias)
+
+        self.logger.info(f"Индекс {alias}: включен режим массовой загрузки")
+        for index_name in index_names:
+            self.es.indices.put_settings(index=index_name, settings={'index': self.BULK_LOAD_SETTINGS})
+
+        try:
+            yield
+        finally:
+            for index_name in index_names:
+                self._finish_bulk_load(document_class, index_name)
+            self.logger.info(f"Индекс {alias}: рабочие настройки восстановлены")
+
+    def rollback_index_version(self, document_class: Type) -> tuple[str, datetime | None]:
+        """
+        Переключить alias на предыдущую версию индекса и закрепить её.
+
+        Закреплённую версию index_needs_recreation не пересоздаёт,
+        даже если её описание расходится с кодом, пока закрепление
+        не снято unpin_index_version.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            Имя индекса, ставшего живым, и время создания версии,
+            с которой выполнен откат (None, если живой версии не было):
+            изменения после этого момента могли не попасть в индекс
+        """
+        alias = document_class.Index.name
+        live_indices = self._get_alias_indices(alias)
+        live_versions = [self._parse_version(alias, name) for name in live_indices]
+        live_version = max((v for v in live_versions if v is not None), default=None)
+
+        previous = [v for v in self._get_versions(alias) if live_version is None or v < live_version]
+        if not previous:
+            raise RuntimeError(f"Нет предыдущей версии индекса {alias} для отката")
+
+        replaced_at = None
+        if live_version is not None:
+            replaced_at = self._get_creation_date(self._versioned_name(alias, live_version))
+
+        index_name = self._versioned_name(alias, max(previous))
+        self._update_meta(index_name, pinned=True)
+        self._switch_alias(alias, index_name)
+        self.logger.info(f"✅ Alias {alias} откачен на {index_name}, версия закреплена")
+        return index_name, replaced_at
+
+    def unpin_index_version(self, document_class: Type) -> None:
+        """
+        Снять закрепление с живой версии индекса после отката.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+        """
+        alias = document_class.Index.name
+        for index_name in self._get_alias_indices(alias):
+            self._update_meta(index_name, pinned=None)
+        self.logger.info(f"✅ Закрепление индекса {alias} снято")
+
+    def cleanup_index_versions(self, document_class: Type, keep: int = 2) -> list[str]:
+        """
+        Удалить старые версии индекса.
+
+        Живая версия не удаляется никогда; кроме неё сохраняются самые свежие
+        версии, чтобы был возможен откат.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+            keep: Сколько последних версий (включая живую) оставить
+
+        Returns:
+            Список удалённых индексов
+        """
+        alias = document_class.Index.name
+        live_indices = set(self._get_alias_indices(alias))
+        versions = sorted(self._get_versions(alias), reverse=True)
+
+        deleted = []
+        for version in versions[keep:]:
+            index_name = self._versioned_name(alias, version)
+            if index_name in live_indices:
+                continue
+            self.es.indices.delete(index=index_name)
+            deleted.append(index_name)
+            self.logger.info(f"Удалена старая версия индекса: {index_name}")
+
+        return deleted
+
+    def ensure_index_exists(self, document_class: Type) -> bool:
+        """
+        Убедиться что индекс существует.
+
+        Если нет ни alias, ни индекса, создаётся первая версия и сразу становится живой.
+        Устаревшие настройки существующего индекса проверяет index_needs_recreation.
+
+        Args:
+            document_class: Класс документа Elasticsearch-dsl
+
+        Returns:
+            True если индекс был создан заново
+        """
+        alias = document_class.Index.name
+
+        try:
+            if not self.es.indices.exists(index=alias):
+                self.logger.info(f"Индекс {alias} не существует, создаем...")
+                index_name = self.recreate_index_with_analyzers(document_class)
+                self.activate_index_version(document_class, index_name)
+                return True
+
+            self.logger.info(f"✅ Индекс {alias} существует")
+            return False
+
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при проверке индекса {alias}: {e}")
             raise
 
     def index_needs_recreation(self, document_class: Type) -> bool:
         """
         Проверить нужно ли пересоздавать индекс.
-        
+
+        Пересоздание требуется, если индекс создан до перехода на alias
+        или хэш описания в его _meta отличается от хэша документа.
+        Версия, закреплённая после отката, не пересоздаётся.
+
         Args:
             document_class: Класс документа Elasticsearch-dsl
-            
+
         Returns:
             True если индекс нужно пересоздать, иначе False
         """
         index_name = document_class.Index.name
 
         try:
-            current_settings = self._get_current_index_settings(index_name)
+            if not self.es.indices.exists_alias(name=index_name):
+                self.logger.info(f"Индекс {index_name}: создан без alias, требуется перенос в версионный индекс")
+                return True
 
-            expected_analysis = document_class.Index.settings.get('analysis', {})
+            current_meta = self._get_current_meta(index_name)
+            if current_meta.get('pinned'):
+                self.logger.warning(
+                    f"⚠️ Индекс {index_name} закреплён после отката, "
+                    f"не пересоздаётся до main.py unpin {index_name}"
+                )
+                return False
 
-            current_analysis = current_settings.get('analysis', {})
+            current_hash = current_meta.get('mapping_hash')
+            expected_hash = self.get_mapping_version(document_class)
 
-            if 'analyzer' not in current_analysis or 'ru_en' not in current_analysis['analyzer']:
-                self.logger.info(f"Индекс {index_name}: отсутствует анализатор ru_en")
+            if current_hash is None:
+                self.logger.info(f"Индекс {index_name}: создан без хэша описания, требуется новая версия")
                 return True
 
-            current_ru_en = current_analysis['analyzer']['ru_en']
-            expected_ru_en = expected_analysis['analyzer']['ru_en']
-
-            if current_ru_en != expected_ru_en:
-                self.logger.info(f"Индекс {index_name}: настройки анализатора ru_en отличаются")
-                self.logger.debug(f"Текущие: {current_ru_en}")
-                self.logger.debug(f"Ожидаемые: {expected_ru_en}")
+            if current_hash != expected_hash:
+                self.logger.info(f"Индекс {index_name}: описание изменилось, требуется новая версия")
+                self.logger.debug(f"Текущий хэш: {current_hash}")
+                self.logger.debug(f"Ожидаемый хэш: {expected_hash}")
                 return True
 
             return False
 
         except Exception as e:
-            self.logger.warning(f"Ошибка при проверке настроек индекса {index_name}: {e}")
+            self.logger.warning(f"Ошибка при проверке описания индекса {index_name}: {e}")
             # В случае ошибки лучше пересоздать индекс для надежности
             return True
 
-    def _get_current_index_settings(self, index_name: str) -> dict:
+    @classmethod
+    def get_mapping_version(cls, document_class: Type[Document]) -> str:
         """
-        Получить текущие настройки индекса.
-        
+        Версия описания индекса: хэш анализа, маппинга и статических настроек документа.
+
+        Динамические настройки (refresh_interval, реплики) в хэш не входят:
+        для их смены новая версия индекса не нужна.
+
         Args:
-            index_name: Имя индекса
-            
+            document_class: Класс документа Elasticsearch-dsl
+
         Returns:
-            Словарь с настройками индекса
+            Стабильный хэш, меняющийся вместе с описанием документа
         """
+        definition = {
+            'analysis': ANALYSIS,
+            'mappings': document_class._doc_type.mapping.to_dict(),
+            'settings': {
+                key: value
+                for key, value in document_class.Index.settings.items()
+                if key not in cls.DYNAMIC_SETTINGS
+            },
+        }
+        return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+    def _get_current_mappings(self, index_name: str) -> dict:
+        """Маппинг индекса (или физического индекса за alias)."""
+        mappings = self.es.indices.get_mapping(index=index_name)
+        return next(iter(mappings.values()))['mappings']
+
+    def _get_current_meta(self, index_name: str) -> dict:
+        """_meta маппинга индекса (или физического индекса за alias)."""
+        return self._get_current_mappings(index_name).get('_meta', {})
+
+    def _update_meta(self, index_name: str, **values) -> None:
+        """Изменить ключи _meta индекса; ключи со значением None удалить."""
+        # put_mapping заменяет _meta целиком
+        meta = {**self._get_current_meta(index_name), **values}
+        self.es.indices.put_mapping(
+            index=index_name,
+            meta={key: value for key, value in meta.items() if value is not None},
+        )
+
+    def _get_creation_date(self, index_name: str) -> datetime:
+        settings = self.es.indices.get_settings(index=index_name, name='index.creation_date')
+        creation_ms = int(settings[index_name]['settings']['index']['creation_date'])
+        return datetime.fromtimestamp(creation_ms / 1000, tz=pytz.UTC)
+
+    @classmethod
+    def _missing_properties(
+            cls, expected: dict, current: dict, excludes: list[str], prefix: str = ''
+    ) -> list[str]:
+        missing = []
+        for name, definition in expected.items():
+            path = f'{prefix}{name}'
+            if name not in current or any(fnmatch.fnmatchcase(path, pattern) for pattern in excludes):
+                missing.append(path)
+            elif 'properties' in definition:
+                missing += cls._missing_properties(
+                    definition['properties'], current[name].get('properties', {}), excludes, f'{path}.'
+                )
+        return missing
+
+    def _finish_bulk_load(self, document_class: Type[Document], index_name: str) -> None:
+        """Сделать загруженные данные видимыми, уплотнить сегменты и вернуть рабочие настройки."""
+        self.es.indices.refresh(index=index_name)
+
+        if self.force_merge_max_segments:
+            # Слияние до возврата реплик, чтобы реплики получили уже уплотнённые сегменты
+            self.logger.info(f"Force merge индекса {index_name} до {self.force_merge_max_segments} сегментов")
+            self.es.indices.forcemerge(
+                index=index_name,
+                max_num_segments=self.force_merge_max_segments,
+                request_timeout=3600,
+            )
+
+        self.es.indices.put_settings(index=index_name, settings={'index': self._steady_state_settings(document_class)})
+
+    def _steady_state_settings(self, document_class: Type[Document]) -> dict:
+        settings = document_class.Index.settings
+        steady_state = {'refresh_interval': settings.get('refresh_interval', self.DEFAULT_REFRESH_INTERVAL)}
+
+        if 'auto_expand_replicas' in settings:
+            # Число реплик Elasticsearch выставляет сам по числу узлов
+            steady_state['auto_expand_replicas'] = settings['auto_expand_replicas']
+        else:
+            steady_state['auto_expand_replicas'] = 'false'
+            steady_state['number_of_replicas'] = settings.get('number_of_replicas', self.DEFAULT_NUMBER_OF_REPLICAS)
+
+        return steady_state
+
+    def _switch_alias(self, alias: str, index_name: str) -> None:
+        actions = [
+            {'remove': {'index': current, 'alias': alias}}
+            for current in self._get_alias_indices(alias)
+            if current != index_name
+        ]
+
+        if self.es.indices.exists(index=alias) and not self.es.indices.exists_alias(name=alias):
+            # Индекс, созданный до перехода на alias, удаляется в той же атомарной операции
+            actions.append({'remove_index': {'index': alias}})
+
+        actions.append({'add': {'index': index_name, 'alias': alias}})
+        self.es.indices.update_aliases(actions=actions)
+
+    def _discard_unless_live(self, alias: str, index_name: str) -> None:
         try:
-            settings = self.es.indices.get_settings(index=index_name)
-            return settings[index_name]['settings']['index']
+            if index_name not in self._get_alias_indices(alias):
+                self.es.indices.delete(index=index_name, ignore_unavailable=True)
+                self.logger.warning(f"⚠️ Недостроенная версия {index_name} удалена")
         except Exception as e:
-            self.logger.error(f"Ошибка получения настроек индекса {index_name}: {e}")
-            return {}
+            # Ошибка удаления не должна заслонять исходную ошибку заполнения
+            self.logger.error(f"❌ Не удалось удалить недостроенную версию {index_name}: {e}")
+
+    def _get_alias_indices(self, alias: str) -> list[str]:
+        try:
+            return list(self.es.indices.get_alias(name=alias).keys())
+        except NotFoundError:
+            return []
+
+    def _get_versions(self, alias: str) -> list[int]:
+        indices = self.es.indices.get(index=f'{alias}_v*', allow_no_indices=True, expand_wildcards='all')
+        versions = (self._parse_version(alias, name) for name in indices)
+        return [version for version in versions if version is not None]
+
+    @staticmethod
+    def _versioned_name(alias: str, version: int) -> str:
+        return f'{alias}_v{version}'
+
+    @staticmethod
+    def _parse_version(alias: str, index_name: str) -> int | None:
+        match = re.fullmatch(rf'{re.escape(alias)}_v(\d+)', index_name)
+        return int(match.group(1)) if match else None
@@ -1,11 +1,75 @@
-from typing import Generator, Any
+import random
+import time
+from typing import Generator, Any, Callable, Iterable
 
+import orjson
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import streaming_bulk
+from elasticsearch.serializer import OrjsonSerializer
 from helpers.backoff_func_wrapper import backoff
-from interfaces.elasticsearch_interface import IElasticsearchService
+from interfaces.elasticsearch_interface import IElasticsearchService, RejectedAction
 from logger import logger
 
+# Статусы отдельных операций, при которых операцию стоит повторить
+TRANSIENT_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class BulkRetries:
+    """
+    Повторы операций одной пачки _bulk, отклонённых с временными статусами.
+
+    Отправкой и ожиданием занимается вызывающий (синхронный сервис или асинхронный
+    ETL), здесь только разбор ответов и выбор задержки, поэтому правила повторов
+    у обоих одинаковые:
+
+        retries = BulkRetries(actions, ignore_status, ...)
+        while retries.pending:
+            time.sleep(retries.handle(send(retries.pending)))
+    """
+
+    def __init__(
+            self,
+            actions: list[dict[str, Any]],
+            ignore_status: tuple[int, ...] = (),
+            bulk_retries: int = 5,
+            retry_backoff: float = 1,
+            retry_max_backoff: float = 30,
+    ):
+        self.pending = actions
+        self.rejected: list[RejectedAction] = []
+        self._ignore_status = ignore_status
+        self._bulk_retries = bulk_retries
+        self._retry_backoff = retry_backoff
+        self._retry_max_backoff = retry_max_backoff
+        self._attempt = 0
+
+    def handle(self, items: list[dict[str, Any]]) -> float:
+        """
+        Разобрать ответ Elasticsearch на операции pending.
+
+        Returns:
+            Задержка в секундах перед повтором оставшихся операций (0, если повторять нечего)
+        """
+        retry = []
+        for action, item in zip(self.pending, items):
+            status = item.get('status', 500)
+            if 200 <= status < 300 or status in self._ignore_status:
+                continue
+            if status in TRANSIENT_STATUSES and self._attempt < self._bulk_retries:
+                retry.append(action)
+            else:
+                self.rejected.append(RejectedAction(action, status, item.get('error')))
+
+        self.pending = retry
+        if not retry:
+            return 0
+
+        # Случайная задержка, чтобы повторы нескольких процессов не приходили одновременно
+        delay = random.uniform(0, min(self._retry_backoff * 2 ** self._attempt, self._retry_max_backoff))
+        self._attempt += 1
+        logger.warning(f"⚠️ Elasticsearch перегружен, {len(retry)} операций повторяются через {delay:.1f} с")
+        return delay
+
 
 class ElasticsearchService(IElasticsearchService):
     """
@@ -13,27 +77,67 @@ class ElasticsearchService(IElasticsearchService):
     Управляет соединениями и операциями индексации.
     """
 
-    def __init__(self):
+    def __init__(
+            self,
+            connections_per_node: int = 10,
+            request_timeout: float = 30,
+            max_retries: int = 3,
+            bulk_retries: int = 5,
+            retry_backoff: float = 1,
+            retry_max_backoff: float = 30,
+    ):
         self._connection = None
+        self._connections_per_node = connections_per_node
+        self._request_timeout = request_timeout
+        self._max_retries = max_retries
+        self._bulk_retries = bulk_retries
+        self._retry_backoff = retry_backoff
+        self._retry_max_backoff = retry_max_backoff
         self.logger = logger
 
-    @backoff(0.1, 2, 10, logger)
-    def bulk_index(self, data: Generator[dict[str, Any], Any, None]) -> None:
+    def bulk_index(
+            self,
+            data: Generator[dict[str, Any], Any, None],
+            ignore_status: tuple[int, ...] = (),
+    ) -> list[RejectedAction]:
         """
         Массовая индексация данных в Elasticsearch.
+
+        Ошибки обрабатываются для каждой операции отдельно: временные (429/5xx)
+        повторяются с задержкой в пределах бюджета, остальные возвращаются вызывающему,
+        не останавливая индексацию остальной пачки.
         
         Args:
             data: Генератор данных для индексации
+            ignore_status: HTTP-статусы отдельных операций, которые не считаются ошибкой
+
+        Returns:
+            Операции, отклонённые окончательно
         """
-        try:
-            bulk(
-                self.get_connection(),
-                data,
-            )
-            self.logger.info("✅ Данные успешно проиндексированы в Elasticsearch")
-        except Exception as e:
-            self.logger.error(f"❌ Ошибка при индексации данных: {e}")
-            raise
+        return self._bulk_with_retries(
+            list(data),
+            lambda actions: self._send_actions(actions, ignore_status),
+            ignore_status,
+        )
+
+    def bulk_index_raw(self, index_name: str, documents: Iterable[tuple[str, bytes]]) -> list[RejectedAction]:
+        """
+        Массовая индексация документов, уже сериализованных в JSON.
+
+        Тело _bulk собирается из готовых байтов без разбора документов в Python.
+
+        Args:
+            index_name: Индекс, в который записываются документы
+            documents: Пары (id документа, JSON-документ в байтах)
+
+        Returns:
+            Операции, отклонённые окончательно
+        """
+        actions = [
+            {'_op_type': 'index', '_index': index_name, '_id': doc_id, '_source': source}
+            for doc_id, source in documents
+        ]
+        return self._bulk_with_retries(actions, self._send_raw)
 
     def get_connection(self) -> Elasticsearch:
         """
@@ -57,6 +161,53 @@ class ElasticsearchService(IElasticsearchService):
         Returns:
             Экземпляр Elasticsearch клиента
         """
-        self._connection = Elasticsearch(hosts=hosts)
+        self._connection = Elasticsearch(
+            hosts=hosts,
+            connections_per_node=self._connections_per_node,
+            request_timeout=self._request_timeout,
+            max_retries=self._max_retries,
+            retry_on_timeout=True,
+            serializer=OrjsonSerializer(),
+        )
         self.logger.info(f"✅ Соединение с Elasticsearch установлено: {hosts}")
         return self._connection
+
+    def _bulk_with_retries(
+            self,
+            actions: list[dict[str, Any]],
+            send: Callable[[list[dict[str, Any]]], list[dict[str, Any]]],
+            ignore_status: tuple[int, ...] = (),
+    ) -> list[RejectedAction]:
+        retries = BulkRetries(
+            actions, ignore_status, self._bulk_retries, self._retry_backoff, self._retry_max_backoff
+        )
+        while retries.pending:
+            time.sleep(retries.handle(send(retries.pending)))
+
+        if retries.rejected:
+            self.logger.error(f"❌ Отклонено операций: {len(retries.rejected)} из {len(actions)}")
+        else:
+            self.logger.info("✅ Данные успешно проиндексированы в Elasticsearch")
+        return retries.rejected
+
+    @backoff(0.1, 2, 10, logger, max_retries=10, jitter=True)
+    def _send_actions(self, actions: list[dict[str, Any]], ignore_status: tuple[int, ...]) -> list[dict[str, Any]]:
+        """Отправить операции и вернуть ответ Elasticsearch по каждой из них в том же порядке."""
+        results = streaming_bulk(
+            self.get_connection(),
+            actions,
+            chunk_size=max(len(actions), 1),
+            raise_on_error=False,
+            ignore_status=ignore_status,
+        )
+        return [next(iter(info.values())) for _, info in results]
+
+    @backoff(0.1, 2, 10, logger, max_retries=10, jitter=True)
+    def _send_raw(self, actions: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        operations = []
+        for action in actions:
+            operations.append(orjson.dumps({'index': {'_index': action['_index'], '_id': action['_id']}}))
+            operations.append(action['_source'])
+
+        response = self.get_connection().bulk(operations=operations)
+        return [next(iter(item.values())) for item in response['items']]
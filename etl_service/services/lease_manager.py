@@ -0,0 +1,95 @@
+"""
+Распределённые аренды в Redis для нескольких экземпляров ETL
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Generator
+
+from interfaces.lease_manager_interface import ILeaseManager, Lease
+from logger import logger
+from redis import Redis
+
+# Продлить/освободить аренду, только если она всё ещё принадлежит владельцу
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaseManager(ILeaseManager):
+    """
+    Аренды на основе SET NX PX.
+
+    Аренда автоматически истекает через ttl, если владелец перестал её продлевать,
+    после чего работу подхватывает другой экземпляр.
+    """
+
+    def __init__(self, redis: Redis, ttl: float = 30, prefix: str = 'etl:lease:'):
+        self._redis = redis
+        self._ttl_ms = int(ttl * 1000)
+        self._prefix = prefix
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.logger = logger
+
+    def acquire(self, name: str) -> bool:
+        return bool(self._redis.set(self._key(name), self.owner, nx=True, px=self._ttl_ms))
+
+    def renew(self, name: str) -> bool:
+        return bool(self._renew(keys=[self._key(name)], args=[self.owner, self._ttl_ms]))
+
+    def release(self, name: str) -> None:
+        self._release(keys=[self._key(name)], args=[self.owner])
+
+    @contextmanager
+    def hold(self, name: str) -> Generator[Lease, None, None]:
+        if not self.acquire(name):
+            yield Lease(name, acquired=False)
+            return
+
+        lease = Lease(name, acquired=True)
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._keep_alive, args=(lease, stop), daemon=True)
+        renewer.start()
+
+        try:
+            yield lease
+        finally:
+            stop.set()
+            renewer.join()
+            self.release(name)
+
+    def _keep_alive(self, lease: Lease, stop: threading.Event) -> None:
+        interval = self._ttl_ms / 1000 / 3
+        renewed_at = time.monotonic()
+        while not stop.wait(interval):
+            try:
+                if not self.renew(lease.name):
+                    self.logger.error(f"❌ Аренда {lease.name} потеряна: её захватил другой экземпляр")
+                    lease.mark_lost()
+                    return
+                renewed_at = time.monotonic()
+            except Exception as e:
+                self.logger.warning(f"Не удалось продлить аренду {lease.name}: {e}")
+                if time.monotonic() - renewed_at >= self._ttl_ms / 1000:
+                    # Без продления аренда уже истекла и могла перейти к другому экземпляру
+                    self.logger.error(f"❌ Аренда {lease.name} истекла без продления")
+                    lease.mark_lost()
+                    return
+
+    def _key(self, name: str) -> str:
+        return f'{self._prefix}{name}'
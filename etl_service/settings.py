@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,24 +11,76 @@ class DatabaseSettings(BaseSettings):
     dbname: str = Field(..., alias='POSTGRES_DB')
     user: str = ...
     password: str = ...
+    # Размер пула соединений долгоживущего ETL
+    pool_min_size: int = 1
+    pool_max_size: int = 4
 
     def get_dsn(self) -> dict:
-        return self.model_dump()
+        return self.model_dump(exclude={'pool_min_size', 'pool_max_size'})
 
 
 class ElasticsearchSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix='es_')
     host: str = ...
     port: str = ...
+    # Пул HTTP-соединений клиента и поведение при сбоях
+    connections_per_node: int = 10
+    request_timeout: float = 30
+    max_retries: int = 3
+    # Повторы отдельных операций _bulk, отклонённых с 429/5xx, и границы задержки между ними
+    bulk_retries: int = 5
+    retry_backoff: float = 1
+    retry_max_backoff: float = 30
 
     def get_host(self):
         return f'http://{self.host}:{self.port}'
 
 
+class RedisSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='redis_')
+    host: str = 'localhost'
+    port: int = 6379
+
+
+class EtlSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='etl_')
+    # Интервал опроса Postgres (страховочная сверка в событийном режиме)
+    poll_interval: float = 60
+    # Событийный режим: LISTEN на канал content_changes, в который пишут триггеры content.*
+    listen_enabled: bool = True
+    # Сколько секунд копить уведомления перед переиндексацией
+    debounce_seconds: float = 1.0
+    # С какого числа изменённых строк индекс переводится в режим массовой загрузки
+    bulk_load_threshold: int = 10000
+    # До скольких сегментов выполнять force merge после массовой загрузки (None — не выполнять)
+    force_merge_max_segments: int | None = None
+    # Пропуск документов, содержимое которых не изменилось с прошлой отправки в Elasticsearch
+    content_hash_enabled: bool = True
+    content_hash_path: str = './storage/content_hashes.sqlite3'
+    # Отправлять jsonb-документы из Postgres в _bulk без разбора в Python
+    raw_bulk: bool = False
+    # Хранилище состояния: sqlite (WAL, запись по ключу), json (файл целиком) или redis (общее для реплик)
+    state_storage: Literal['sqlite', 'json', 'redis'] = 'sqlite'
+    # Несколько экземпляров ETL делят индексы и диапазоны через аренды в Redis
+    coordination_enabled: bool = False
+    lease_ttl_seconds: float = 30
+    # Асинхронный ETL (AsyncEtlRunner) и число одновременных запросов _bulk в нём
+    async_enabled: bool = False
+    bulk_concurrency: int = 4
+    # Очередь документов, отклонённых Elasticsearch (см. команду replay-dead-letters)
+    dead_letter_path: str = './storage/dead_letters.sqlite3'
+    # HTTP-эндпоинт /metrics с метриками ETL в формате Prometheus
+    metrics_enabled: bool = True
+    metrics_host: str = '0.0.0.0'
+    metrics_port: int = 9108
+
+
 class Settings(BaseSettings):
     debug: bool = Field(...)
     database_settings: DatabaseSettings = DatabaseSettings()
     elasticsearch_settings: ElasticsearchSettings = ElasticsearchSettings()
+    redis_settings: RedisSettings = RedisSettings()
+    etl_settings: EtlSettings = EtlSettings()
 
 
 settings = Settings()
@@ -0,0 +1,93 @@
+"""
+Подбор шардов и реплик индексов по объёму данных.
+
+Число документов берётся из Postgres (столько их будет в индексе после полной
+загрузки), средний размер документа — из статистики живого индекса. Рекомендации
+только пишутся в лог: применяются они правкой Index.settings класса документа,
+смена числа шардов создаёт новую версию индекса.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+import psycopg
+import pytz
+from elasticsearch import Elasticsearch, NotFoundError
+from logger import logger
+
+# Рекомендация Elastic: шард на 10-50 ГБ и не больше 200 млн документов
+TARGET_SHARD_BYTES = 20 * 2 ** 30
+MAX_SHARD_DOCUMENTS = 200_000_000
+# Индекс меньше этого размера дешевле держать копией на каждом узле
+SMALL_INDEX_BYTES = 2 ** 30
+# Средний размер документа, пока индекса ещё нет
+DEFAULT_DOCUMENT_BYTES = 2048
+
+
+@dataclass
+class SizingRecommendation:
+    alias: str
+    documents: int
+    bytes_per_document: float
+    number_of_shards: int
+    replicas: dict
+
+    @property
+    def settings(self) -> dict:
+        return {'number_of_shards': self.number_of_shards, **self.replicas}
+
+
+def recommend(alias: str, documents: int, bytes_per_document: float, data_nodes: int) -> SizingRecommendation:
+    """
+    Рекомендовать число шардов и реплик для индекса заданного объёма.
+
+    Шардов столько, чтобы каждый укладывался в целевой размер; если их больше одного,
+    число округляется до кратного числу узлов, чтобы шарды распределялись равномерно.
+    Маленький индекс получает копию на каждом узле, остальные — одну реплику.
+    """
+    total_bytes = documents * bytes_per_document
+    shards = max(1, math.ceil(total_bytes / TARGET_SHARD_BYTES), math.ceil(documents / MAX_SHARD_DOCUMENTS))
+    if shards > 1 and data_nodes > 1:
+        shards = math.ceil(shards / data_nodes) * data_nodes
+
+    if total_bytes < SMALL_INDEX_BYTES:
+        replicas = {'auto_expand_replicas': '0-all'}
+    else:
+        replicas = {'number_of_replicas': min(1, data_nodes - 1)}
+
+    return SizingRecommendation(alias, documents, bytes_per_document, shards, replicas)
+
+
+def report_sizing(es: Elasticsearch, connection: psycopg.Connection, pipelines: Iterable) -> None:
+    """Записать в лог текущие и рекомендованные настройки шардов каждого индекса."""
+    data_nodes = es.cluster.health()['number_of_data_nodes']
+    everything = pytz.UTC.localize(datetime.min)
+
+    for pipeline in pipelines:
+        document_class = pipeline.document_class
+        alias = document_class.Index.name
+        documents = pipeline.count_index_data(connection, everything)
+
+        recommendation = recommend(alias, documents, _bytes_per_document(es, alias), data_nodes)
+        current = {
+            key: value
+            for key, value in document_class.Index.settings.items()
+            if key in ('number_of_shards', 'number_of_replicas', 'auto_expand_replicas')
+        }
+        logger.info(
+            f"{alias}: {documents} документов по ~{recommendation.bytes_per_document:.0f} байт, "
+            f"узлов данных {data_nodes}; сейчас {current}, рекомендуется {recommendation.settings}"
+        )
+
+
+def _bytes_per_document(es: Elasticsearch, alias: str) -> float:
+    try:
+        primaries = es.indices.stats(index=alias, metric=['docs', 'store'])['_all']['primaries']
+    except NotFoundError:
+        return DEFAULT_DOCUMENT_BYTES
+
+    documents = primaries['docs']['count']
+    if not documents:
+        return DEFAULT_DOCUMENT_BYTES
+    return primaries['store']['size_in_bytes'] / documents
@@ -10,3 +10,11 @@ class BaseStorage(abc.ABC):
     @abc.abstractmethod
     def retrieve_state(self) -> dict[str, Any]:
         ...
+
+    def save_value(self, key: str, value: Any, state: dict[str, Any]) -> None:
+        """Сохранить изменение одного ключа.
+
+        По умолчанию перезаписывается всё состояние; хранилища с поддержкой
+        точечных обновлений записывают только изменённый ключ.
+        """
+        self.save_state(state)
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+from logging import Logger
+from typing import Iterable
+
+
+class ContentHashStorage:
+    """Хэши последних отправленных в Elasticsearch документов.
+
+    Хранятся в SQLite рядом с файлом состояния, по одной строке на документ индекса.
+    Сами хэши считает Postgres при выгрузке (см. documents.index_row).
+    """
+
+    _connection: sqlite3.Connection
+    _logger: Logger
+
+    def __init__(self, logger: Logger, file_path: str = './storage/content_hashes.sqlite3') -> None:
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._logger = logger
+        self._connection = sqlite3.connect(file_path)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS content_hash ('
+            ' index_name TEXT NOT NULL,'
+            ' doc_id TEXT NOT NULL,'
+            ' hash TEXT NOT NULL,'
+            ' PRIMARY KEY (index_name, doc_id)'
+            ') WITHOUT ROWID'
+        )
+        self._connection.commit()
+
+    def filter_changed(self, index_name: str, hashes: dict[str, str]) -> set[str]:
+        """Вернуть id документов, чей хэш отличается от сохранённого."""
+        if not hashes:
+            return set()
+
+        placeholders = ','.join('?' * len(hashes))
+        stored = dict(self._connection.execute(
+            f'SELECT doc_id, hash FROM content_hash WHERE index_name = ? AND doc_id IN ({placeholders})',
+            (index_name, *hashes),
+        ))
+        return {doc_id for doc_id, doc_hash in hashes.items() if stored.get(doc_id) != doc_hash}
+
+    def save(self, index_name: str, hashes: dict[str, str]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO content_hash (index_name, doc_id, hash) VALUES (?, ?, ?)',
+                ((index_name, doc_id, doc_hash) for doc_id, doc_hash in hashes.items()),
+            )
+
+    def delete(self, index_name: str, doc_ids: Iterable[str]) -> None:
+        """Забыть хэши документов, изменённых в индексе в обход полной переиндексации."""
+        with self._connection:
+            self._connection.executemany(
+                'DELETE FROM content_hash WHERE index_name = ? AND doc_id = ?',
+                ((index_name, str(doc_id)) for doc_id in doc_ids),
+            )
+
+    def clear(self, index_name: str) -> None:
+        """Забыть все хэши индекса (индекс создан заново и пуст)."""
+        with self._connection:
+            self._connection.execute('DELETE FROM content_hash WHERE index_name = ?', (index_name,))
+        self._logger.info(f'Хэши документов индекса {index_name} сброшены')
+
+    def close(self) -> None:
+        self._connection.close()
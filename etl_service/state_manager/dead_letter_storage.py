@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any, Iterable
+
+
+@dataclass
+class DeadLetter:
+    id: int
+    index_name: str
+    doc_id: str
+    action: dict[str, Any]
+    status: int
+    error: str
+    attempts: int
+
+
+class DeadLetterStorage:
+    """Документы, окончательно отклонённые Elasticsearch.
+
+    Хранятся в SQLite рядом с файлом состояния вместе с ошибкой, чтобы индексация
+    не останавливалась из-за одного документа, а отклонённые можно было переотправить
+    после исправления данных или маппинга (команда replay-dead-letters).
+    На один документ индекса хранится одна запись с последней ошибкой.
+    """
+
+    _connection: sqlite3.Connection
+    _logger: Logger
+
+    def __init__(self, logger: Logger, file_path: str = './storage/dead_letters.sqlite3') -> None:
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._logger = logger
+        self._connection = sqlite3.connect(file_path)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS dead_letter ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' index_name TEXT NOT NULL,'
+            ' doc_id TEXT NOT NULL,'
+            ' action TEXT NOT NULL,'
+            ' status INTEGER NOT NULL,'
+            ' error TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 1,'
+            " created_at TEXT NOT NULL DEFAULT (datetime('now')),"
+            " updated_at TEXT NOT NULL DEFAULT (datetime('now')),"
+            ' UNIQUE (index_name, doc_id)'
+            ')'
+        )
+        self._connection.commit()
+
+    def add(self, index_name: str, doc_id: str, action: dict[str, Any], status: int, error: Any) -> None:
+        with self._connection:
+            self._connection.execute(
+                'INSERT INTO dead_letter (index_name, doc_id, action, status, error) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (index_name, doc_id) DO UPDATE SET '
+                ' action = excluded.action, status = excluded.status, error = excluded.error,'
+                " attempts = dead_letter.attempts + 1, updated_at = datetime('now')",
+                (index_name, doc_id, json.dumps(action, default=str), status, json.dumps(error, default=str)),
+            )
+        self._logger.error(f'❌ Документ {doc_id} индекса {index_name} отклонён ({status}): {error}')
+
+    def fetch(self, limit: int | None = None) -> list[DeadLetter]:
+        rows = self._connection.execute(
+            'SELECT id, index_name, doc_id, action, status, error, attempts FROM dead_letter ORDER BY id LIMIT ?',
+            (limit if limit is not None else -1,),
+        )
+        return [
+            DeadLetter(row_id, index_name, doc_id, json.loads(action), status, error, attempts)
+            for row_id, index_name, doc_id, action, status, error, attempts in rows
+        ]
+
+    def remove(self, ids: Iterable[int]) -> None:
+        with self._connection:
+            self._connection.executemany('DELETE FROM dead_letter WHERE id = ?', ((row_id,) for row_id in ids))
+
+    def count(self) -> int:
+        return self._connection.execute('SELECT count(*) FROM dead_letter').fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
@@ -13,6 +13,15 @@ def create_directory(path):
         os.makedirs(path)
 
 
+def fsync_directory(path):
+    """Сбросить на диск запись каталога, чтобы переименование пережило сбой питания."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 class JsonFileStorage(BaseStorage):
     """Реализация хранилища, использующего локальный файл.
 
@@ -35,8 +44,15 @@ class JsonFileStorage(BaseStorage):
         """Сохранить состояние в хранилище."""
         lock = FileLock(f'{self._file_path}.lock')
         with lock:
-            with open(file=self._file_path, mode='w', encoding='utf-8') as json_storage:
+            # Запись во временный файл и атомарная замена: сбой посреди записи
+            # не оставляет обрезанный JSON вместо состояния
+            tmp_path = f'{self._file_path}.tmp'
+            with open(file=tmp_path, mode='w', encoding='utf-8') as json_storage:
                 json.dump(state, json_storage)
+                json_storage.flush()
+                os.fsync(json_storage.fileno())
+            os.replace(tmp_path, self._file_path)
+            fsync_directory(os.path.dirname(os.path.abspath(self._file_path)))
 
     def retrieve_state(self) -> dict[str, Any]:
         """Получить состояние из хранилища."""
@@ -0,0 +1,41 @@
+import json
+from logging import Logger
+from typing import Any
+
+from redis import Redis
+from state_manager.base_storage import BaseStorage
+
+
+class RedisStorage(BaseStorage):
+    """Реализация хранилища в хэше Redis.
+
+    Состояние общее для всех экземпляров ETL, подключённых к одному Redis;
+    set_state обновляет одно поле хэша.
+    """
+
+    _redis: Redis
+    _logger: Logger
+
+    def __init__(self, logger: Logger, redis: Redis, key: str = 'etl:state') -> None:
+        self._redis = redis
+        self._key = key
+        self._logger = logger
+
+    def save_state(self, state: dict[str, Any]) -> None:
+        """Сохранить состояние в хранилище."""
+        pipeline = self._redis.pipeline(transaction=True)
+        pipeline.delete(self._key)
+        if state:
+            pipeline.hset(self._key, mapping={key: json.dumps(value) for key, value in state.items()})
+        pipeline.execute()
+
+    def save_value(self, key: str, value: Any, state: dict[str, Any]) -> None:
+        """Сохранить изменение одного ключа."""
+        self._redis.hset(self._key, key, json.dumps(value))
+
+    def retrieve_state(self) -> dict[str, Any]:
+        """Получить состояние из хранилища."""
+        return {
+            key.decode('utf-8'): json.loads(value)
+            for key, value in self._redis.hgetall(self._key).items()
+        }
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from logging import Logger
+from typing import Any, Generator
+
+from state_manager.base_storage import BaseStorage
+
+
+class SqliteStorage(BaseStorage):
+    """Реализация хранилища на SQLite в режиме WAL.
+
+    Каждый ключ состояния — отдельная строка, поэтому set_state записывает
+    только изменённый ключ одной короткой транзакцией.
+    """
+
+    _connection: sqlite3.Connection
+    _logger: Logger
+
+    def __init__(
+            self,
+            logger: Logger,
+            file_path: str = './storage/state_storage.sqlite3',
+            legacy_json_path: str | None = './storage/state_storage.json',
+    ) -> None:
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._logger = logger
+        self._connection = sqlite3.connect(file_path, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        # В WAL-режиме NORMAL сохраняет целостность базы и не делает fsync на каждый commit
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID'
+        )
+
+        if legacy_json_path is not None:
+            self._import_legacy_json(legacy_json_path)
+
+    def save_state(self, state: dict[str, Any]) -> None:
+        """Сохранить состояние в хранилище."""
+        with self._transaction():
+            self._connection.execute('DELETE FROM state')
+            self._connection.executemany(
+                'INSERT INTO state (key, value) VALUES (?, ?)',
+                ((key, json.dumps(value)) for key, value in state.items()),
+            )
+
+    def save_value(self, key: str, value: Any, state: dict[str, Any]) -> None:
+        """Сохранить изменение одного ключа."""
+        self._connection.execute(
+            'INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, json.dumps(value)),
+        )
+
+    def retrieve_state(self) -> dict[str, Any]:
+        """Получить состояние из хранилища."""
+        rows = self._connection.execute('SELECT key, value FROM state')
+        return {key: json.loads(value) for key, value in rows}
+
+    def _import_legacy_json(self, json_path: str) -> None:
+        """Перенести состояние из JsonFileStorage, чтобы смена хранилища не вызывала полную ресинхронизацию."""
+        has_state = self._connection.execute('SELECT 1 FROM state LIMIT 1').fetchone()
+        if has_state or not os.path.exists(json_path):
+            return
+
+        try:
+            with open(file=json_path, mode='r', encoding='utf-8') as json_storage:
+                state = json.load(json_storage)
+        except (OSError, json.JSONDecodeError) as e:
+            self._logger.warning(f'Could not import state from {json_path}: {e}')
+            return
+
+        self.save_state(state)
+        self._logger.info(f'State imported from {json_path}')
+
+    @contextmanager
+    def _transaction(self) -> Generator[None, None, None]:
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except Exception:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
@@ -12,7 +12,11 @@ class StateManager:
 
     def set_state(self, key: str, value: Any) -> None:
         self.state.update({key: value})
-        self.storage.save_state(self.state)
+        self.storage.save_value(key, value, self.state)
+
+    def reload(self) -> None:
+        """Перечитать состояние, если его мог изменить другой экземпляр."""
+        self.state = self.storage.retrieve_state()
 
     def get_state(self, key: str) -> Any:
         if self.state.__contains__(key):
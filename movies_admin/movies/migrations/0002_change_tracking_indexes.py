@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='filmwork',
+            index=models.Index(fields=['modified'], name='film_work_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['modified'], name='genre_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['modified'], name='person_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genrefilmwork',
+            index=models.Index(fields=['created'], name='genre_film_work_created_idx'),
+        ),
+        # Индексы по genre_id и person_id нужны только базе из database_dump.sql:
+        # 0001 применяется к ней с --fake (docker/admin/entrypoint.sh), и индексов
+        # внешних ключей, которые Django создаёт сам, в дампе нет. В схеме, собранной
+        # миграциями с нуля, они дублируют автоматические индексы FK.
+        migrations.AddIndex(
+            model_name='genrefilmwork',
+            index=models.Index(fields=['genre'], name='genre_film_work_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personfilmwork',
+            index=models.Index(fields=['created'], name='person_film_work_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personfilmwork',
+            index=models.Index(fields=['person'], name='person_film_work_person_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.4 on 2026-10-19 10:30
+
+from django.db import migrations
+
+CONTENT_TABLES = (
+    'film_work',
+    'genre',
+    'person',
+    'genre_film_work',
+    'person_film_work',
+)
+
+# Триггер отправляет в канал content_changes id изменённой строки
+# (и id связанных записей для таблиц-связок), по которым ETL переиндексирует документы.
+# Имя канала продублировано в etl_service/services/change_listener.py (NOTIFY_CHANNEL).
+CREATE_NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.notify_content_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+
+    PERFORM pg_notify(
+        'content_changes',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_data ->> 'id',
+            'film_work_id', row_data ->> 'film_work_id',
+            'person_id', row_data ->> 'person_id',
+            'genre_id', row_data ->> 'genre_id'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_NOTIFY_FUNCTION = 'DROP FUNCTION IF EXISTS content.notify_content_change();'
+
+CREATE_TRIGGER = """
+CREATE TRIGGER {table}_notify_change
+AFTER INSERT OR UPDATE OR DELETE ON content.{table}
+FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
+"""
+
+DROP_TRIGGER = 'DROP TRIGGER IF EXISTS {table}_notify_change ON content.{table};'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_change_tracking_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREATE_NOTIFY_FUNCTION, reverse_sql=DROP_NOTIFY_FUNCTION),
+        *(
+            migrations.RunSQL(
+                sql=CREATE_TRIGGER.format(table=table),
+                reverse_sql=DROP_TRIGGER.format(table=table),
+            )
+            for table in CONTENT_TABLES
+        ),
+    ]
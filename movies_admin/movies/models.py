@@ -34,6 +34,9 @@ class Genre(UUIDMixin, TimeStampedMixin):
         verbose_name = _('genre')
         verbose_name_plural = _('genres')
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=['modified'], name='genre_modified_idx'),
+        ]
 
 
 class Person(UUIDMixin, TimeStampedMixin):
@@ -46,6 +49,9 @@ class Person(UUIDMixin, TimeStampedMixin):
         db_table = 'content"."person'
         verbose_name = _('person')
         verbose_name_plural = _('persons')
+        indexes = [
+            models.Index(fields=['modified'], name='person_modified_idx'),
+        ]
 
 
 class FilmTypes(models.TextChoices):
@@ -91,6 +97,7 @@ class FilmWork(UUIDMixin, TimeStampedMixin):
                 fields=['creation_date', 'rating'],
                 name='film_work_creation_rating_idx',
             ),
+            models.Index(fields=['modified'], name='film_work_modified_idx'),
         ]
 
 
@@ -116,6 +123,11 @@ class GenreFilmWork(UUIDMixin):
                 name='film_work_genre_idx',
             ),
         ]
+        indexes = [
+            models.Index(fields=['created'], name='genre_film_work_created_idx'),
+            # Индекс FK для базы из дампа, см. миграцию 0002
+            models.Index(fields=['genre'], name='genre_film_work_genre_idx'),
+        ]
 
 
 class Roles(models.TextChoices):
@@ -152,3 +164,8 @@ class PersonFilmWork(UUIDMixin):
                 name='film_work_person_role_idx',
             ),
         ]
+        indexes = [
+            models.Index(fields=['created'], name='person_film_work_created_idx'),
+            # Индекс FK для базы из дампа, см. миграцию 0002
+            models.Index(fields=['person'], name='person_film_work_person_idx'),
+        ]